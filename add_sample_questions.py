@@ -3,7 +3,7 @@
 Script to add 100 sample questions to the Q&A platform
 """
 
-from app import app, db, User, Question, Tag, Answer
+from app import app, db, User, Question, Tag, Answer, tag_repository
 from datetime import datetime, timedelta
 import random
 
@@ -40,13 +40,7 @@ def create_sample_questions():
         ]
         
         # Create tags if they don't exist
-        tags = {}
-        for tag_name in tag_names:
-            tag = Tag.query.filter_by(name=tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.session.add(tag)
-            tags[tag_name] = tag
+        tags = {tag.name: tag for tag in tag_repository.resolve(tag_names)}
         
         db.session.commit()
         
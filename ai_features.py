@@ -22,8 +22,7 @@ class AIRecommendationEngine:
     
     def extract_keywords(self, text):
         """Extract keywords from text"""
-        # Remove HTML tags and special characters
-        text = re.sub(r'<[^>]+>', ' ', text)
+        # Callers pass plain text (content_text, titles); drop special characters
         text = re.sub(r'[^\w\s]', ' ', text.lower())
         
         # Split into words and filter stop words
@@ -64,8 +63,8 @@ class AIRecommendationEngine:
         similarities = []
         for q in all_questions:
             similarity = self.calculate_similarity(
-                current_question.title + ' ' + current_question.content,
-                q.title + ' ' + q.content
+                current_question.title + ' ' + current_question.content_text,
+                q.title + ' ' + q.content_text
             )
             if similarity > 0.1:  # Only include questions with some similarity
                 similarities.append((q, similarity))
@@ -77,7 +76,8 @@ class AIRecommendationEngine:
     def recommend_questions_for_user(self, user_id, limit=10):
         """Recommend questions based on user's interests and activity"""
         from flask import current_app
-        from app import User, Question
+        from sqlalchemy import or_
+        from app import User, Question, Answer, query_shapes
         
         # Get the database session from the current app context
         db = current_app.extensions['sqlalchemy'].db
@@ -86,31 +86,27 @@ class AIRecommendationEngine:
         if not user:
             return []
         
-        # Get user's question tags
-        user_tags = set()
-        for question in user.questions:
-            for tag in question.tags:
-                user_tags.add(tag.name)
-        
-        # Get user's answered questions tags
-        for answer in user.answers:
-            for tag in answer.question.tags:
-                user_tags.add(tag.name)
+        # Questions the user asked or answered, and their tags
+        answered_ids = db.session.query(Answer.question_id).filter(Answer.user_id == user_id)
+        interacted_questions = query_shapes.question_ranking(db.session.query(Question)).filter(
+            or_(Question.user_id == user_id, Question.id.in_(answered_ids))
+        ).all()
+        user_tags = set(tag.name for question in interacted_questions for tag in question.tags)
         
         # Find questions with similar tags that user hasn't interacted with
-        user_question_ids = [q.id for q in user.questions]
-        user_answer_ids = [a.question_id for a in user.answers]
-        interacted_ids = set(user_question_ids + user_answer_ids)
+        interacted_ids = set(question.id for question in interacted_questions)
         
         recommended_questions = []
-        all_questions = db.session.query(Question).filter(~Question.id.in_(interacted_ids)).all()
+        all_questions = query_shapes.question_ranking(db.session.query(Question)).filter(
+            ~Question.id.in_(interacted_ids)
+        ).all()
         
         for question in all_questions:
             question_tags = set(tag.name for tag in question.tags)
             tag_similarity = len(user_tags & question_tags) / max(len(user_tags), len(question_tags), 1)
             
             # Consider question popularity (views, answers, votes)
-            popularity_score = len(question.answers) * 0.1 + len(question.votes) * 0.05
+            popularity_score = question.answer_count * 0.1 + question.vote_count * 0.05
             
             # Calculate recommendation score
             score = tag_similarity * 0.7 + popularity_score * 0.3
@@ -129,15 +125,15 @@ class SmartSearchEngine:
     def search_questions(self, query, user_id=None, limit=20):
         """Advanced search with AI-powered ranking"""
         from flask import current_app
-        from app import Question, Tag
+        from app import Question, Tag, query_shapes
         
         # Get the database session from the current app context
         db = current_app.extensions['sqlalchemy'].db
         
         # Basic text search
-        basic_results = db.session.query(Question).filter(
+        basic_results = query_shapes.question_ranking(db.session.query(Question)).filter(
             Question.title.contains(query) | 
-            Question.content.contains(query)
+            Question.content_text.contains(query)
         ).all()
         
         # Tag-based search
@@ -145,7 +141,9 @@ class SmartSearchEngine:
         if query.lower() in [tag.name.lower() for tag in db.session.query(Tag).all()]:
             tag = db.session.query(Tag).filter(Tag.name.ilike(f'%{query}%')).first()
             if tag:
-                tag_results = tag.questions
+                tag_results = query_shapes.question_ranking(db.session.query(Question)).filter(
+                    Question.tags.contains(tag)
+                ).all()
         
         # Combine and deduplicate results
         all_results = list(set(basic_results + tag_results))
@@ -155,16 +153,16 @@ class SmartSearchEngine:
         for question in all_results:
             # Calculate relevance score
             title_similarity = self.ai_engine.calculate_similarity(query, question.title)
-            content_similarity = self.ai_engine.calculate_similarity(query, question.content)
+            content_similarity = self.ai_engine.calculate_similarity(query, question.content_text)
             
             # Boost score for exact matches
             if query.lower() in question.title.lower():
                 title_similarity *= 2.0
-            if query.lower() in question.content.lower():
+            if query.lower() in question.content_text.lower():
                 content_similarity *= 1.5
             
             # Consider popularity and recency
-            popularity_score = len(question.answers) * 0.1 + len(question.votes) * 0.05
+            popularity_score = question.answer_count * 0.1 + question.vote_count * 0.05
             recency_score = max(0, 1 - (datetime.utcnow() - question.created_at).days / 365)
             
             # Calculate final score
@@ -182,7 +180,7 @@ class SmartSearchEngine:
     def get_trending_topics(self, days=7, limit=10):
         """Get trending topics based on recent activity"""
         from flask import current_app
-        from app import Question, Tag
+        from app import Question, Tag, query_shapes
         
         # Get the database session from the current app context
         db = current_app.extensions['sqlalchemy'].db
@@ -190,13 +188,17 @@ class SmartSearchEngine:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
         # Get recent questions
-        recent_questions = db.session.query(Question).filter(Question.created_at >= cutoff_date).all()
+        recent_questions = query_shapes.question_ranking(db.session.query(Question)).filter(
+            Question.created_at >= cutoff_date
+        ).all()
         
         # Count tag frequencies
         tag_counts = Counter()
+        tags_by_name = {}
         for question in recent_questions:
             for tag in question.tags:
-                tag_counts[tag.name] += len(question.answers) + 1  # Weight by engagement
+                tag_counts[tag.name] += question.answer_count + 1  # Weight by engagement
+                tags_by_name[tag.name] = tag
         
         # Get top trending tags
         trending_tags = tag_counts.most_common(limit)
@@ -204,7 +206,7 @@ class SmartSearchEngine:
         # Get sample questions for each trending tag
         trending_topics = []
         for tag_name, count in trending_tags:
-            tag = db.session.query(Tag).filter_by(name=tag_name).first()
+            tag = tags_by_name.get(tag_name)
             if tag:
                 # Use a proper query instead of the relationship
                 sample_questions = db.session.query(Question).join(Question.tags).filter(
@@ -225,7 +227,7 @@ class ContentAnalyzer:
         
         # Length analysis
         title_length = len(question.title.split())
-        content_length = len(question.content.split())
+        content_length = len(question.content_text.split())
         
         if 5 <= title_length <= 15:
             quality_score += 0.2
@@ -245,7 +247,7 @@ class ContentAnalyzer:
             quality_score += 0.1
         
         # Engagement potential
-        if len(question.content) > 100:
+        if len(question.content_text) > 100:
             quality_score += 0.1
         
         # Grammar check (simplified)
@@ -1,26 +1,196 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, render_template_string, request, redirect, url_for, flash, jsonify
 from flask_sqlalchemy import SQLAlchemy
+from markupsafe import Markup
+from sqlalchemy.orm import validates
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_wtf import FlaskForm, CSRFProtect
 from wtforms import StringField, TextAreaField, PasswordField, SubmitField, SelectField
 from wtforms.validators import DataRequired, Length, EqualTo, Email
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import hmac
 import os
 import re
+import sys
 
 # Import AI features
 from ai_features import AIRecommendationEngine, SmartSearchEngine, ContentAnalyzer
+import migrations
+from migrations.seed import seed_starter_content
+from services import events
+from services.activity import ActivityRollups
+from services.content_version import LIST_SCOPE, ContentVersionCounter, question_scope
+from services.badges import BadgeEngine
+from services.leaderboard import LeaderboardService
+from services.identity import IdentityCache, UserDeleted
+from services.jobs import JobQueue
+from services.notification_fanout import NotificationFanout
+from services.query_shapes import QueryShapes, USER_SUMMARY_COLUMNS
+from services.stats import PlatformStats
+from services.subscriptions import TagSubscriptions
+from services.tags import TagRepository
+from services.reputation import ReputationLedger, badge_level_for
+from services.view_counter import ViewCounter
+from services.write_queue import WriteQueue
+from utils.pagination import InvalidCursor, keyset_page
+from utils import content as content_pipeline
+from utils import sqlite as sqlite_profile
+from utils.api_cache import ApiCache
+from utils.compression import Compression
+from utils.fragment_cache import FileFragmentStore, FragmentCache, MemoryFragmentStore
+from utils.pool import InstrumentedQueuePool, PoolMetrics, pool_report
+from utils.replicas import ReplicaRouter, RoutingSession
+from utils.response_cache import ResponseCache
+from utils.serialization import JSONProvider
+from utils.static_assets import StaticAssets
+
+# Run as a script this module is __main__; register it as ``app`` as well, so
+# modules imported later on (realtime.py) share this app instead of loading a
+# second copy of it
+if __name__ == '__main__':
+    sys.modules.setdefault('app', sys.modules[__name__])
 
 app = Flask(__name__)
+# JSON responses are encoded with orjson when it is installed
+app.json = JSONProvider(app)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-here-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///qa_platform.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['WTF_CSRF_ENABLED'] = True
+
+# Connection pool, per worker process. With DB_POOL_PRE_PING=0 connections are no
+# longer pinged on every checkout; a disconnect error invalidates the pool instead,
+# so only the request that hits a dead connection fails.
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 300))
+app.config['DB_POOL_USE_LIFO'] = os.environ.get('DB_POOL_USE_LIFO', '0') == '1'
+app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+
+# Bearer token required by /api/metrics/db-pool and /api/metrics/jobs (disabled when unset)
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+# Questions per page on the home feed
+app.config['QUESTIONS_PER_PAGE'] = int(os.environ.get('QUESTIONS_PER_PAGE', 20))
+
+# Page views are buffered in memory and written in batches
+app.config['VIEW_FLUSH_INTERVAL'] = float(os.environ.get('VIEW_FLUSH_INTERVAL', 5))
+app.config['VIEW_FLUSH_THRESHOLD'] = int(os.environ.get('VIEW_FLUSH_THRESHOLD', 500))
+
+# Leaderboards are rebuilt from the database at most this often (seconds)
+app.config['LEADERBOARD_REFRESH_INTERVAL'] = int(os.environ.get('LEADERBOARD_REFRESH_INTERVAL', 300))
+
+# Platform stats snapshots are shared by all pollers for this many seconds
+app.config['STATS_CACHE_TTL'] = int(os.environ.get('STATS_CACHE_TTL', 30))
+
+# Anonymous visitors get / and /question/<id> from a page cache that is
+# invalidated by the content writes each page shows. RESPONSE_CACHE_DIR also keeps the pages on
+# disk, shared by all workers and capped at RESPONSE_CACHE_DIR_MAX_ENTRIES;
+# other workers notice a write within CONTENT_VERSION_TTL seconds.
+app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 500))
+app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+app.config['RESPONSE_CACHE_DIR'] = os.environ.get('RESPONSE_CACHE_DIR')
+app.config['RESPONSE_CACHE_DIR_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_DIR_MAX_ENTRIES', 5000))
+app.config['CONTENT_VERSION_TTL'] = float(os.environ.get('CONTENT_VERSION_TTL', 1))
+
+# Hot /api/v1 GETs are cached per URL with stale-while-revalidate refresh; each
+# endpoint sets its own TTL where it is decorated with @api_cache.cached
+app.config['API_CACHE_ENABLED'] = os.environ.get('API_CACHE_ENABLED', '1') == '1'
+app.config['API_CACHE_MAX_ENTRIES'] = int(os.environ.get('API_CACHE_MAX_ENTRIES', 1000))
+
+# HTML, JSON and other text responses of at least COMPRESS_MIN_SIZE bytes are
+# compressed with brotli (if installed) or gzip; COMPRESS_STREAMS=0 leaves
+# streamed responses alone. Static files are compressed ahead of time by
+# build_static.py, at the slower *_STATIC settings, and served from
+# fingerprinted URLs cached for STATIC_MAX_AGE seconds.
+app.config['COMPRESS_ENABLED'] = os.environ.get('COMPRESS_ENABLED', '1') == '1'
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+app.config['COMPRESS_BROTLI_QUALITY'] = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+app.config['COMPRESS_STREAMS'] = os.environ.get('COMPRESS_STREAMS', '1') == '1'
+app.config['COMPRESS_LEVEL_STATIC'] = int(os.environ.get('COMPRESS_LEVEL_STATIC', 9))
+app.config['COMPRESS_BROTLI_QUALITY_STATIC'] = int(os.environ.get('COMPRESS_BROTLI_QUALITY_STATIC', 11))
+app.config['STATIC_ASSETS_ENABLED'] = os.environ.get('STATIC_ASSETS_ENABLED', '1') == '1'
+app.config['STATIC_MAX_AGE'] = int(os.environ.get('STATIC_MAX_AGE', 365 * 24 * 3600))
+
+# The logged-in user's summary columns are cached per worker for this many
+# seconds; the worker that commits a change to the user drops its copy at once
+app.config['IDENTITY_CACHE_ENABLED'] = os.environ.get('IDENTITY_CACHE_ENABLED', '1') == '1'
+app.config['IDENTITY_CACHE_TTL'] = float(os.environ.get('IDENTITY_CACHE_TTL', 30))
+app.config['IDENTITY_CACHE_MAX_ENTRIES'] = int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 10000))
+
+# Each worker keeps tag subscriptions in memory, reloading them from the
+# tag_subscription table this often to pick up other workers' changes
+app.config['TAG_SUBSCRIPTIONS_RELOAD_INTERVAL'] = int(os.environ.get('TAG_SUBSCRIPTIONS_RELOAD_INTERVAL', 300))
+
+# Side effects of a write (notifications, badge checks, tag subscriptions,
+# realtime fan-out) run as background jobs once the write commits:
+# JOB_QUEUE_WORKERS threads per worker process, plus JOB_QUEUE_PROCESSES
+# processes for jobs registered to run in one. A failing job is retried
+# JOB_QUEUE_MAX_ATTEMPTS times, JOB_QUEUE_RETRY_DELAY seconds apart and
+# doubling. Jobs are kept in the job table until they finish, so they
+# survive a restart.
+app.config['JOB_QUEUE_ENABLED'] = os.environ.get('JOB_QUEUE_ENABLED', '1') == '1'
+app.config['JOB_QUEUE_WORKERS'] = int(os.environ.get('JOB_QUEUE_WORKERS', 4))
+app.config['JOB_QUEUE_PROCESSES'] = int(os.environ.get('JOB_QUEUE_PROCESSES', 0))
+app.config['JOB_QUEUE_MAX_ATTEMPTS'] = int(os.environ.get('JOB_QUEUE_MAX_ATTEMPTS', 5))
+app.config['JOB_QUEUE_RETRY_DELAY'] = float(os.environ.get('JOB_QUEUE_RETRY_DELAY', 5))
+app.config['JOB_QUEUE_POLL_INTERVAL'] = float(os.environ.get('JOB_QUEUE_POLL_INTERVAL', 5))
+app.config['JOB_QUEUE_LEASE'] = int(os.environ.get('JOB_QUEUE_LEASE', 300))
+app.config['JOB_QUEUE_MAX_PENDING'] = int(os.environ.get('JOB_QUEUE_MAX_PENDING', 1000))
+
+# New-question notifications (realtime.py) are inserted and sent this many
+# recipients at a time
+app.config['NOTIFY_FANOUT_CHUNK_SIZE'] = int(os.environ.get('NOTIFY_FANOUT_CHUNK_SIZE', 500))
+
+# At most FRAGMENT_CACHE_MAX_ENTRIES rendered {% cache %} template fragments
+# are kept in memory, or in FRAGMENT_CACHE_DIR to share them between the
+# workers on a host
+app.config['FRAGMENT_CACHE_ENABLED'] = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'
+app.config['FRAGMENT_CACHE_MAX_ENTRIES'] = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 5000))
+app.config['FRAGMENT_CACHE_DIR'] = os.environ.get('FRAGMENT_CACHE_DIR')
+
+# Read replicas (comma-separated URLs). Read-only requests use one of them, except
+# for clients that wrote something in the last REPLICA_STICKY_SECONDS.
+app.config['SQLALCHEMY_BINDS'] = {
+    f'replica_{number}': url.strip()
+    for number, url in enumerate(os.environ.get('REPLICA_DATABASE_URLS', '').split(','))
+    if url.strip()
+}
+app.config['REPLICA_STICKY_SECONDS'] = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+# SQLite production profile: WAL journal, relaxed fsync, in-memory page cache
+# and a single writer thread for background writes. Ignored for other databases.
+app.config['SQLITE_PERFORMANCE_MODE'] = os.environ.get('SQLITE_PERFORMANCE_MODE', '1') == '1'
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+app.config['SQLITE_CACHE_SIZE'] = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+app.config['SQLITE_WRITE_BATCH_SIZE'] = int(os.environ.get('SQLITE_WRITE_BATCH_SIZE', 100))
+app.config['SQLITE_WRITE_BATCH_WAIT'] = float(os.environ.get('SQLITE_WRITE_BATCH_WAIT', 0.005))
+
+sqlite_performance_mode = (
+    app.config['SQLITE_PERFORMANCE_MODE']
+    and sqlite_profile.is_sqlite(app.config['SQLALCHEMY_DATABASE_URI'])
+    and not sqlite_profile.is_memory(app.config['SQLALCHEMY_DATABASE_URI'])
+)
+
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
+    'pool_pre_ping': app.config['DB_POOL_PRE_PING'],
+    'pool_recycle': app.config['DB_POOL_RECYCLE'],
 }
-app.config['WTF_CSRF_ENABLED'] = True
+# SQLite only pools connections in the performance profile (and never for :memory:)
+if sqlite_performance_mode or not sqlite_profile.is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        'pool_use_lifo': app.config['DB_POOL_USE_LIFO'],
+    })
+if sqlite_performance_mode:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_profile.engine_options(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
 
 # Get port from environment (Render uses port 10000)
 port = int(os.environ.get('PORT', 5001))
@@ -28,36 +198,57 @@ port = int(os.environ.get('PORT', 5001))
 # Initialize CSRF protection
 csrf = CSRFProtect(app)
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+if sqlite_performance_mode:
+    with app.app_context():
+        for engine in db.engines.values():
+            sqlite_profile.apply_pragmas(
+                engine,
+                mmap_size=app.config['SQLITE_MMAP_SIZE'],
+                cache_size=app.config['SQLITE_CACHE_SIZE'],
+                busy_timeout=app.config['SQLITE_BUSY_TIMEOUT']
+            )
+
+with app.app_context():
+    pool_metrics = {name or 'primary': PoolMetrics(engine) for name, engine in db.engines.items()}
+
+replica_router = ReplicaRouter(app.config['SQLALCHEMY_BINDS'], sticky_seconds=app.config['REPLICA_STICKY_SECONDS'])
+replica_router.init_app(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
+fragment_cache = FragmentCache(
+    FileFragmentStore(app.config['FRAGMENT_CACHE_DIR'], app.config['FRAGMENT_CACHE_MAX_ENTRIES'])
+    if app.config['FRAGMENT_CACHE_DIR']
+    else MemoryFragmentStore(app.config['FRAGMENT_CACHE_MAX_ENTRIES']),
+    enabled=app.config['FRAGMENT_CACHE_ENABLED']
+)
+fragment_cache.init_app(app)
+
+compression = Compression(
+    min_size=app.config['COMPRESS_MIN_SIZE'],
+    level=app.config['COMPRESS_LEVEL'],
+    brotli_quality=app.config['COMPRESS_BROTLI_QUALITY'],
+    streams=app.config['COMPRESS_STREAMS'],
+    enabled=app.config['COMPRESS_ENABLED']
+)
+compression.init_app(app)
+
+static_assets = StaticAssets(max_age=app.config['STATIC_MAX_AGE'], enabled=app.config['STATIC_ASSETS_ENABLED'])
+static_assets.init_app(app)
+
 # Custom Jinja2 filters
 @app.template_filter('nl2br')
 def nl2br_filter(text):
-    """Convert newlines to <br> tags"""
+    """Escape text and convert newlines to <br> tags"""
     if text is None:
         return ''
-    return re.sub(r'\r?\n', '<br>', text)
+    return Markup(content_pipeline.text_to_html(text))
 
 @app.template_filter('clean_html')
 def clean_html_filter(text):
-    """Clean up HTML content from rich text editor"""
-    if text is None:
-        return ''
-    # Remove unnecessary span styles and clean up
-    text = re.sub(r'<span[^>]*style="[^"]*"[^>]*>(.*?)<\/span>', r'\1', text)
-    text = re.sub(r'<p[^>]*style="[^"]*"[^>]*>', '<p>', text)
-    text = re.sub(r'style="[^"]*"', '', text)
-    # Convert paragraphs to plain text with line breaks
-    text = re.sub(r'<p[^>]*>(.*?)<\/p>', r'\1\n\n', text)
-    text = re.sub(r'<br[^>]*>', '\n', text)
-    # Remove any remaining HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
-    # Clean up extra whitespace
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    text = text.strip()
-    return text
+    """Clean up HTML content from rich text editor (stored bodies have content_html already)"""
+    return content_pipeline.strip_html(text)
 
 # Models
 class User(UserMixin, db.Model):
@@ -72,44 +263,23 @@ class User(UserMixin, db.Model):
     badge_level = db.Column(db.String(20), default='Beginner')
     profile_views = db.Column(db.Integer, default=0)
     
+    # Activity counters maintained by the badge engine
+    questions_count = db.Column(db.Integer, default=0)
+    answers_count = db.Column(db.Integer, default=0)
+    accepted_answers_count = db.Column(db.Integer, default=0)
+    votes_count = db.Column(db.Integer, default=0)
+    
+    # Backs the paginated user list (see migrations/v0003_hot_path_indexes.py)
+    __table_args__ = (db.Index('ix_user_created_at_id', 'created_at', 'id'),)
+    
     questions = db.relationship('Question', backref='author', lazy=True)
     answers = db.relationship('Answer', backref='author', lazy=True)
     votes = db.relationship('Vote', backref='user', lazy=True)
     badges = db.relationship('UserBadge', backref='user', lazy=True)
     
-    def calculate_reputation(self):
-        """Calculate user reputation based on activity"""
-        score = 1  # Base reputation
-        
-        # Points for questions
-        score += len(self.questions) * 5
-        
-        # Points for answ        score += len(self.answers) * 10
-        
-        # Points for accepted answers
-        accepted_answers = len([a for a in self.answers if a.is_accepted])
-        score += accepted_answers * 15
-        
-        # Points for votes received
-        question_votes = sum(v.value for q in self.questions for v in q.votes if v.value > 0)
-        answer_votes = sum(v.value for a in self.answers for v in a.votes if v.value > 0)
-        score += (question_votes + answer_votes) * 2
-        
-        return max(score, 1)
-    
     def update_badge_level(self):
         """Update user badge based on reputation"""
-        rep = self.reputation
-        if rep >= 1000:
-            self.badge_level = 'Expert'
-        elif rep >= 500:
-            self.badge_level = 'Advanced'
-        elif rep >= 100:
-            self.badge_level = 'Intermediate'
-        elif rep >= 50:
-            self.badge_level = 'Apprentice'
-        else:
-            self.badge_level = 'Beginner'
+        self.badge_level = badge_level_for(self.reputation)
     
     def set_password(self, password):
         """Set password hash"""
@@ -125,35 +295,79 @@ class Question(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    views = db.Column(db.Integer, default=0)
+    
+    # Display, search and summary forms of content, rendered whenever it is
+    # set (utils/content.py)
+    content_html = db.Column(db.Text)
+    content_text = db.Column(db.Text)
+    excerpt = db.Column(db.String(255))
+    
+    # Back the keyset-paginated home feed and a user's recent questions
+    # (see migrations/v0003_hot_path_indexes.py)
+    __table_args__ = (
+        db.Index('ix_question_created_at_id', 'created_at', 'id'),
+        db.Index('ix_question_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     answers = db.relationship('Answer', backref='question', lazy=True, cascade='all, delete-orphan')
     votes = db.relationship('Vote', backref='question', lazy=True)
     tags = db.relationship('Tag', secondary='question_tags', backref='questions')
+    
+    # Aggregates loaded by the query shapes (services/query_shapes.py)
+    vote_score = db.query_expression()
+    answer_count = db.query_expression()
+    vote_count = db.query_expression()
+    has_accepted_answer = db.query_expression()
+    
+    @validates('content')
+    def render_content(self, key, content):
+        self.content_html, self.content_text, self.excerpt = content_pipeline.render_content(content)
+        return content
 
 class Answer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
     is_accepted = db.Column(db.Boolean, default=False)
     
+    # Rendered forms of content, as on Question
+    content_html = db.Column(db.Text)
+    content_text = db.Column(db.Text)
+    excerpt = db.Column(db.String(255))
+    
+    __table_args__ = (db.Index('ix_answer_user_id_created_at', 'user_id', 'created_at'),)
+    
     votes = db.relationship('Vote', backref='answer', lazy=True)
+    
+    # Loaded by the query shapes (services/query_shapes.py)
+    vote_score = db.query_expression()
+    
+    @validates('content')
+    def render_content(self, key, content):
+        self.content_html, self.content_text, self.excerpt = content_pipeline.render_content(content)
+        return content
 
 class Tag(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
+    
+    # Loaded by the query shapes (services/query_shapes.py)
+    question_count = db.query_expression()
 
 class Vote(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     value = db.Column(db.Integer)  # +1 or -1
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=True)
-    answer_id = db.Column(db.Integer, db.ForeignKey('answer.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=True, index=True)
+    answer_id = db.Column(db.Integer, db.ForeignKey('answer.id'), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 question_tags = db.Table('question_tags',
     db.Column('question_id', db.Integer, db.ForeignKey('question.id'), primary_key=True),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True, index=True)
 )
 
 # Badge system models
@@ -183,8 +397,191 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_notification_user_id_is_read_created_at', 'user_id', 'is_read', 'created_at'),)
+    
     user = db.relationship('User', backref=db.backref('notifications', lazy=True, cascade='all, delete-orphan'))
 
+class ReputationEvent(db.Model):
+    """One signed change to a user's reputation (see services/reputation.py)"""
+    __tablename__ = 'reputation_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    event_type = db.Column(db.String(20), nullable=False)  # question, answer, accept, unaccept, vote
+    delta = db.Column(db.Integer, nullable=False)
+    question_id = db.Column(db.Integer)
+    answer_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class DailyActivity(db.Model):
+    """Per-day activity counters (see services/activity.py)"""
+    __tablename__ = 'daily_activity'
+
+    day = db.Column(db.Date, primary_key=True)
+    questions = db.Column(db.Integer, nullable=False, default=0)
+    answers = db.Column(db.Integer, nullable=False, default=0)
+    votes = db.Column(db.Integer, nullable=False, default=0)
+    new_users = db.Column(db.Integer, nullable=False, default=0)
+    accepted_answers = db.Column(db.Integer, nullable=False, default=0)
+
+class ContentVersion(db.Model):
+    """Version of one scope of the public pages, bumped by the writes that change it"""
+    __tablename__ = 'content_versions'
+
+    scope = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyTagActivity(db.Model):
+    """Per-day, per-tag activity counters"""
+    __tablename__ = 'daily_tag_activity'
+
+    day = db.Column(db.Date, primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+    questions = db.Column(db.Integer, nullable=False, default=0)
+    answers = db.Column(db.Integer, nullable=False, default=0)
+
+class TagSubscription(db.Model):
+    """A user's interest in a tag: followed, unfollowed, or implied by asking or answering in it"""
+    __tablename__ = 'tag_subscription'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tag.id'), primary_key=True, index=True)
+    source = db.Column(db.String(10), nullable=False)  # follow, activity, unfollow
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Job(db.Model):
+    """A background job waiting to run, running, or failed for good (services/jobs.py)"""
+    __tablename__ = 'job'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON keyword arguments for the handler
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued, running, failed, done
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_job_status_run_after', 'status', 'run_after'),)
+
+write_queue = WriteQueue(
+    app, db,
+    max_batch=app.config['SQLITE_WRITE_BATCH_SIZE'],
+    max_wait=app.config['SQLITE_WRITE_BATCH_WAIT'],
+    enabled=sqlite_performance_mode
+)
+
+job_queue = JobQueue(
+    app, db, Job, write_queue,
+    workers=app.config['JOB_QUEUE_WORKERS'],
+    processes=app.config['JOB_QUEUE_PROCESSES'],
+    max_attempts=app.config['JOB_QUEUE_MAX_ATTEMPTS'],
+    retry_delay=app.config['JOB_QUEUE_RETRY_DELAY'],
+    poll_interval=app.config['JOB_QUEUE_POLL_INTERVAL'],
+    lease=app.config['JOB_QUEUE_LEASE'],
+    max_pending=app.config['JOB_QUEUE_MAX_PENDING'],
+    enabled=app.config['JOB_QUEUE_ENABLED']
+)
+job_queue.connect()
+
+reputation_ledger = ReputationLedger(db, User, ReputationEvent, Question, Answer, Vote)
+reputation_ledger.connect()
+
+badge_engine = BadgeEngine(db, User, Badge, UserBadge, Notification, Question, Answer, Vote, job_queue)
+badge_engine.connect()
+
+leaderboards = LeaderboardService(
+    db, User, ReputationEvent,
+    refresh_interval=app.config['LEADERBOARD_REFRESH_INTERVAL']
+)
+leaderboards.connect()
+
+activity_rollups = ActivityRollups(
+    db, DailyActivity, DailyTagActivity, User, Question, Answer, Vote, question_tags
+)
+activity_rollups.connect()
+
+platform_stats = PlatformStats(
+    db, User, Question, Answer, Tag, Badge, UserBadge, question_tags,
+    ttl=app.config['STATS_CACHE_TTL']
+)
+
+tag_repository = TagRepository(db, Tag)
+tag_repository.connect()
+
+tag_subscriptions = TagSubscriptions(
+    db, TagSubscription, Question, Answer, question_tags, job_queue,
+    reload_interval=app.config['TAG_SUBSCRIPTIONS_RELOAD_INTERVAL']
+)
+tag_subscriptions.connect()
+
+def socket_emit(event, data, **kwargs):
+    """Emit through the realtime server's Socket.IO (realtime.py), when it is available"""
+    try:
+        from realtime import socketio
+    except ImportError:
+        return  # Real-time not available
+    socketio.emit(event, data, **kwargs)
+
+notification_fanout = NotificationFanout(
+    db, Notification, tag_subscriptions, job_queue, socket_emit,
+    chunk_size=app.config['NOTIFY_FANOUT_CHUNK_SIZE']
+)
+notification_fanout.connect()
+
+query_shapes = QueryShapes(db, User, Question, Answer, Vote, Tag, question_tags)
+
+view_counter = ViewCounter(
+    app, db, Question, User, write_queue,
+    flush_interval=app.config['VIEW_FLUSH_INTERVAL'],
+    flush_threshold=app.config['VIEW_FLUSH_THRESHOLD']
+)
+
+content_version = ContentVersionCounter(db, ContentVersion, write_queue, ttl=app.config['CONTENT_VERSION_TTL'])
+content_version.connect()
+
+response_cache = ResponseCache(
+    content_version.current,
+    max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+    ttl=app.config['RESPONSE_CACHE_TTL'],
+    directory=app.config['RESPONSE_CACHE_DIR'],
+    max_disk_entries=app.config['RESPONSE_CACHE_DIR_MAX_ENTRIES'],
+    enabled=app.config['RESPONSE_CACHE_ENABLED']
+)
+
+api_cache = ApiCache(
+    app,
+    max_entries=app.config['API_CACHE_MAX_ENTRIES'],
+    enabled=app.config['API_CACHE_ENABLED']
+)
+
+identity_cache = IdentityCache(
+    db, User, USER_SUMMARY_COLUMNS,
+    ttl=app.config['IDENTITY_CACHE_TTL'],
+    max_entries=app.config['IDENTITY_CACHE_MAX_ENTRIES'],
+    enabled=app.config['IDENTITY_CACHE_ENABLED']
+)
+identity_cache.connect()
+
+def create_notification(user_id, content, notification_type='info'):
+    """Store one notification; run as a background job after the write that caused it"""
+    db.session.add(Notification(user_id=user_id, content=content, notification_type=notification_type))
+    db.session.commit()
+
+job_queue.register('notifications.create', create_notification)
+
+def push_badge_notification(user_id, badge, notification, **extra):
+    """Push an awarded badge's stored notification to the user's open pages"""
+    try:
+        from realtime import trigger_badge_notification
+    except ImportError:
+        return  # Real-time not available
+    trigger_badge_notification(user_id, badge, notification)
+
+# Sent by the badge engine once an award has committed
+events.badge_earned.connect(push_badge_notification, weak=False)
+
 # Custom validators for password strength
 def validate_password_strength(form, field):
     """Custom validator to ensure password meets security requirements"""
@@ -252,7 +649,14 @@ class SettingsForm(FlaskForm):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # A cached snapshot; the User row itself is loaded only if a view needs it
+    return identity_cache.load(int(user_id))
+
+@app.errorhandler(UserDeleted)
+def handle_user_deleted(error):
+    # Another worker deleted the account while this one still had it cached
+    logout_user()
+    return login_manager.unauthorized()
 
 # Initialize AI engines (will be created when needed)
 ai_engine = None
@@ -277,6 +681,7 @@ def get_ai_engines():
     return (ai_engine, smart_search, content_analyzer)
 
 @app.route('/')
+@response_cache.cached(args=('cursor',), scopes=lambda: [LIST_SCOPE])
 def index():
     search_form = SearchForm()
     
@@ -308,15 +713,47 @@ def index():
         except Exception as e:
             print(f"Trending topics not available: {e}")
     
-    # Get all questions
-    questions = Question.query.order_by(Question.created_at.desc()).all()
+    # Get one page of questions, newest first
+    try:
+        questions, next_cursor = keyset_page(
+            query_shapes.question_cards(Question.query), Question,
+            cursor=request.args.get('cursor'),
+            per_page=app.config['QUESTIONS_PER_PAGE']
+        )
+    except InvalidCursor:
+        return redirect(url_for('index'))
     
     return render_template('index.html', 
                          questions=questions, 
+                         next_cursor=next_cursor,
                          search_form=search_form,
                          recommended_questions=recommended_questions,
                          trending_topics=trending_topics)
 
+@app.route('/feed')
+def question_feed():
+    """Next page of home page question cards, for infinite scroll"""
+    try:
+        questions, next_cursor = keyset_page(
+            query_shapes.question_cards(Question.query), Question,
+            cursor=request.args.get('cursor'),
+            per_page=app.config['QUESTIONS_PER_PAGE']
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    html = render_template_string(
+        "{% for question in questions %}{% include 'question_card.html' %}{% endfor %}",
+        questions=questions
+    )
+    
+    return jsonify({
+        'html': html,
+        'next_cursor': next_cursor,
+        'next_url': url_for('question_feed', cursor=next_cursor) if next_cursor else None,
+        'next_page_url': url_for('index', cursor=next_cursor) if next_cursor else None
+    })
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
@@ -360,6 +797,8 @@ def register():
                 password_hash=generate_password_hash(form.password.data)
             )
             db.session.add(user)
+            db.session.flush()
+            events.user_registered.send(user)
             db.session.commit()
             flash('Registration successful! Please login.', 'success')
             return redirect(url_for('login'))
@@ -386,15 +825,12 @@ def ask_question():
         )
         
         # Process tags
-        tag_names = [tag.strip() for tag in form.tags.data.split(',') if tag.strip()]
-        for tag_name in tag_names:
-            tag = Tag.query.filter_by(name=tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.session.add(tag)
-            question.tags.append(tag)
-        
+        tags = tag_repository.resolve(form.tags.data.split(','))
         db.session.add(question)
+        question.tags.extend(tags)
+        
+        db.session.flush()
+        events.question_asked.send(question)
         db.session.commit()
         flash('Question posted successfully!', 'success')
         return redirect(url_for('question_detail', id=question.id))
@@ -402,23 +838,20 @@ def ask_question():
     return render_template('ask_question.html', form=form)
 
 @app.route('/question/<int:id>')
+@response_cache.cached(on_hit=lambda id, author_id: view_counter.record(id, author_id),
+                       scopes=lambda id: [question_scope(id)])
 def question_detail(id):
-    question = Question.query.get_or_404(id)
+    question = query_shapes.question_detail(Question.query).filter(Question.id == id).first_or_404()
     form = AnswerForm()
     
-    # Increment profile views
-    if question.author:
-        question.author.profile_views += 1
-        db.session.commit()
-    
-    # Calculate vote counts
-    question_votes = sum(vote.value for vote in question.votes)
+    # Count the view; it is written to the database in the next batch
+    view_counter.record(question.id, question.user_id)
+    response_cache.remember_for_hits(author_id=question.user_id)
     
-    # Calculate answer votes and sort
-    answers_with_votes = []
-    for answer in question.answers:
-        answer_votes = sum(vote.value for vote in answer.votes)
-        answers_with_votes.append((answer, answer_votes))
+    question_votes = question.vote_score
+    # Include views not flushed yet, as the API does
+    views = (question.views or 0) + view_counter.pending_question_views(question.id)
+    answers_with_votes = [(answer, answer.vote_score) for answer in question.answers]
     
     # Sort answers: accepted first, then by vote count
     answers_with_votes.sort(key=lambda x: (not x[0].is_accepted, -x[1]))
@@ -436,6 +869,7 @@ def question_detail(id):
                          question=question, 
                          form=form, 
                          question_votes=question_votes,
+                         views=views,
                          answers_with_votes=answers_with_votes,
                          similar_questions=similar_questions,
                          quality_score=quality_score)
@@ -453,17 +887,18 @@ def post_answer(question_id):
             question_id=question_id
         )
         db.session.add(answer)
-        db.session.commit()
+        db.session.flush()
+        events.answer_posted.send(answer)
         
-        # Create notification for question author if it's not their own answer
-        if question.author.id != current_user.id:
-            notification = Notification(
-                user_id=question.author.id,
+        # Notify the question author if it's not their own answer
+        if question.user_id != current_user.id:
+            job_queue.enqueue(
+                'notifications.create',
+                user_id=question.user_id,
                 content=f"{current_user.username} answered your question: '{question.title[:50]}...'",
                 notification_type='info'
             )
-            db.session.add(notification)
-            db.session.commit()
+        db.session.commit()
         
         flash('Answer posted successfully!', 'success')
     
@@ -480,6 +915,7 @@ def vote():
     if not all([item_type, item_id, value is not None]):
         return jsonify({'success': False, 'error': 'Missing required fields'}), 400
     
+    vote = previous_value = None
     if item_type == 'question':
         existing_vote = Vote.query.filter_by(
             user_id=current_user.id,
@@ -488,7 +924,9 @@ def vote():
         ).first()
         
         if existing_vote:
+            previous_value = existing_vote.value
             existing_vote.value = value
+            vote = existing_vote
         else:
             vote = Vote(
                 value=value,
@@ -505,7 +943,9 @@ def vote():
         ).first()
         
         if existing_vote:
+            previous_value = existing_vote.value
             existing_vote.value = value
+            vote = existing_vote
         else:
             vote = Vote(
                 value=value,
@@ -514,6 +954,9 @@ def vote():
             )
             db.session.add(vote)
     
+    if vote is not None:
+        db.session.flush()
+        events.vote_cast.send(vote, previous_value=previous_value)
     db.session.commit()
     
     # Return new vote count
@@ -536,23 +979,27 @@ def accept_answer(answer_id):
         flash('Only the question author can accept answers', 'danger')
         return redirect(url_for('question_detail', id=question.id))
     
-    # Unaccept all other answers
-    for ans in question.answers:
-        ans.is_accepted = False
-    
-    # Accept this answer
-    answer.is_accepted = True
-    db.session.commit()
+    if not answer.is_accepted:
+        # Unaccept all other answers
+        previous = None
+        for ans in question.answers:
+            if ans.is_accepted:
+                previous = ans
+            ans.is_accepted = False
+        
+        # Accept this answer
+        answer.is_accepted = True
+        events.answer_accepted.send(answer, previous=previous)
     
-    # Create notification for answer author
-    if answer.author.id != current_user.id:
-        notification = Notification(
-            user_id=answer.author.id,
+    # Notify the answer author
+    if answer.user_id != current_user.id:
+        job_queue.enqueue(
+            'notifications.create',
+            user_id=answer.user_id,
             content=f"Your answer to '{question.title[:50]}...' was accepted!",
             notification_type='success'
         )
-        db.session.add(notification)
-        db.session.commit()
+    db.session.commit()
     
     flash('Answer accepted!', 'success')
     return redirect(url_for('question_detail', id=question.id))
@@ -579,7 +1026,8 @@ def search():
         
         search_time = round((time.time() - start_time) * 1000, 2)  # in milliseconds
         
-        # Sort by creation date
+        # Reload the matches with everything the result cards show, then sort by creation date
+        questions = query_shapes.question_cards_by_id([question.id for question in questions])
         questions.sort(key=lambda x: x.created_at, reverse=True)
     
     return render_template('search_results.html', questions=questions, form=form, query=request.args.get('q', ''), search_time=search_time)
@@ -589,23 +1037,21 @@ def user_profile(username):
     """View user profile page"""
     user = User.query.filter_by(username=username).first_or_404()
 
-    # Update user reputation and badge
-    user.reputation = user.calculate_reputation()
-    user.update_badge_level()
-    db.session.commit()
-
     # Get user's questions and answers
-    questions = Question.query.filter_by(user_id=user.id).order_by(Question.created_at.desc()).limit(10).all()
-    answers = Answer.query.filter_by(user_id=user.id).order_by(Answer.created_at.desc()).limit(10).all()
+    questions = query_shapes.question_cards(Question.query.filter_by(user_id=user.id))\
+        .order_by(Question.created_at.desc()).limit(10).all()
+    answers = query_shapes.answer_cards(Answer.query.filter_by(user_id=user.id))\
+        .order_by(Answer.created_at.desc()).limit(10).all()
 
     # Calculate statistics
     stats = {
-        'questions_asked': len(user.questions),
-        'answers_given': len(user.answers),
-        'accepted_answers': len([a for a in user.answers if a.is_accepted]),
+        'questions_asked': user.questions_count or 0,
+        'answers_given': user.answers_count or 0,
+        'accepted_answers': user.accepted_answers_count or 0,
         'reputation': user.reputation,
         'badge_level': user.badge_level,
-        'profile_views': user.profile_views,
+        # Include views not flushed yet, as the question page does
+        'profile_views': (user.profile_views or 0) + view_counter.pending_author_views(user.id),
         'joined_date': user.created_at.strftime('%B %Y')
     }
 
@@ -620,6 +1066,7 @@ def user_profile(username):
 def settings():
     """User settings page"""
     form = SettingsForm()
+    profile_views = (current_user.profile_views or 0) + view_counter.pending_author_views(current_user.id)
 
     if form.validate_on_submit():
         # Update user information
@@ -632,7 +1079,7 @@ def settings():
                 flash('Password updated successfully!', 'success')
             else:
                 flash('Current password is incorrect!', 'error')
-                return render_template('settings.html', form=form)
+                return render_template('settings.html', form=form, profile_views=profile_views)
 
         db.session.commit()
         flash('Settings updated successfully!', 'success')
@@ -641,7 +1088,7 @@ def settings():
     # Pre-fill form with current data
     form.email.data = current_user.email
 
-    return render_template('settings.html', form=form)
+    return render_template('settings.html', form=form, profile_views=profile_views)
 
 @app.route('/delete_account', methods=['POST'])
 @login_required
@@ -653,9 +1100,10 @@ def delete_account():
 
         if confirmation and confirmation.lower() == 'delete my account':
             # Delete user's questions, answers, and votes
-            user = current_user
+            user = db.session.get(User, current_user.id)
 
-            # Delete votes first
+            # Delete votes first, taking back the reputation they gave
+            reputation_ledger.withdraw_votes(user.id)
             Vote.query.filter_by(user_id=user.id).delete()
 
             # Delete answers
@@ -667,8 +1115,15 @@ def delete_account():
             # Delete user badges
             UserBadge.query.filter_by(user_id=user.id).delete()
 
+            # Delete reputation history
+            ReputationEvent.query.filter_by(user_id=user.id).delete()
+
+            # Delete tag subscriptions
+            tag_subscriptions.remove_user(user.id)
+
             # Delete user
             db.session.delete(user)
+            content_version.bump()
             db.session.commit()
 
             logout_user()
@@ -725,37 +1180,61 @@ def mark_all_notifications_read():
     
     return jsonify({'success': True})
 
+@app.route('/api/stats')
+def get_stats():
+    """Platform statistics polled by the dashboard"""
+    return jsonify(platform_stats.snapshot())
+
+def metrics_authorized():
+    """Whether the request carries METRICS_TOKEN; without one configured, nobody is"""
+    token = app.config['METRICS_TOKEN']
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+@app.route('/api/metrics/db-pool')
+def db_pool_metrics():
+    """Connection pool usage for this worker process, per database bind"""
+    if not metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(pool_report(pool_metrics))
+
+@app.route('/api/metrics/jobs')
+def job_metrics():
+    """Background job queue depth and outcomes, per job type"""
+    if not metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify(job_queue.metrics())
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
     """Enhanced user dashboard with analytics"""
     user = current_user
     
-    # Update user reputation and badge
-    user.reputation = user.calculate_reputation()
-    user.update_badge_level()
-    db.session.commit()
-    
     # User statistics
     stats = {
-        'questions_asked': len(user.questions),
-        'answers_given': len(user.answers),
-        'accepted_answers': len([a for a in user.answers if a.is_accepted]),
+        'questions_asked': user.questions_count or 0,
+        'answers_given': user.answers_count or 0,
+        'accepted_answers': user.accepted_answers_count or 0,
+        'votes_cast': user.votes_count or 0,
         'reputation': user.reputation,
         'badge_level': user.badge_level,
-        'profile_views': user.profile_views
+        'profile_views': (user.profile_views or 0) + view_counter.pending_author_views(user.id)
     }
     
     # Recent activity
-    recent_questions = Question.query.filter_by(user_id=user.id).order_by(Question.created_at.desc()).limit(5).all()
-    recent_answers = Answer.query.filter_by(user_id=user.id).order_by(Answer.created_at.desc()).limit(5).all()
+    recent_questions = query_shapes.question_cards(Question.query.filter_by(user_id=user.id))\
+        .order_by(Question.created_at.desc()).limit(5).all()
+    recent_answers = query_shapes.answer_cards(Answer.query.filter_by(user_id=user.id))\
+        .order_by(Answer.created_at.desc()).limit(5).all()
     
     # Badges
     user_badges = UserBadge.query.filter_by(user_id=user.id).order_by(UserBadge.earned_at.desc()).all()
     
     # Get AI engines and recommended questions
     ai_engine, smart_search, content_analyzer = get_ai_engines()
-    recommended = ai_engine.recommend_questions_for_user(user.id, limit=10)
+    recommended = query_shapes.question_cards_by_id(
+        [question.id for question in ai_engine.recommend_questions_for_user(user.id, limit=10)]
+    )
     
     return render_template('dashboard.html', 
                          user=user, 
@@ -783,68 +1262,21 @@ def notifications():
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        # Bring the schema up to date (see migrations/)
+        for version, name in migrations.upgrade(db.engine, db.metadata):
+            print(f'Applied migration {version:04d} {name}')
         
         # Add sample data if database is empty
         if User.query.count() == 0:
-            # Create sample users
-            user1 = User(username='john_doe', email='john@example.com', password_hash=generate_password_hash('password123'))
-            user2 = User(username='jane_smith', email='jane@example.com', password_hash=generate_password_hash('password123'))
-            db.session.add(user1)
-            db.session.add(user2)
-            db.session.commit()
-            
-            # Create sample tags
-            tag1 = Tag(name='python')
-            tag2 = Tag(name='flask')
-            tag3 = Tag(name='database')
-            tag4 = Tag(name='javascript')
-            tag5 = Tag(name='html')
-            db.session.add_all([tag1, tag2, tag3, tag4, tag5])
-            db.session.commit()
-            
-            # Create sample questions
-            question1 = Question(
-                title='How to connect Flask to SQLite database?',
-                content='I am new to Flask and want to connect my application to a SQLite database. What are the steps I need to follow?',
-                user_id=user1.id
-            )
-            question1.tags.extend([tag1, tag2, tag3])
-            
-            question2 = Question(
-                title='JavaScript vs Python for web development?',
-                content='I am trying to decide between JavaScript and Python for web development. What are the pros and cons of each?',
-                user_id=user2.id
-            )
-            question2.tags.extend([tag1, tag4])
-            
-            question3 = Question(
-                title='Best practices for HTML forms?',
-                content='What are the best practices for creating accessible and user-friendly HTML forms?',
-                user_id=user1.id
-            )
-            question3.tags.extend([tag5])
-            
-            db.session.add_all([question1, question2, question3])
-            db.session.commit()
-            
-            # Add some sample answers
-            answer1 = Answer(
-                content='To connect Flask to SQLite, you need to use Flask-SQLAlchemy. First install it with pip, then configure your app with the database URI, and define your models. The database will be created automatically.',
-                user_id=user2.id,
-                question_id=question1.id
-            )
-            
-            answer2 = Answer(
-                content='Python is great for backend development and has excellent frameworks like Flask and Django. JavaScript is essential for frontend development and can also be used for backend with Node.js. The choice depends on your specific needs.',
-                user_id=user1.id,
-                question_id=question2.id,
-                is_accepted=True
-            )
-            
-            db.session.add_all([answer1, answer2])
-            db.session.commit()
-            
+            seed_starter_content(db, User, Question, Answer, tag_repository)
+            reputation_ledger.rebuild()
+            badge_engine.backfill()
+            activity_rollups.backfill()
+            tag_subscriptions.backfill()
             print('Sample data added successfully!')
+        
+        tag_subscriptions.load()
+        # Run jobs a previous run left in the table
+        job_queue.start()
     
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Rebuild the daily activity rollup tables from existing questions, answers, votes and users
+"""
+
+import migrations
+from app import app, db, activity_rollups
+
+def backfill_activity():
+    with app.app_context():
+        print("=== Backfilling daily activity rollups ===")
+        migrations.upgrade(db.engine, db.metadata)
+
+        days = activity_rollups.backfill()
+        print(f"✅ Wrote activity for {days} days")
+
+if __name__ == '__main__':
+    backfill_activity()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Render the stored HTML, plain text and excerpt of every question and answer
+
+Rows written before the columns existed are rendered by the v0005 migration;
+run this with --all after changing utils/content.py to re-render everything.
+"""
+
+import argparse
+
+import migrations
+from app import app, db, content_version, Question, Answer
+from utils import content as content_pipeline
+
+def backfill_content(render_all=False):
+    with app.app_context():
+        print("=== Backfilling rendered content ===")
+        migrations.upgrade(db.engine, db.metadata)
+
+        with db.engine.begin() as connection:
+            for model in (Question, Answer):
+                rows = content_pipeline.backfill(connection, model.__table__, only_missing=not render_all)
+                print(f"✅ Rendered {rows} {model.__tablename__} rows")
+
+        # Cached pages were rendered from the old columns
+        content_version.bump()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--all', action='store_true', help='re-render rows that already have rendered content')
+    backfill_content(parser.parse_args().all)
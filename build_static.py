@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Fingerprint and precompress the files under static/ for deployment
+"""
+
+from app import app
+from utils import static_assets
+
+def build_static():
+    print("=== Building static assets ===")
+    manifest = static_assets.build(
+        app.static_folder,
+        gzip_level=app.config['COMPRESS_LEVEL_STATIC'],
+        brotli_quality=app.config['COMPRESS_BROTLI_QUALITY_STATIC']
+    )
+    for filename, asset in sorted(manifest['assets'].items()):
+        encodings = ', '.join(asset['encodings']) or 'uncompressed'
+        print(f"✅ {filename} -> {asset['path']} ({encodings})")
+    print("Restart the app to serve the new build")
+
+if __name__ == '__main__':
+    build_static()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Check that notifications reach users through the realtime server
+
+Runs the app against a throwaway SQLite file with the realtime server's
+Socket.IO emits recorded instead of sent, makes the writes that notify
+someone, and checks what was pushed to whom once their background jobs
+have run.
+
+    python check_notifications.py     # exit status 1 if a notification isn't pushed
+"""
+
+import os
+import sys
+import tempfile
+
+# Must be set before the app module configures the database
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'notifications.db')
+
+from werkzeug.security import generate_password_hash
+
+import migrations
+
+from app import app, db, User, Tag, job_queue, tag_subscriptions
+from init_badges import init_badges
+
+PASSWORD = 'Passw0rd!'
+
+
+def seed():
+    for username in ('asker', 'follower'):
+        db.session.add(User(username=username, email=f'{username}@example.com',
+                            password_hash=generate_password_hash(PASSWORD)))
+    tag = Tag(name='testing')
+    db.session.add(tag)
+    db.session.flush()
+    tag_subscriptions.follow(2, tag.id)
+    db.session.commit()
+
+
+def login(client, username):
+    client.get('/logout')
+    client.post('/login', data={'username': username, 'password': PASSWORD})
+
+
+def pushed(emits, room, text):
+    """Whether a notification containing ``text`` was emitted to ``room``"""
+    for args, kwargs in emits:
+        rooms = kwargs.get('to') or kwargs.get('room')
+        rooms = rooms if isinstance(rooms, list) else [rooms]
+        if args[0] == 'notification' and room in rooms and text in args[1]['content']:
+            return True
+    return False
+
+
+def check_notifications():
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    import realtime
+    emits = []
+    realtime.socketio.emit = lambda *args, **kwargs: emits.append((args, kwargs))
+
+    with app.app_context():
+        migrations.upgrade(db.engine, db.metadata)
+        seed()
+    init_badges()
+
+    client = app.test_client()
+    login(client, 'asker')
+    client.post('/ask', data={'title': 'How do I check notifications?',
+                              'content': 'What should I check?', 'tags': 'testing'})
+    job_queue.join(10)
+    with app.app_context():
+        jobs_left = job_queue.metrics()
+
+    checks = [
+        ('badge award is pushed', pushed(emits, 'user_1', 'First Question')),
+        ('new question is pushed to tag followers', pushed(emits, 'user_2', 'How do I check notifications?')),
+        ('new question is not pushed to its author', not pushed(emits, 'user_1', 'How do I check notifications?')),
+        ('fan-out jobs are all finished', not any(
+            jobs_left.get(job_type, {}).get('table') for job_type in jobs_left if 'notifications' in job_type)),
+    ]
+
+    failures = 0
+    for name, ok in checks:
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if check_notifications() else 0)
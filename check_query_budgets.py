@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Check that list and detail endpoints run a bounded number of SQL statements
+
+Seeds a throwaway SQLite database with enough users, questions, answers,
+tags and votes that a per-row lazy load would blow the budget, requests
+every endpoint as a logged-in user and fails if any of them executes more
+statements than allowed. With --explain it also asks the database for the
+plan of every SELECT and fails on full table scans not listed in
+EXPECTED_FULL_SCANS.
+
+    python check_query_budgets.py            # exit status 1 if a budget is exceeded
+    python check_query_budgets.py --explain  # ... or a query scans a whole table
+    python check_query_budgets.py -v         # also print each endpoint's statements
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+# Must be set before the app module configures the database
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'query_budgets.db')
+
+from werkzeug.security import generate_password_hash
+
+import migrations
+
+from app import app, db, User, Question, Answer, Tag, Vote, badge_engine
+from rest_api import register_api_blueprints
+from utils.explain import full_scans
+from utils.sql import count_statements
+
+SEED_USERS = 5
+SEED_QUESTIONS = 40
+ANSWERS_PER_QUESTION = 3
+
+# Maximum statements per request, independent of how many rows are shown
+BUDGETS = {
+    # The home page also runs one sample query per trending tag (at most 5)
+    '/': 16,
+    '/feed': 3,
+    '/question/1': 6,
+    '/search?q=Question': 6,
+    '/profile/user0': 5,
+    '/dashboard': 12,
+    '/api/v1/questions': 4,
+    '/api/v1/questions?cursor=': 3,
+    '/api/v1/questions/1': 4,
+    '/api/v1/tags': 2,
+    '/api/v1/users': 3,
+    '/api/v1/users/1': 2,
+    '/api/v1/users/me': 1,
+    '/api/v1/users/1/questions': 4,
+    '/api/v1/users/2/answers': 4,
+}
+
+
+# Tables an endpoint is expected to read in full, because it lists or ranks all of them
+EXPECTED_FULL_SCANS = {
+    '/': {'question'},                              # recommendations rank every question
+    '/question/1': {'question'},                    # similar questions compare every question
+    '/search?q=Question': {'question', 'tag'},      # substring match; tag name lookup
+    '/dashboard': {'question'},                     # recommendations
+    '/api/v1/tags': {'tag'},                        # lists every tag
+}
+
+
+def seed():
+    users = [User(username=f'user{i}', email=f'user{i}@example.com',
+                  password_hash=generate_password_hash('Passw0rd!'))
+             for i in range(SEED_USERS)]
+    tags = [Tag(name=f'tag{i}') for i in range(6)]
+    db.session.add_all(users + tags)
+    db.session.flush()
+
+    for i in range(SEED_QUESTIONS):
+        question = Question(title=f'Question {i}', content=f'Question body {i}',
+                            user_id=users[i % SEED_USERS].id)
+        db.session.add(question)
+        question.tags = [tags[i % 6], tags[(i + 1) % 6]]
+        for j in range(ANSWERS_PER_QUESTION):
+            answer = Answer(content=f'Answer {j}', user_id=users[(i + j + 1) % SEED_USERS].id,
+                            is_accepted=j == 0)
+            answer.votes.append(Vote(value=1, user_id=users[j].id))
+            question.answers.append(answer)
+        question.votes.append(Vote(value=1, user_id=users[(i + 2) % SEED_USERS].id))
+
+    db.session.flush()
+    badge_engine.refresh_counters()
+    db.session.commit()
+
+
+def check_query_budgets(verbose=False, explain=False):
+    app.config['WTF_CSRF_ENABLED'] = False
+    register_api_blueprints(app)
+
+    with app.app_context():
+        migrations.upgrade(db.engine, db.metadata)
+        seed()
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'user0', 'password': 'Passw0rd!'})
+
+    failures = 0
+    with app.app_context():
+        for path, budget in BUDGETS.items():
+            with count_statements(db.engine) as statements:
+                response = client.get(path)
+            over = response.status_code != 200 or len(statements) > budget
+            failures += over
+            print(f"{'❌' if over else '✅'} {path}: {len(statements)}/{budget} statements"
+                  f"{'' if response.status_code == 200 else f' (HTTP {response.status_code})'}")
+            if verbose or over:
+                for statement, parameters in statements:
+                    print('      ' + ' '.join(statement.split())[:160])
+            if explain:
+                failures += check_full_scans(path, statements)
+
+    return failures
+
+
+def check_full_scans(path, statements):
+    """Report the full table scans in ``statements``; returns the number of unexpected ones"""
+    tables = set(db.metadata.tables)
+    expected = EXPECTED_FULL_SCANS.get(path, set())
+    unexpected = 0
+    with db.engine.connect() as connection:
+        for statement, parameters in statements:
+            for table in full_scans(connection, statement, parameters, tables):
+                allowed = table in expected
+                unexpected += not allowed
+                print(f"   {'⚪' if allowed else '❌'} full scan of {table}: {' '.join(statement.split())[:120]}")
+    return unexpected
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-v', '--verbose', action='store_true', help="print every endpoint's statements")
+    parser.add_argument('--explain', action='store_true', help='also fail on unexpected full table scans')
+    args = parser.parse_args()
+    sys.exit(1 if check_query_budgets(verbose=args.verbose, explain=args.explain) else 0)
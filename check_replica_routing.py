@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Check that read-only requests are served from the read replica
+
+Runs the app against two throwaway SQLite files, a primary and a replica
+copied from it, and checks where each request's statements go: anonymous
+pages and REST GETs to the replica, writes to the primary, and reads right
+after a write to the primary until the stickiness window has passed.
+
+    python check_replica_routing.py     # exit status 1 if a request is routed wrongly
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Must be set before the app module configures the database
+_directory = tempfile.mkdtemp()
+PRIMARY_PATH = os.path.join(_directory, 'primary.db')
+REPLICA_PATH = os.path.join(_directory, 'replica.db')
+STICKY_SECONDS = 1
+os.environ['DATABASE_URL'] = 'sqlite:///' + PRIMARY_PATH
+os.environ['REPLICA_DATABASE_URLS'] = 'sqlite:///' + REPLICA_PATH
+os.environ['REPLICA_STICKY_SECONDS'] = str(STICKY_SECONDS)
+
+from flask import g
+from werkzeug.security import generate_password_hash
+
+import migrations
+
+from app import app, db, User, Question
+from rest_api import register_api_blueprints
+from utils.sql import count_statements
+
+
+def seed():
+    user = User(username='reader', email='reader@example.com',
+                password_hash=generate_password_hash('Passw0rd!'))
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(Question(title='Replicated question', content='Replicated question body', user_id=user.id))
+    db.session.commit()
+
+
+def replicate():
+    """Copy the primary into the replica file, as replication would"""
+    db.engine.dispose()
+    source, target = sqlite3.connect(PRIMARY_PATH), sqlite3.connect(REPLICA_PATH)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def routed_to(client, method, path, **kwargs):
+    """'primary', 'replica', 'both' or 'none', depending on which databases ``path`` queried"""
+    with count_statements(db.engine) as primary, count_statements(db.engines['replica_0']) as replica:
+        response = getattr(client, method)(path, **kwargs)
+    if response.status_code >= 400:
+        return f'HTTP {response.status_code}'
+    return {(True, True): 'both', (True, False): 'primary',
+            (False, True): 'replica', (False, False): 'none'}[bool(primary), bool(replica)]
+
+
+def check_replica_routing():
+    app.config['WTF_CSRF_ENABLED'] = False
+    register_api_blueprints(app)
+
+    with app.app_context():
+        migrations.upgrade(db.engine, db.metadata)
+        seed()
+        replicate()
+
+    client = app.test_client()
+    checks = [
+        ('anonymous home page', lambda: routed_to(client, 'get', '/'), 'replica'),
+        ('anonymous question page', lambda: routed_to(client, 'get', '/question/1'), 'replica'),
+        ('REST question list', lambda: routed_to(client, 'get', '/api/v1/questions'), 'replica'),
+        ('login', lambda: routed_to(client, 'post', '/login',
+                                    data={'username': 'reader', 'password': 'Passw0rd!'}), 'primary'),
+        ('page right after a write', lambda: routed_to(client, 'get', '/question/1'), 'primary'),
+        ('page once the write is old', lambda: time.sleep(STICKY_SECONDS + 0.1) or
+                                               routed_to(client, 'get', '/question/1'), 'replica'),
+        ('write during a read-only request', check_flush_during_read, 'primary'),
+    ]
+
+    failures = 0
+    with app.app_context():
+        for name, check, expected in checks:
+            routed = check()
+            failures += routed != expected
+            print(f"{'✅' if routed == expected else '❌'} {name}: {routed} (expected {expected})")
+    return failures
+
+
+def check_flush_during_read():
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        with count_statements(db.engine) as primary:
+            db.session.add(Question(title='Written during a GET', content='Written during a GET', user_id=1))
+            db.session.flush()
+            db.session.rollback()
+        return 'primary' if primary and g.db_replica is None and g.db_wrote else 'replica'
+
+
+if __name__ == '__main__':
+    sys.exit(1 if check_replica_routing() else 0)
@@ -3,8 +3,7 @@
 Initialize badge system for Q&A Platform
 """
 
-from app import app, db, Badge, UserBadge, User
-from datetime import datetime
+from app import app, db, Badge, UserBadge, User, badge_engine
 
 def init_badges():
     """Initialize the badge system with predefined badges"""
@@ -110,6 +109,7 @@ def init_badges():
                 print(f"⚠️ Badge already exists: {badge_data['name']}")
         
         db.session.commit()
+        badge_engine.reload_rules()
         print(f"✅ Badge system initialized with {len(badges_data)} badges")
 
 def check_and_award_badges(user_id):
@@ -117,66 +117,22 @@ def check_and_award_badges(user_id):
     with app.app_context():
         user = User.query.get(user_id)
         if not user:
-            return
-        
-        # Update user stats
-        user.reputation = user.calculate_reputation()
-        user.update_badge_level()
-        
-        # Calculate user statistics
-        stats = {
-            'questions': len(user.questions),
-            'answers': len(user.answers),
-            'accepted_answers': len([a for a in user.answers if a.is_accepted]),
-            'reputation': user.reputation,
-            'votes': len(user.votes),
-            'early_adopter': 1 if (datetime.utcnow() - user.created_at).days <= 30 else 0
-        }
-        
-        # Check each badge
-        badges = Badge.query.all()
-        newly_earned = []
-        
-        for badge in badges:
-            # Check if user already has this badge
-            existing = UserBadge.query.filter_by(user_id=user_id, badge_id=badge.id).first()
-            if existing:
-                continue
-            
-            # Check if user meets requirements
-            requirement_type = badge.requirement_type
-            requirement_value = badge.requirement_value
-            
-            if requirement_type in stats and stats[requirement_type] >= requirement_value:
-                # Award badge
-                user_badge = UserBadge(user_id=user_id, badge_id=badge.id)
-                db.session.add(user_badge)
-                newly_earned.append(badge.name)
-                print(f"🏆 {user.username} earned badge: {badge.name}")
+            return []
         
+        newly_earned = badge_engine.evaluate_all(user_id)
         if newly_earned:
             db.session.commit()
-            
-            # Trigger notifications for new badges
-            try:
-                from realtime import trigger_badge_notification
-                for badge_name in newly_earned:
-                    trigger_badge_notification(user_id, badge_name)
-            except ImportError:
-                pass  # Real-time not available
+            for badge_name in newly_earned:
+                print(f"🏆 {user.username} earned badge: {badge_name}")
         
         return newly_earned
 
 def award_badges_to_all_users():
-    """Check and award badges to all existing users"""
+    """Recount activity and award earned badges to all users in bulk"""
     with app.app_context():
-        users = User.query.all()
-        print(f"Checking badges for {len(users)} users...")
+        print(f"Checking badges for {User.query.count()} users...")
         
-        total_badges_awarded = 0
-        for user in users:
-            badges = check_and_award_badges(user.id)
-            total_badges_awarded += len(badges)
+        total_badges_awarded = badge_engine.backfill()
         
         print(f"✅ Awarded {total_badges_awarded} badges total")
 
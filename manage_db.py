@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Create, migrate and seed the database
+
+    python manage_db.py upgrade                      # apply pending migrations
+    python manage_db.py status                       # list applied and pending migrations
+    python manage_db.py seed                         # starter users, questions and badges
+    python manage_db.py seed --demo --samples        # plus demo accounts and 100 sample questions
+    python manage_db.py reset --demo --samples       # drop everything, then upgrade and seed
+"""
+
+import argparse
+
+import migrations
+from app import (
+    app, db, User, Question, Answer, tag_repository, reputation_ledger, badge_engine, activity_rollups,
+    tag_subscriptions
+)
+from migrations.seed import DEMO_USERS, seed_starter_content, seed_users
+
+def upgrade():
+    applied = migrations.upgrade(db.engine, db.metadata)
+    for version, name in applied:
+        print(f"✅ Applied {version:04d} {name}")
+    if not applied:
+        print("✅ Database is up to date")
+
+def status():
+    applied = migrations.applied(db.engine)
+    for version, name, module in migrations.available():
+        state = f"applied {applied[version]:%Y-%m-%d %H:%M}" if version in applied else "pending"
+        print(f"{version:04d} {name:<30} {state}")
+
+def seed(demo=False, samples=False):
+    from init_badges import init_badges
+
+    questions = seed_starter_content(db, User, Question, Answer, tag_repository)
+    print(f"✅ Starter content ({questions} questions)")
+    if demo:
+        for user in seed_users(db, User, DEMO_USERS):
+            print(f"✅ Created demo user: {user.username}")
+    init_badges()
+    if samples:
+        from add_sample_questions import create_sample_questions
+        create_sample_questions()
+
+    # Seeded rows bypass the domain events, so recompute everything derived from them
+    reputation_ledger.rebuild()
+    awarded = badge_engine.backfill()
+    days = activity_rollups.backfill()
+    subscriptions = tag_subscriptions.backfill()
+    print(f"✅ Recomputed reputation, {awarded} badges, {days} days of activity and {subscriptions} tag subscriptions")
+
+def reset():
+    db.drop_all()
+    migrations.schema_migrations.drop(db.engine, checkfirst=True)
+    print("✅ Dropped all existing tables")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', nargs='?', default='upgrade', choices=['upgrade', 'status', 'seed', 'reset'])
+    parser.add_argument('--demo', action='store_true', help='also create the demo accounts (local development only)')
+    parser.add_argument('--samples', action='store_true', help='also add the 100 sample questions')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.command == 'status':
+            status()
+        else:
+            if args.command == 'reset':
+                reset()
+            upgrade()
+            if args.command in ('seed', 'reset'):
+                seed(demo=args.demo, samples=args.samples)
@@ -0,0 +1,82 @@
+"""
+Versioned schema migrations
+
+Every ``v<NNNN>_<description>.py`` module in this package is one migration
+step with an ``upgrade(connection, metadata)`` function, where ``metadata``
+is the models' MetaData. ``upgrade()`` applies the steps a database hasn't
+had yet, oldest first, each in its own transaction, and records them in the
+``schema_migrations`` table.
+
+A step defines the tables and columns it touches as they were when it was
+written, and copies any app code it runs, instead of using the models or
+the current modules. ``metadata`` is still passed but the steps don't read
+it, so replaying them gives the same schema however the models change.
+
+Steps check what already exists before changing anything, so databases
+created by the old ``db.create_all()`` init scripts, in whatever state those
+left them, can be brought up to date the same way as empty ones.
+"""
+
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+from sqlalchemy.exc import IntegrityError
+
+_STEP_MODULE = re.compile(r'^v(\d{4})_(\w+)$')
+
+schema_migrations = Table(
+    'schema_migrations', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def available():
+    """[(version, name, module)] for every migration step, oldest first"""
+    steps = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = _STEP_MODULE.match(module_info.name)
+        if match:
+            module = importlib.import_module(f'{__name__}.{module_info.name}')
+            steps.append((int(match.group(1)), match.group(2), module))
+    return sorted(steps, key=lambda step: step[0])
+
+
+def applied(engine):
+    """{version: applied_at} for the steps this database has had"""
+    if not inspect(engine).has_table(schema_migrations.name):
+        return {}
+    with engine.connect() as connection:
+        return dict(connection.execute(select(schema_migrations.c.version, schema_migrations.c.applied_at)).all())
+
+
+def pending(engine):
+    """[(version, name)] of the steps not yet applied"""
+    done = applied(engine)
+    return [(version, name) for version, name, module in available() if version not in done]
+
+
+def upgrade(engine, metadata, target=None):
+    """Apply pending steps up to ``target`` (default: all). Returns [(version, name)] applied."""
+    schema_migrations.create(engine, checkfirst=True)
+    done = applied(engine)
+
+    applied_now = []
+    for version, name, module in available():
+        if version in done or (target is not None and version > target):
+            continue
+        try:
+            with engine.begin() as connection:
+                module.upgrade(connection, metadata)
+                connection.execute(schema_migrations.insert().values(
+                    version=version, name=name, applied_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            # Another process applied this step first
+            continue
+        applied_now.append((version, name))
+    return applied_now
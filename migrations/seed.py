@@ -0,0 +1,83 @@
+"""
+Starter and demo content for new databases
+
+Used by ``python app.py`` to give an empty database something to show, and
+by ``manage_db.py seed`` for local development. Rows are written directly,
+so callers recompute reputation, badges and activity rollups afterwards.
+"""
+
+from werkzeug.security import generate_password_hash
+
+STARTER_USERS = [
+    ('john_doe', 'john@example.com', 'password123'),
+    ('jane_smith', 'jane@example.com', 'password123'),
+]
+
+# Extra accounts for local development only
+DEMO_USERS = [
+    ('admin', 'admin@qa.com', 'admin123'),
+    ('expert_user', 'expert@example.com', 'expert123'),
+    ('testuser', 'test@example.com', 'testpass123'),
+]
+
+STARTER_QUESTIONS = [
+    {
+        'author': 'john_doe',
+        'title': 'How to connect Flask to SQLite database?',
+        'content': 'I am new to Flask and want to connect my application to a SQLite database. What are the steps I need to follow?',
+        'tags': ['python', 'flask', 'database'],
+        'answers': [
+            ('jane_smith', False, 'To connect Flask to SQLite, you need to use Flask-SQLAlchemy. First install it with pip, then configure your app with the database URI, and define your models. The database will be created automatically.'),
+        ],
+    },
+    {
+        'author': 'jane_smith',
+        'title': 'JavaScript vs Python for web development?',
+        'content': 'I am trying to decide between JavaScript and Python for web development. What are the pros and cons of each?',
+        'tags': ['python', 'javascript'],
+        'answers': [
+            ('john_doe', True, 'Python is great for backend development and has excellent frameworks like Flask and Django. JavaScript is essential for frontend development and can also be used for backend with Node.js. The choice depends on your specific needs.'),
+        ],
+    },
+    {
+        'author': 'john_doe',
+        'title': 'Best practices for HTML forms?',
+        'content': 'What are the best practices for creating accessible and user-friendly HTML forms?',
+        'tags': ['html'],
+        'answers': [],
+    },
+]
+
+
+def seed_users(db, user_model, users):
+    """Create the (username, email, password) users that don't exist yet. Returns the new ones."""
+    existing = {username for (username,) in db.session.query(user_model.username).filter(
+        user_model.username.in_([username for username, email, password in users])
+    )}
+    created = [
+        user_model(username=username, email=email, password_hash=generate_password_hash(password))
+        for username, email, password in users if username not in existing
+    ]
+    db.session.add_all(created)
+    db.session.commit()
+    return created
+
+
+def seed_starter_content(db, user_model, question_model, answer_model, tag_repository):
+    """Starter users, plus the starter questions if there are no questions yet"""
+    seed_users(db, user_model, STARTER_USERS)
+    if db.session.query(question_model.id).first() is not None:
+        return 0
+
+    users = {user.username: user for user in user_model.query.filter(
+        user_model.username.in_([username for username, email, password in STARTER_USERS])
+    )}
+    for data in STARTER_QUESTIONS:
+        tags = tag_repository.resolve(data['tags'])
+        question = question_model(title=data['title'], content=data['content'], user_id=users[data['author']].id)
+        db.session.add(question)
+        question.tags.extend(tags)
+        for author, accepted, content in data['answers']:
+            question.answers.append(answer_model(content=content, user_id=users[author].id, is_accepted=accepted))
+    db.session.commit()
+    return len(STARTER_QUESTIONS)
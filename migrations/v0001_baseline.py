@@ -0,0 +1,146 @@
+"""
+Create the tables of the schema migrations started from
+
+The tables are defined here as they were when this step was written, not
+taken from the models, so replaying it always creates the same schema;
+later steps add what came after. Tables that already exist are left alone.
+"""
+
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, PrimaryKeyConstraint, String, Table,
+    Text, UniqueConstraint,
+)
+
+schema = MetaData()
+
+Table(
+    'user', schema,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), nullable=False, unique=True),
+    Column('email', String(120), nullable=False, unique=True),
+    Column('password_hash', String(120), nullable=False),
+    Column('created_at', DateTime),
+    Column('reputation', Integer),
+    Column('badge_level', String(20)),
+    Column('profile_views', Integer),
+    Column('questions_count', Integer),
+    Column('answers_count', Integer),
+    Column('accepted_answers_count', Integer),
+    Column('votes_count', Integer),
+    Index('ix_user_created_at_id', 'created_at', 'id'),
+)
+
+Table(
+    'tag', schema,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(50), nullable=False, unique=True),
+)
+
+Table(
+    'badge', schema,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(50), nullable=False, unique=True),
+    Column('description', Text, nullable=False),
+    Column('icon', String(50)),
+    Column('requirement_type', String(20), nullable=False),
+    Column('requirement_value', Integer, nullable=False),
+)
+
+Table(
+    'question', schema,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(200), nullable=False),
+    Column('content', Text, nullable=False),
+    Column('created_at', DateTime),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('views', Integer),
+    Index('ix_question_created_at_id', 'created_at', 'id'),
+    Index('ix_question_user_id_created_at', 'user_id', 'created_at'),
+)
+
+Table(
+    'answer', schema,
+    Column('id', Integer, primary_key=True),
+    Column('content', Text, nullable=False),
+    Column('created_at', DateTime),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('question_id', Integer, ForeignKey('question.id'), nullable=False),
+    Column('is_accepted', Boolean),
+    Index('ix_answer_question_id', 'question_id'),
+    Index('ix_answer_user_id_created_at', 'user_id', 'created_at'),
+)
+
+Table(
+    'question_tags', schema,
+    Column('question_id', Integer, ForeignKey('question.id'), nullable=False),
+    Column('tag_id', Integer, ForeignKey('tag.id'), nullable=False),
+    PrimaryKeyConstraint('question_id', 'tag_id'),
+    Index('ix_question_tags_tag_id', 'tag_id'),
+)
+
+Table(
+    'vote', schema,
+    Column('id', Integer, primary_key=True),
+    Column('value', Integer),
+    Column('user_id', Integer, ForeignKey('user.id')),
+    Column('question_id', Integer, ForeignKey('question.id')),
+    Column('answer_id', Integer, ForeignKey('answer.id')),
+    Column('created_at', DateTime),
+    Index('ix_vote_user_id', 'user_id'),
+    Index('ix_vote_question_id', 'question_id'),
+    Index('ix_vote_answer_id', 'answer_id'),
+)
+
+Table(
+    'user_badge', schema,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('badge_id', Integer, ForeignKey('badge.id'), nullable=False),
+    Column('earned_at', DateTime),
+    UniqueConstraint('user_id', 'badge_id'),
+)
+
+Table(
+    'notification', schema,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('content', Text, nullable=False),
+    Column('notification_type', String(20)),
+    Column('is_read', Boolean),
+    Column('created_at', DateTime),
+    Index('ix_notification_user_id_is_read_created_at', 'user_id', 'is_read', 'created_at'),
+)
+
+Table(
+    'reputation_events', schema,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False, index=True),
+    Column('event_type', String(20), nullable=False),
+    Column('delta', Integer, nullable=False),
+    Column('question_id', Integer),
+    Column('answer_id', Integer),
+    Column('created_at', DateTime, index=True),
+)
+
+Table(
+    'daily_activity', schema,
+    Column('day', Date, primary_key=True),
+    Column('questions', Integer, nullable=False),
+    Column('answers', Integer, nullable=False),
+    Column('votes', Integer, nullable=False),
+    Column('new_users', Integer, nullable=False),
+    Column('accepted_answers', Integer, nullable=False),
+)
+
+Table(
+    'daily_tag_activity', schema,
+    Column('day', Date, nullable=False),
+    Column('tag_id', Integer, ForeignKey('tag.id'), nullable=False),
+    Column('questions', Integer, nullable=False),
+    Column('answers', Integer, nullable=False),
+    PrimaryKeyConstraint('day', 'tag_id'),
+)
+
+
+def upgrade(connection, metadata):
+    schema.create_all(bind=connection, checkfirst=True)
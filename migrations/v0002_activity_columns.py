@@ -0,0 +1,42 @@
+"""
+Add the columns introduced after the original schema to existing tables
+
+Tables created by v0001 already have them. Older tables get them here,
+and the per-user activity counters are then recounted from the rows.
+``question.views``, written by the batched view counter
+(services/view_counter.py), is among them: databases created before it
+existed need this step before the app can load a question.
+"""
+
+from sqlalchemy import inspect
+
+COLUMNS = [
+    ('user', 'questions_count', 'INTEGER DEFAULT 0'),
+    ('user', 'answers_count', 'INTEGER DEFAULT 0'),
+    ('user', 'accepted_answers_count', 'INTEGER DEFAULT 0'),
+    ('user', 'votes_count', 'INTEGER DEFAULT 0'),
+    ('question', 'views', 'INTEGER DEFAULT 0'),
+    ('vote', 'created_at', 'TIMESTAMP'),
+]
+
+
+def upgrade(connection, metadata):
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+
+    added = set()
+    for table, column, definition in COLUMNS:
+        existing = {info['name'] for info in inspector.get_columns(table)}
+        if column not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE {quote(table)} ADD COLUMN {quote(column)} {definition}')
+            added.add((table, column))
+
+    if any(table == 'user' for table, column in added):
+        connection.exec_driver_sql(f'''
+            UPDATE {quote('user')} SET
+                questions_count = (SELECT COUNT(*) FROM question WHERE question.user_id = {quote('user')}.id),
+                answers_count = (SELECT COUNT(*) FROM answer WHERE answer.user_id = {quote('user')}.id),
+                accepted_answers_count = (SELECT COUNT(*) FROM answer
+                                          WHERE answer.user_id = {quote('user')}.id AND answer.is_accepted),
+                votes_count = (SELECT COUNT(*) FROM vote WHERE vote.user_id = {quote('user')}.id)
+        ''')
@@ -0,0 +1,38 @@
+"""
+Index the columns the app filters, joins and sorts on
+
+Each index backs specific queries:
+
+* vote: the per-post score subqueries (question_id, answer_id) and a
+  user's existing-vote lookups and vote counts (user_id)
+* answer: a question's answers (question_id), a user's recent answers
+  (user_id, created_at)
+* question: the keyset home feed (created_at, id), a user's recent
+  questions (user_id, created_at)
+* user: the paginated user list, newest first (created_at, id)
+* notification: a user's unread notifications, newest first
+* question_tags: the questions for a tag and tag usage counts (tag_id);
+  question_id is already covered by the primary key
+"""
+
+INDEXES = [
+    ('ix_vote_user_id', 'vote', ['user_id']),
+    ('ix_vote_question_id', 'vote', ['question_id']),
+    ('ix_vote_answer_id', 'vote', ['answer_id']),
+    ('ix_answer_question_id', 'answer', ['question_id']),
+    ('ix_answer_user_id_created_at', 'answer', ['user_id', 'created_at']),
+    ('ix_question_created_at_id', 'question', ['created_at', 'id']),
+    ('ix_question_user_id_created_at', 'question', ['user_id', 'created_at']),
+    ('ix_user_created_at_id', 'user', ['created_at', 'id']),
+    ('ix_notification_user_id_is_read_created_at', 'notification', ['user_id', 'is_read', 'created_at']),
+    ('ix_question_tags_tag_id', 'question_tags', ['tag_id']),
+]
+
+
+def upgrade(connection, metadata):
+    quote = connection.dialect.identifier_preparer.quote
+    for name, table, columns in INDEXES:
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} "
+            f"({', '.join(quote(column) for column in columns)})"
+        )
@@ -0,0 +1,21 @@
+"""
+Add the content_version counter that keys the anonymous page cache
+
+Creates the table, as it was when this step was written, on databases that
+don't have it and makes sure its single row exists.
+"""
+
+from sqlalchemy import Column, Integer, MetaData, Table, select
+
+schema = MetaData()
+content_version = Table(
+    'content_version', schema,
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False),
+)
+
+
+def upgrade(connection, metadata):
+    content_version.create(connection, checkfirst=True)
+    if connection.execute(select(content_version.c.id).where(content_version.c.id == 1)).first() is None:
+        connection.execute(content_version.insert().values(id=1, version=0))
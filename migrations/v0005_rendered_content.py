@@ -0,0 +1,100 @@
+"""
+Add the rendered forms of question and answer content
+
+The models fill ``content_html``, ``content_text`` and ``excerpt`` whenever
+content is written (see utils/content.py). This adds the columns to older
+tables and renders the rows already there.
+
+Rows are rendered with a copy of the pipeline as it was when this step was
+written, so replaying it gives the same result whatever utils/content.py
+does now; ``backfill_content.py --all`` re-renders with the current one.
+"""
+
+import html
+import re
+
+from markupsafe import escape
+from sqlalchemy import Column, Integer, MetaData, String, Table, Text, bindparam, inspect, or_, select
+
+COLUMNS = [
+    ('content_html', 'TEXT'),
+    ('content_text', 'TEXT'),
+    ('excerpt', 'VARCHAR(255)'),
+]
+
+BATCH_SIZE = 500
+EXCERPT_LENGTH = 200
+EXCERPT_LEEWAY = 5
+
+_SUBSTITUTIONS = [
+    (re.compile(r'<span[^>]*style="[^"]*"[^>]*>(.*?)<\/span>'), r'\1'),
+    (re.compile(r'<p[^>]*style="[^"]*"[^>]*>'), '<p>'),
+    (re.compile(r'style="[^"]*"'), ''),
+    (re.compile(r'<p[^>]*>(.*?)<\/p>'), r'\1\n\n'),
+    (re.compile(r'<br[^>]*>'), '\n'),
+    (re.compile(r'<[^>]+>'), ''),
+    (re.compile(r'\n\s*\n'), '\n\n'),
+]
+_NEWLINE = re.compile(r'\r?\n')
+
+schema = MetaData()
+TABLES = [
+    Table(
+        name, schema,
+        Column('id', Integer, primary_key=True),
+        Column('content', Text),
+        Column('content_html', Text),
+        Column('content_text', Text),
+        Column('excerpt', String(255)),
+    )
+    for name in ('question', 'answer')
+]
+
+
+def render(content):
+    """(content_html, content_text, excerpt) for a raw question or answer body"""
+    text = content or ''
+    for pattern, replacement in _SUBSTITUTIONS:
+        text = pattern.sub(replacement, text)
+    text = html.unescape(text.strip())
+    excerpt = text
+    if len(text) > EXCERPT_LENGTH + EXCERPT_LEEWAY:
+        excerpt = text[:EXCERPT_LENGTH - 3].rsplit(' ', 1)[0] + '...'
+    return _NEWLINE.sub('<br>', str(escape(text))), text, excerpt
+
+
+def backfill(connection, table):
+    query = select(table.c.id, table.c.content).where(
+        or_(table.c.content_html.is_(None), table.c.content_text.is_(None))
+    ).order_by(table.c.id).limit(BATCH_SIZE)
+    update = table.update().where(table.c.id == bindparam('row_id')).values(
+        content_html=bindparam('rendered_html'),
+        content_text=bindparam('rendered_text'),
+        excerpt=bindparam('rendered_excerpt'),
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(query.where(table.c.id > last_id)).all()
+        if not rows:
+            return
+        params = []
+        for row_id, content in rows:
+            content_html, content_text, excerpt = render(content)
+            params.append({'row_id': row_id, 'rendered_html': content_html,
+                           'rendered_text': content_text, 'rendered_excerpt': excerpt})
+        connection.execute(update, params)
+        last_id = rows[-1][0]
+
+
+def upgrade(connection, metadata):
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+
+    for table in TABLES:
+        existing = {info['name'] for info in inspector.get_columns(table.name)}
+        for column, definition in COLUMNS:
+            if column not in existing:
+                connection.exec_driver_sql(
+                    f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column)} {definition}'
+                )
+        backfill(connection, table)
@@ -0,0 +1,44 @@
+"""
+Add the tag_subscription table behind new-question notifications
+
+Creates the table, as it was when this step was written, on databases that
+don't have it. Every user is then subscribed implicitly to the tags they
+have asked or answered in, which is who was notified before the table
+existed.
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, and_, exists, literal, select, union
+
+ACTIVITY = 'activity'
+
+schema = MetaData()
+Table('user', schema, Column('id', Integer, primary_key=True))
+Table('tag', schema, Column('id', Integer, primary_key=True))
+tag_subscription = Table(
+    'tag_subscription', schema,
+    Column('user_id', Integer, ForeignKey('user.id'), primary_key=True),
+    Column('tag_id', Integer, ForeignKey('tag.id'), primary_key=True, index=True),
+    Column('source', String(10), nullable=False),
+    Column('created_at', DateTime),
+)
+question = Table('question', schema, Column('id', Integer), Column('user_id', Integer))
+answer = Table('answer', schema, Column('user_id', Integer), Column('question_id', Integer))
+question_tags = Table('question_tags', schema, Column('question_id', Integer), Column('tag_id', Integer))
+
+
+def upgrade(connection, metadata):
+    tag_subscription.create(connection, checkfirst=True)
+
+    pairs = union(
+        select(question.c.user_id, question_tags.c.tag_id).join(
+            question_tags, question_tags.c.question_id == question.c.id
+        ),
+        select(answer.c.user_id, question_tags.c.tag_id).join(
+            question_tags, question_tags.c.question_id == answer.c.question_id
+        ),
+    ).subquery()
+    missing = select(pairs.c.user_id, pairs.c.tag_id, literal(ACTIVITY)).where(~exists().where(and_(
+        tag_subscription.c.user_id == pairs.c.user_id,
+        tag_subscription.c.tag_id == pairs.c.tag_id
+    )))
+    connection.execute(tag_subscription.insert().from_select(['user_id', 'tag_id', 'source'], missing))
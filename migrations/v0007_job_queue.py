@@ -0,0 +1,27 @@
+"""
+Add the job table behind the background job queue (services/jobs.py)
+
+Creates the table, as it was when this step was written, on databases that
+don't have it.
+"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text
+
+schema = MetaData()
+job = Table(
+    'job', schema,
+    Column('id', Integer, primary_key=True),
+    Column('job_type', String(50), nullable=False),
+    Column('payload', Text, nullable=False),
+    Column('status', String(10), nullable=False),
+    Column('attempts', Integer, nullable=False),
+    Column('run_after', DateTime, nullable=False),
+    Column('claimed_at', DateTime),
+    Column('last_error', Text),
+    Column('created_at', DateTime),
+    Index('ix_job_status_run_after', 'status', 'run_after'),
+)
+
+
+def upgrade(connection, metadata):
+    job.create(connection, checkfirst=True)
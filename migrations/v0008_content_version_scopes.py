@@ -0,0 +1,27 @@
+"""
+Replace the single content_version counter with one version per scope
+
+The page cache now keys each page by the scopes of content it shows (see
+services/content_version.py). Creates the ``content_versions`` table, as it
+was when this step was written, and drops the old single-row counter;
+every scope starts again at 0, which only costs one miss per cached page.
+"""
+
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+schema = MetaData()
+content_versions = Table(
+    'content_versions', schema,
+    Column('scope', String(50), primary_key=True),
+    Column('version', Integer, nullable=False),
+)
+content_version = Table(
+    'content_version', schema,
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False),
+)
+
+
+def upgrade(connection, metadata):
+    content_versions.create(connection, checkfirst=True)
+    content_version.drop(connection, checkfirst=True)
@@ -0,0 +1,27 @@
+"""
+Add the view count columns written by the batched view counter
+
+``question.views`` and ``user.profile_views`` are incremented by
+services/view_counter.py. Tables created by v0001 have both and v0002 adds
+``question.views`` to older ones; this makes sure both exist whatever state
+a database was left in, and zeroes counts left NULL by rows written before
+the columns had a default.
+"""
+
+from sqlalchemy import inspect
+
+COLUMNS = [
+    ('question', 'views', 'INTEGER DEFAULT 0'),
+    ('user', 'profile_views', 'INTEGER DEFAULT 0'),
+]
+
+
+def upgrade(connection, metadata):
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+
+    for table, column, definition in COLUMNS:
+        existing = {info['name'] for info in inspector.get_columns(table)}
+        if column not in existing:
+            connection.exec_driver_sql(f'ALTER TABLE {quote(table)} ADD COLUMN {quote(column)} {definition}')
+        connection.exec_driver_sql(f'UPDATE {quote(table)} SET {quote(column)} = 0 WHERE {quote(column)} IS NULL')
@@ -4,13 +4,14 @@ Real-time features for Q&A Platform
 """
 
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from app import app, db, User, Question, Answer, Notification
+from app import app, db, User, Question, Answer, Notification, notification_fanout
 from datetime import datetime
 import json
 
 # Initialize SocketIO
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+
 class NotificationManager:
     def __init__(self):
         self.active_users = set()
@@ -27,34 +28,30 @@ class NotificationManager:
             db.session.commit()
             
             # Send real-time notification
-            socketio.emit('notification', {
+            self.send(user_id, {
                 'id': notification.id,
                 'content': content,
                 'type': notification_type,
                 'created_at': notification.created_at.isoformat()
-            }, room=f'user_{user_id}')
+            })
             
             return notification
     
+    def send(self, user_id, notification):
+        """Push a stored notification to the user's open pages"""
+        socketio.emit('notification', notification, room=f'user_{user_id}')
+    
     def notify_new_question(self, question):
         """Notify users about new question in their interested tags"""
-        with app.app_context():
-            # Get users who might be interested in this question
-            interested_users = set()
-            
-            for tag in question.tags:
-                # Find users who have answered questions with similar tags
-                for answer in Answer.query.join(Answer.question).join(Question.tags).filter(Tag.id == tag.id).all():
-                    interested_users.add(answer.user_id)
-            
-            # Notify interested users
-            for user_id in interested_users:
-                if user_id != question.user_id:  # Don't notify the author
-                    self.create_notification(
-                        user_id,
-                        f'New question: "{question.title}" in tags you follow',
-                        'info'
-                    )
+        # Questions asked through the app are fanned out when they are posted;
+        # this is for ones added some other way. Recipients are resolved,
+        # stored and sent by a background job
+        notification_fanout.submit(
+            [tag.id for tag in question.tags],
+            question.user_id,
+            f'New question: "{question.title}" in tags you follow',
+            'info'
+        )
     
     def notify_new_answer(self, answer):
         """Notify question author about new answer"""
@@ -173,6 +170,9 @@ def trigger_accepted_answer_notification(answer):
     """Trigger notification for accepted answer"""
     notification_manager.notify_accepted_answer(answer)
 
-def trigger_badge_notification(user_id, badge_name):
-    """Trigger notification for earned badge"""
-    notification_manager.notify_badge_earned(user_id, badge_name)
+def trigger_badge_notification(user_id, badge_name, notification=None):
+    """Trigger notification for earned badge; push ``notification`` if it is already stored"""
+    if notification is None:
+        notification_manager.notify_badge_earned(user_id, badge_name)
+    else:
+        notification_manager.send(user_id, notification)
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Rebuild user reputation from the reputation_events ledger
+
+    python rebuild_reputation.py                 # re-sum the existing ledger
+    python rebuild_reputation.py --from-scratch  # regenerate the ledger from activity first
+"""
+
+import argparse
+
+from app import app, db, User, ReputationEvent, reputation_ledger
+
+def rebuild_reputation(from_scratch=False):
+    with app.app_context():
+        if from_scratch:
+            print("=== Regenerating reputation ledger from activity ===")
+            reputation_ledger.rebuild()
+        else:
+            print("=== Replaying reputation ledger ===")
+            reputation_ledger.replay()
+
+        print(f"✅ {ReputationEvent.query.count()} reputation events")
+        print(f"✅ Reputation updated for {User.query.count()} users")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--from-scratch', action='store_true',
+                        help='rebuild the ledger from questions, answers and votes before replaying it')
+    args = parser.parse_args()
+    rebuild_reputation(from_scratch=args.from_scratch)
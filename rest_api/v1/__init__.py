@@ -1,3 +1,6 @@
+from flask import jsonify
+
+from utils.serialization import InvalidFields
 from .questions import questions_bp
 from .users import users_bp
 from .stats import stats_bp
@@ -7,3 +10,8 @@ def register_api_blueprints(app):
     app.register_blueprint(questions_bp, url_prefix='/api/v1')
     app.register_blueprint(users_bp, url_prefix='/api/v1')
     app.register_blueprint(stats_bp, url_prefix='/api/v1')
+    
+    # Bad ?fields= or ?include= on any endpoint
+    @app.errorhandler(InvalidFields)
+    def invalid_fields(e):
+        return jsonify({'error': str(e)}), 400
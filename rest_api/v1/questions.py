@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, url_for
 from flask_login import login_required, current_user
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, undefer, with_expression
 
 # Import models from app (they're defined there)
 import sys
@@ -8,7 +10,14 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 # Import the app to get access to models
-from app import Question, Tag, Vote, Answer, db
+from app import (
+    Question, Tag, Vote, Answer, db, view_counter, platform_stats, query_shapes, tag_repository, api_cache,
+    tag_subscriptions
+)
+from services import events
+from services.tags import normalize_tag_name
+from . import schemas
+from utils.pagination import paginate_request
 
 # Import QuestionService if it exists, otherwise define basic functions
 try:
@@ -18,13 +27,11 @@ except ImportError:
         @staticmethod
         def create_question(title, content, tag_names, user_id):
             question = Question(title=title, content=content, user_id=user_id)
-            for tag_name in tag_names:
-                tag = Tag.query.filter_by(name=tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.session.add(tag)
-                question.tags.append(tag)
+            tags = tag_repository.resolve(tag_names)
             db.session.add(question)
+            question.tags.extend(tags)
+            db.session.flush()
+            events.question_asked.send(question)
             db.session.commit()
             return question
         
@@ -32,45 +39,71 @@ except ImportError:
         def create_answer(content, question_id, user_id):
             answer = Answer(content=content, question_id=question_id, user_id=user_id)
             db.session.add(answer)
+            db.session.flush()
+            events.answer_posted.send(answer)
             db.session.commit()
             return answer
         
+        @staticmethod
+        def accept_answer(answer_id, user_id):
+            answer = Answer.query.get_or_404(answer_id)
+            question = answer.question
+            if question.user_id != user_id:
+                raise PermissionError('Only question author can accept answers')
+            if not answer.is_accepted:
+                previous = next((ans for ans in question.answers if ans.is_accepted), None)
+                for ans in question.answers:
+                    ans.is_accepted = False
+                answer.is_accepted = True
+                events.answer_accepted.send(answer, previous=previous)
+                db.session.commit()
+            return answer
+        
         @staticmethod
         def vote(item_type, item_id, user_id, value):
+            vote = previous_value = None
             if item_type == 'question':
                 existing_vote = Vote.query.filter_by(user_id=user_id, question_id=item_id, answer_id=None).first()
                 if existing_vote:
-                    existing_vote.value = value
+                    previous_value, existing_vote.value, vote = existing_vote.value, value, existing_vote
                 else:
                     vote = Vote(value=value, user_id=user_id, question_id=item_id)
                     db.session.add(vote)
             elif item_type == 'answer':
                 existing_vote = Vote.query.filter_by(user_id=user_id, answer_id=item_id, question_id=None).first()
                 if existing_vote:
-                    existing_vote.value = value
+                    previous_value, existing_vote.value, vote = existing_vote.value, value, existing_vote
                 else:
                     vote = Vote(value=value, user_id=user_id, answer_id=item_id)
                     db.session.add(vote)
+            if vote is not None:
+                db.session.flush()
+                events.vote_cast.send(vote, previous_value=previous_value)
             db.session.commit()
         
         @staticmethod
         def get_vote_count(item_type, item_id):
-            if item_type == 'question':
-                question = Question.query.get(item_id)
-                return sum(vote.value for vote in question.votes) if question else 0
-            else:
-                answer = Answer.query.get(item_id)
-                return sum(vote.value for vote in answer.votes) if answer else 0
+            column = Vote.question_id if item_type == 'question' else Vote.answer_id
+            return db.session.query(func.coalesce(func.sum(Vote.value), 0)).filter(column == item_id).scalar()
         
         @staticmethod
-        def get_answers_with_votes(question_id):
-            answers = Answer.query.filter_by(question_id=question_id).all()
-            answers_with_votes = []
-            for answer in answers:
-                vote_count = QuestionService.get_vote_count('answer', answer.id)
-                answers_with_votes.append((answer, vote_count))
-            answers_with_votes.sort(key=lambda x: (not x[0].is_accepted, -x[1]))
-            return answers_with_votes
+        def get_answers_with_votes(question_id, page=1, per_page=None):
+            # One query: answers joined to their summed votes, accepted first then by score
+            answer_ids = db.session.query(Answer.id).filter(Answer.question_id == question_id)
+            scores = db.session.query(
+                Vote.answer_id, func.sum(Vote.value).label('score')
+            ).filter(Vote.answer_id.in_(answer_ids)).group_by(Vote.answer_id).subquery()
+            vote_count = func.coalesce(scores.c.score, 0)
+            query = db.session.query(Answer).outerjoin(
+                scores, scores.c.answer_id == Answer.id
+            ).options(
+                joinedload(Answer.author), with_expression(Answer.vote_score, vote_count)
+            ).filter(
+                Answer.question_id == question_id
+            ).order_by(Answer.is_accepted.desc(), vote_count.desc(), Answer.id).populate_existing()
+            if per_page:
+                query = query.offset((max(page, 1) - 1) * per_page).limit(per_page)
+            return [(answer, answer.vote_score) for answer in query]
 
 # Import AI helpers if available
 try:
@@ -85,16 +118,22 @@ except ImportError:
 
 questions_bp = Blueprint('questions_v1', __name__)
 
+def _first_page():
+    """Whether a collection request asks for its first page (by page number or cursor)"""
+    return not request.args.get('cursor') and request.args.get('page', 1, type=int) == 1
+
 # Question endpoints
 @questions_bp.route('/questions', methods=['GET'])
+@api_cache.cached(ttl=10, when=_first_page)
 def get_questions():
     """Get all questions with pagination and filtering"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
     tag_filter = request.args.get('tag')
     search = request.args.get('search')
     
-    query = Question.query
+    serialize = schemas.question_card.for_request()
+    query = query_shapes.question_cards(Question.query)
+    if schemas.question_card.requested('answers'):
+        query = query_shapes.with_answers(query)
     
     # Apply filters
     if tag_filter:
@@ -103,76 +142,54 @@ def get_questions():
     if search:
         query = query.filter(
             Question.title.contains(search) | 
-            Question.content.contains(search)
+            Question.content_text.contains(search)
         )
     
-    # Pagination
-    questions = query.order_by(Question.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Pagination (only the unfiltered listing has a cached total to estimate from)
+    estimate = None if tag_filter or search else lambda: platform_stats.snapshot()['questions']['total']
+    try:
+        questions, pagination = paginate_request(
+            query, Question, 'questions_v1.get_questions',
+            estimate=estimate, tag=tag_filter, search=search
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'questions': [{
-            'id': q.id,
-            'title': q.title,
-            'content': q.content[:200] + '...' if len(q.content) > 200 else q.content,
-            'author': q.author.username,
-            'created_at': q.created_at.isoformat(),
-            'tags': [tag.name for tag in q.tags],
-            'answers_count': len(q.answers),
-            'votes': QuestionService.get_vote_count('question', q.id),
-            'url': url_for('question_detail', id=q.id)
-        } for q in questions.items],
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total': questions.total,
-            'pages': questions.pages,
-            'has_next': questions.has_next,
-            'has_prev': questions.has_prev,
-            'next_url': url_for('questions_v1.get_questions', page=page+1) if questions.has_next else None,
-            'prev_url': url_for('questions_v1.get_questions', page=page-1) if questions.has_prev else None
-        }
+        'questions': [serialize(q) for q in questions],
+        'pagination': pagination
     })
 
 @questions_bp.route('/questions/<int:question_id>', methods=['GET'])
 def get_question(question_id):
     """Get specific question with answers"""
-    question = Question.query.get_or_404(question_id)
+    serialize = schemas.question_thread.for_request()
+    question = query_shapes.question_cards(Question.query).options(
+        undefer(Question.content), undefer(Question.content_html)
+    ).filter(Question.id == question_id).first_or_404()
     
-    # Increment view count
-    question.author.profile_views += 1
-    db.session.commit()
+    # Count the view; it is written to the database in the next batch
+    view_counter.record(question.id, question.user_id)
     
-    # Get answers with votes
-    answers_with_votes = QuestionService.get_answers_with_votes(question_id)
+    # Long threads can be fetched a page at a time with ?answers_per_page=
+    answers_page = max(request.args.get('answers_page', 1, type=int), 1)
+    answers_per_page = request.args.get('answers_per_page', type=int)
+    if answers_per_page is not None:
+        answers_per_page = max(1, min(answers_per_page, 100))
     
-    return jsonify({
-        'id': question.id,
-        'title': question.title,
-        'content': question.content,
-        'author': {
-            'id': question.author.id,
-            'username': question.author.username,
-            'reputation': question.author.reputation,
-            'badge_level': question.author.badge_level
-        },
-        'created_at': question.created_at.isoformat(),
-        'tags': [tag.name for tag in question.tags],
-        'votes': QuestionService.get_vote_count('question', question.id),
-        'answers': [{
-            'id': answer.id,
-            'content': answer.content,
-            'author': {
-                'id': answer.author.id,
-                'username': answer.author.username,
-                'reputation': answer.author.reputation
-            },
-            'created_at': answer.created_at.isoformat(),
-            'is_accepted': answer.is_accepted,
-            'votes': answer_votes
-        } for answer, answer_votes in answers_with_votes]
-    })
+    # Get answers with votes, unless ?fields= leaves them out
+    answers = []
+    if schemas.question_thread.requested('answers'):
+        answers = [answer for answer, votes in QuestionService.get_answers_with_votes(
+            question_id, page=answers_page, per_page=answers_per_page
+        )]
+    
+    return jsonify(serialize(schemas.QuestionThread(question, answers, {
+        'page': answers_page if answers_per_page else 1,
+        'per_page': answers_per_page,
+        'total': question.answer_count,
+        'has_next': bool(answers_per_page) and answers_page * answers_per_page < question.answer_count
+    })))
 
 @questions_bp.route('/questions', methods=['POST'])
 @login_required
@@ -345,23 +362,38 @@ def suggest_tags():
         return jsonify({'error': str(e)}), 500
 
 @questions_bp.route('/tags', methods=['GET'])
+@api_cache.cached(ttl=60)
 def get_tags():
     """Get all tags with usage counts"""
-    tags = Tag.query.all()
-    
-    tag_data = []
-    for tag in tags:
-        question_count = len(tag.questions)
-        tag_data.append({
-            'id': tag.id,
-            'name': tag.name,
-            'questions_count': question_count
-        })
+    serialize = schemas.tag.for_request()
+    tags = query_shapes.tag_usage(Tag.query).all()
     
     # Sort by usage count
-    tag_data.sort(key=lambda x: x['questions_count'], reverse=True)
+    tags.sort(key=lambda tag: tag.question_count, reverse=True)
+    
+    return jsonify({
+        'tags': [serialize(tag) for tag in tags],
+        'total': len(tags)
+    })
+
+@questions_bp.route('/tags/<name>/follow', methods=['PUT', 'DELETE'])
+@login_required
+def follow_tag(name):
+    """Follow a tag (PUT) or stop following it (DELETE), including a follow implied by posting in it"""
+    # Tags created before names were normalized may be stored as typed
+    tag = (
+        Tag.query.filter_by(name=normalize_tag_name(name)).first()
+        or Tag.query.filter_by(name=name).first()
+        or Tag.query.filter(func.lower(Tag.name) == name.lower()).first_or_404()
+    )
+    
+    if request.method == 'PUT':
+        tag_subscriptions.follow(current_user.id, tag.id)
+    else:
+        tag_subscriptions.unfollow(current_user.id, tag.id)
+    db.session.commit()
     
     return jsonify({
-        'tags': tag_data,
-        'total': len(tag_data)
+        'tag': tag.name,
+        'following': request.method == 'PUT'
     })
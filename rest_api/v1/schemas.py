@@ -0,0 +1,146 @@
+"""
+Response schemas for the v1 API
+
+Every listing and detail endpoint serializes its rows through one of these,
+so clients can trim responses with ``?fields=`` and expand related objects
+with ``?include=`` (see utils/serialization.py). The defaults reproduce the
+responses the endpoints have always returned.
+"""
+
+from collections import namedtuple
+
+from flask import url_for
+
+from app import Badge, UserBadge, db, view_counter
+from utils.serialization import Nested, Schema
+
+
+def _tag_names(question):
+    return [tag.name for tag in question.tags]
+
+
+def _question_url(question):
+    return url_for('question_detail', id=question.id)
+
+
+def _count(name):
+    return lambda row: getattr(row, name) or 0
+
+
+def _badges(user):
+    user_badges = db.session.query(UserBadge, Badge).join(Badge).filter(
+        UserBadge.user_id == user.id
+    ).order_by(UserBadge.earned_at.desc()).all()
+    return [{
+        'id': badge.id,
+        'name': badge.name,
+        'description': badge.description,
+        'icon': badge.icon,
+        'earned_at': user_badge.earned_at
+    } for user_badge, badge in user_badges]
+
+
+author = Schema({
+    'id': 'id',
+    'username': 'username',
+    'reputation': 'reputation',
+    'badge_level': 'badge_level',
+})
+
+USER_FIELDS = {
+    'id': 'id',
+    'username': 'username',
+    'email': 'email',
+    'reputation': 'reputation',
+    'badge_level': 'badge_level',
+    'profile_views': lambda user: (user.profile_views or 0) + view_counter.pending_author_views(user.id),
+    'created_at': 'created_at',
+    'questions_count': _count('questions_count'),
+    'answers_count': _count('answers_count'),
+    'accepted_answers_count': _count('accepted_answers_count'),
+}
+
+# /users
+user_summary = Schema(USER_FIELDS, default=[name for name in USER_FIELDS if name != 'accepted_answers_count'])
+
+# /users/me
+user_profile = Schema(USER_FIELDS)
+
+# /users/<id>
+user_detail = Schema(dict(USER_FIELDS, badges=_badges))
+
+# An answer on its question
+answer = Schema({
+    'id': 'id',
+    'content': 'content',
+    'content_html': 'content_html',
+    'author': Nested('author', author, fields=['id', 'username', 'reputation']),
+    'created_at': 'created_at',
+    'is_accepted': 'is_accepted',
+    'votes': 'vote_score',
+})
+
+# /users/<id>/answers
+answer_card = Schema({
+    'id': 'id',
+    'content': 'excerpt',
+    'created_at': 'created_at',
+    'question_id': 'question_id',
+    'question_title': 'question.title',
+    'is_accepted': 'is_accepted',
+    'votes': 'vote_score',
+})
+
+QUESTION_CARD_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'content': 'excerpt',
+    'author': 'author.username',
+    'created_at': 'created_at',
+    'tags': _tag_names,
+    'answers_count': 'answer_count',
+    'votes': 'vote_score',
+    'has_accepted_answer': 'has_accepted_answer',
+    'url': _question_url,
+}
+QUESTION_INCLUDES = {
+    'author': Nested('author', author),
+    'answers': Nested('answers', answer, many=True),
+}
+
+# /questions
+question_card = Schema(
+    QUESTION_CARD_FIELDS,
+    default=[name for name in QUESTION_CARD_FIELDS if name != 'has_accepted_answer'],
+    includes=QUESTION_INCLUDES,
+)
+
+# /users/<id>/questions
+user_question = Schema(
+    QUESTION_CARD_FIELDS,
+    default=['id', 'title', 'content', 'created_at', 'tags', 'answers_count', 'votes'],
+    includes=QUESTION_INCLUDES,
+)
+
+# /questions/<id>: the question with one page of its answers
+QuestionThread = namedtuple('QuestionThread', ['question', 'answers', 'answers_pagination'])
+
+question_thread = Schema({
+    'id': 'question.id',
+    'title': 'question.title',
+    'content': 'question.content',
+    'content_html': 'question.content_html',
+    'author': Nested('question.author', author),
+    'created_at': 'question.created_at',
+    'tags': lambda thread: _tag_names(thread.question),
+    'views': lambda thread: (thread.question.views or 0) + view_counter.pending_question_views(thread.question.id),
+    'votes': 'question.vote_score',
+    'answers': Nested('answers', answer, many=True),
+    'answers_pagination': 'answers_pagination',
+})
+
+tag = Schema({
+    'id': 'id',
+    'name': 'name',
+    'questions_count': 'question_count',
+})
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
 
 # Import models from app (they're defined there)
@@ -6,147 +6,94 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from app import User, Question, Tag, Answer, db
-
-# Import badge models if available
-try:
-    from app import Badge, UserBadge
-except ImportError:
-    # Fallback if badge models aren't available
-    Badge = None
-    UserBadge = None
+from app import User, Tag, db, leaderboards, platform_stats, activity_rollups, api_cache
+from services.activity import METRICS, TAG_METRICS
+from services.leaderboard import PERIODS
 
 stats_bp = Blueprint('stats_v1', __name__)
 
+# Longest window /stats/activity will chart
+MAX_ACTIVITY_DAYS = 3 * 365
+
 @stats_bp.route('/stats', methods=['GET'])
+@api_cache.cached(ttl=30)
 def get_platform_stats():
     """Get platform-wide statistics"""
-    return jsonify({
-        'users': {
-            'total': User.query.count(),
-            'new_today': User.query.filter(
-                User.created_at >= datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            ).count(),
-            'new_this_week': User.query.filter(
-                User.created_at >= datetime.utcnow() - timedelta(days=7)
-            ).count(),
-            'new_this_month': User.query.filter(
-                User.created_at >= datetime.utcnow() - timedelta(days=30)
-            ).count()
-        },
-        'questions': {
-            'total': Question.query.count(),
-            'new_today': Question.query.filter(
-                Question.created_at >= datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            ).count(),
-            'new_this_week': Question.query.filter(
-                Question.created_at >= datetime.utcnow() - timedelta(days=7)
-            ).count(),
-            'new_this_month': Question.query.filter(
-                Question.created_at >= datetime.utcnow() - timedelta(days=30)
-            ).count(),
-            'unanswered': Question.query.filter(~Question.answers.any()).count()
-        },
-        'answers': {
-            'total': Answer.query.count(),
-            'new_today': Answer.query.filter(
-                Answer.created_at >= datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            ).count(),
-            'new_this_week': Answer.query.filter(
-                Answer.created_at >= datetime.utcnow() - timedelta(days=7)
-            ).count(),
-            'new_this_month': Answer.query.filter(
-                Answer.created_at >= datetime.utcnow() - timedelta(days=30)
-            ).count(),
-            'accepted': Answer.query.filter_by(is_accepted=True).count()
-        },
-        'tags': {
-            'total': Tag.query.count(),
-            'most_used': get_most_used_tags(10)
-        },
-        'badges': {
-            'total': Badge.query.count(),
-            'total_awarded': UserBadge.query.count()
-        }
-    })
+    return jsonify(platform_stats.snapshot())
 
 @stats_bp.route('/stats/activity', methods=['GET'])
 def get_activity_stats():
     """Get activity statistics for different time periods"""
-    days = request.args.get('days', 7, type=int)
+    days = max(1, min(request.args.get('days', 7, type=int), MAX_ACTIVITY_DAYS))
+    tag_name = request.args.get('tag')
     
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    cutoff_date = (datetime.utcnow() - timedelta(days=days)).date()
     
-    # Questions per day
-    questions_per_day = db.session.query(
-        db.func.date(Question.created_at).label('date'),
-        db.func.count(Question.id).label('count')
-    ).filter(Question.created_at >= cutoff_date).group_by(
-        db.func.date(Question.created_at)
-    ).all()
+    tag = None
+    if tag_name:
+        tag = Tag.query.filter_by(name=tag_name).first_or_404()
     
-    # Answers per day
-    answers_per_day = db.session.query(
-        db.func.date(Answer.created_at).label('date'),
-        db.func.count(Answer.id).label('count')
-    ).filter(Answer.created_at >= cutoff_date).group_by(
-        db.func.date(Answer.created_at)
-    ).all()
+    rows = activity_rollups.series(cutoff_date, tag_id=tag.id if tag else None)
+    metrics = TAG_METRICS if tag else METRICS
     
-    return jsonify({
-        'period_days': days,
-        'questions_per_day': [{
-            'date': str(q.date),
-            'count': q.count
-        } for q in questions_per_day],
-        'answers_per_day': [{
-            'date': str(a.date),
-            'count': a.count
-        } for a in answers_per_day]
-    })
+    response = {'period_days': days}
+    if tag:
+        response['tag'] = tag.name
+    for metric in metrics:
+        response[f'{metric}_per_day'] = [{
+            'date': row.day.isoformat(),
+            'count': getattr(row, metric)
+        } for row in rows if getattr(row, metric)]
+    
+    return jsonify(response)
 
 @stats_bp.route('/stats/leaderboard', methods=['GET'])
+@api_cache.cached(ttl=60)
 def get_leaderboard():
-    """Get user leaderboard by reputation"""
+    """Get user leaderboard by reputation earned in a period"""
     period = request.args.get('period', 'all')  # all, week, month
+    limit = min(request.args.get('limit', 50, type=int), 100)
     
-    query = User.query
+    if period not in PERIODS:
+        return jsonify({'error': f"Invalid period, expected one of: {', '.join(PERIODS)}"}), 400
     
-    if period == 'week':
-        cutoff = datetime.utcnow() - timedelta(days=7)
-        # This would need additional tracking for period-based reputation
-        # For now, return overall reputation
-    elif period == 'month':
-        cutoff = datetime.utcnow() - timedelta(days=30)
-        # This would need additional tracking for period-based reputation
-        # For now, return overall reputation
-    
-    users = query.order_by(User.reputation.desc()).limit(50).all()
+    board = leaderboards.board(period)
+    top = board.top(limit)
+    users = {user.id: user for user in User.query.filter(User.id.in_([user_id for _, user_id, _ in top]))}
     
     return jsonify({
         'period': period,
+        'total_ranked': len(board),
         'leaderboard': [{
-            'rank': idx + 1,
-            'id': user.id,
-            'username': user.username,
-            'reputation': user.reputation,
-            'badge_level': user.badge_level,
-            'questions_count': len(user.questions),
-            'answers_count': len(user.answers),
-            'accepted_answers_count': len([a for a in user.answers if a.is_accepted])
-        } for idx, user in enumerate(users)]
+            'rank': rank,
+            'id': user_id,
+            'username': users[user_id].username,
+            'reputation': users[user_id].reputation,
+            'score': score,
+            'badge_level': users[user_id].badge_level,
+            'questions_count': users[user_id].questions_count or 0,
+            'answers_count': users[user_id].answers_count or 0,
+            'accepted_answers_count': users[user_id].accepted_answers_count or 0
+        } for rank, user_id, score in top if user_id in users]
     })
 
-def get_most_used_tags(limit=10):
-    """Helper function to get most used tags"""
-    tag_counts = db.session.query(
-        Tag.name,
-        db.func.count(Question.id).label('question_count')
-    ).join(Question.tags).group_by(Tag.id).order_by(
-        db.func.count(Question.id).desc()
-    ).limit(limit).all()
+@stats_bp.route('/stats/leaderboard/users/<int:user_id>', methods=['GET'])
+def get_leaderboard_rank(user_id):
+    """Get one user's position on the leaderboard"""
+    period = request.args.get('period', 'all')
+    
+    if period not in PERIODS:
+        return jsonify({'error': f"Invalid period, expected one of: {', '.join(PERIODS)}"}), 400
+    
+    user = User.query.get_or_404(user_id)
+    board = leaderboards.board(period)
+    position = board.rank(user_id)
     
-    return [{
-        'name': tag.name,
-        'question_count': tag.question_count
-    } for tag in tag_counts]
+    return jsonify({
+        'period': period,
+        'id': user.id,
+        'username': user.username,
+        'rank': position[0] if position else None,
+        'score': position[1] if position else 0,
+        'total_ranked': len(board)
+    })
@@ -7,7 +7,10 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from app import User, db
+from app import User, Question, Answer, Tag, db, platform_stats, query_shapes, tag_subscriptions
+from services.subscriptions import UNFOLLOW
+from utils.pagination import paginate_request
+from . import schemas
 
 # Import badge models if available
 try:
@@ -22,11 +25,10 @@ users_bp = Blueprint('users_v1', __name__)
 @users_bp.route('/users', methods=['GET'])
 def get_users():
     """Get all users with pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
     search = request.args.get('search')
+    serialize = schemas.user_summary.for_request()
     
-    query = User.query
+    query = query_shapes.user_summaries(User.query)
     
     # Apply search filter
     if search:
@@ -35,150 +37,89 @@ def get_users():
             User.email.contains(search)
         )
     
-    # Pagination
-    users = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Pagination (only the unfiltered listing has a cached total to estimate from)
+    estimate = None if search else lambda: platform_stats.snapshot()['users']['total']
+    try:
+        users, pagination = paginate_request(
+            query, User, 'users_v1.get_users', estimate=estimate, search=search
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'users': [{
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'reputation': user.reputation,
-            'badge_level': user.badge_level,
-            'profile_views': user.profile_views,
-            'created_at': user.created_at.isoformat(),
-            'questions_count': len(user.questions),
-            'answers_count': len(user.answers)
-        } for user in users.items],
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total': users.total,
-            'pages': users.pages,
-            'has_next': users.has_next,
-            'has_prev': users.has_prev
-        }
+        'users': [serialize(user) for user in users],
+        'pagination': pagination
     })
 
 @users_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     """Get specific user profile"""
+    serialize = schemas.user_detail.for_request()
     user = User.query.get_or_404(user_id)
     
-    # Calculate fresh reputation
-    user.reputation = user.calculate_reputation()
-    user.update_badge_level()
-    db.session.commit()
-    
-    # Get user badges
-    user_badges = db.session.query(UserBadge, Badge).join(Badge).filter(
-        UserBadge.user_id == user_id
-    ).order_by(UserBadge.earned_at.desc()).all()
-    
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email,
-        'reputation': user.reputation,
-        'badge_level': user.badge_level,
-        'profile_views': user.profile_views,
-        'created_at': user.created_at.isoformat(),
-        'questions_count': len(user.questions),
-        'answers_count': len(user.answers),
-        'accepted_answers_count': len([a for a in user.answers if a.is_accepted]),
-        'badges': [{
-            'id': badge.id,
-            'name': badge.name,
-            'description': badge.description,
-            'icon': badge.icon,
-            'earned_at': user_badge.earned_at.isoformat()
-        } for user_badge, badge in user_badges]
-    })
+    # Badges are queried only if the response includes them
+    return jsonify(serialize(user))
 
 @users_bp.route('/users/<int:user_id>/questions', methods=['GET'])
 def get_user_questions(user_id):
     """Get questions by specific user"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
-    
+    serialize = schemas.user_question.for_request()
     user = User.query.get_or_404(user_id)
-    questions = Question.query.filter_by(user_id=user_id).order_by(
-        Question.created_at.desc()
-    ).paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        questions, pagination = paginate_request(
+            query_shapes.question_cards(Question.query.filter_by(user_id=user_id)), Question,
+            'users_v1.get_user_questions', estimate=lambda: user.questions_count, user_id=user_id
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'user_id': user_id,
         'username': user.username,
-        'questions': [{
-            'id': q.id,
-            'title': q.title,
-            'content': q.content[:200] + '...' if len(q.content) > 200 else q.content,
-            'created_at': q.created_at.isoformat(),
-            'tags': [tag.name for tag in q.tags],
-            'answers_count': len(q.answers),
-            'votes': sum(v.value for v in q.votes)
-        } for q in questions.items],
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total': questions.total,
-            'pages': questions.pages
-        }
+        'questions': [serialize(q) for q in questions],
+        'pagination': pagination
     })
 
 @users_bp.route('/users/<int:user_id>/answers', methods=['GET'])
 def get_user_answers(user_id):
     """Get answers by specific user"""
-    page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
-    
+    serialize = schemas.answer_card.for_request()
     user = User.query.get_or_404(user_id)
-    answers = Answer.query.filter_by(user_id=user_id).order_by(
-        Answer.created_at.desc()
-    ).paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        answers, pagination = paginate_request(
+            query_shapes.answer_cards(Answer.query.filter_by(user_id=user_id)), Answer,
+            'users_v1.get_user_answers', estimate=lambda: user.answers_count, user_id=user_id
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'user_id': user_id,
         'username': user.username,
-        'answers': [{
-            'id': a.id,
-            'content': a.content[:200] + '...' if len(a.content) > 200 else a.content,
-            'created_at': a.created_at.isoformat(),
-            'question_id': a.question_id,
-            'question_title': a.question.title,
-            'is_accepted': a.is_accepted,
-            'votes': sum(v.value for v in a.votes)
-        } for a in answers.items],
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total': answers.total,
-            'pages': answers.pages
-        }
+        'answers': [serialize(a) for a in answers],
+        'pagination': pagination
     })
 
 @users_bp.route('/users/me', methods=['GET'])
 @login_required
 def get_current_user():
     """Get current authenticated user profile"""
-    # Calculate fresh reputation
-    current_user.reputation = current_user.calculate_reputation()
-    current_user.update_badge_level()
-    db.session.commit()
+    return jsonify(schemas.user_profile.for_request()(current_user))
+
+@users_bp.route('/users/me/tags', methods=['GET'])
+@login_required
+def get_current_user_tags():
+    """Tags the current user follows, explicitly or by having posted in them"""
+    sources = dict(tag_subscriptions.for_user(current_user.id))
+    following = [tag_id for tag_id, source in sources.items() if source != UNFOLLOW]
+    tags = Tag.query.filter(Tag.id.in_(following)).order_by(Tag.name).all() if following else []
     
     return jsonify({
-        'id': current_user.id,
-        'username': current_user.username,
-        'email': current_user.email,
-        'reputation': current_user.reputation,
-        'badge_level': current_user.badge_level,
-        'profile_views': current_user.profile_views,
-        'created_at': current_user.created_at.isoformat(),
-        'questions_count': len(current_user.questions),
-        'answers_count': len(current_user.answers),
-        'accepted_answers_count': len([a for a in current_user.answers if a.is_accepted])
+        'tags': [{
+            'id': tag.id,
+            'name': tag.name,
+            'source': sources[tag.id]
+        } for tag in tags]
     })
 
 @users_bp.route('/users/me', methods=['PUT'])
@@ -0,0 +1,149 @@
+"""
+Daily activity rollups
+
+One ``daily_activity`` row per day (and one ``daily_tag_activity`` row per
+day and tag) is kept current by the domain events, so activity charts read
+a short indexed date range instead of grouping raw questions and answers.
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import func
+
+from services import events
+from utils.sql import upsert_increment, upsert_increments
+
+METRICS = ['questions', 'answers', 'votes', 'new_users', 'accepted_answers']
+TAG_METRICS = ['questions', 'answers']
+
+
+def _as_date(value):
+    """date() of a datetime or of the string SQLite returns from DATE()"""
+    if value is None:
+        return datetime.utcnow().date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class ActivityRollups:
+    """Maintain and query the daily activity rollup tables"""
+
+    def __init__(self, db, daily_model, daily_tag_model, user_model, question_model,
+                 answer_model, vote_model, question_tags_table):
+        self.db = db
+        self.DailyActivity = daily_model
+        self.DailyTagActivity = daily_tag_model
+        self.User = user_model
+        self.Question = question_model
+        self.Answer = answer_model
+        self.Vote = vote_model
+        self.question_tags = question_tags_table
+
+    def connect(self):
+        """Subscribe to the domain events that are counted per day"""
+        events.user_registered.connect(self._on_user_registered, weak=False)
+        events.question_asked.connect(self._on_question_asked, weak=False)
+        events.answer_posted.connect(self._on_answer_posted, weak=False)
+        events.answer_accepted.connect(self._on_answer_accepted, weak=False)
+        events.vote_cast.connect(self._on_vote_cast, weak=False)
+
+    def add(self, day, metric, delta=1, tag_ids=()):
+        """Count activity on a day, and on that day for each tag"""
+        session = self.db.session
+        day = _as_date(day)
+        upsert_increment(session, self.DailyActivity.__table__, {'day': day}, {metric: delta})
+        if metric in TAG_METRICS:
+            upsert_increments(session, self.DailyTagActivity.__table__,
+                              [{'day': day, 'tag_id': tag_id} for tag_id in tag_ids], {metric: delta})
+
+    def series(self, since, tag_id=None):
+        """Rollup rows from ``since`` onwards, oldest first"""
+        if tag_id is None:
+            model = self.DailyActivity
+            query = model.query
+        else:
+            model = self.DailyTagActivity
+            query = model.query.filter(model.tag_id == tag_id)
+        return query.filter(model.day >= _as_date(since)).order_by(model.day).all()
+
+    def backfill(self):
+        """Rebuild both rollup tables from the raw rows. Returns the number of days written."""
+        user = self.User.__table__
+        question = self.Question.__table__
+        answer = self.Answer.__table__
+        vote = self.Vote.__table__
+        session = self.db.session
+
+        def per_day(table, *criteria, day_column=None, group=()):
+            day = func.date(day_column if day_column is not None else table.c.created_at)
+            query = session.query(day, *group, func.count()).select_from(table)
+            return query.filter(*criteria).group_by(day, *group).all()
+
+        days = {}
+        def collect(metric, rows):
+            for day, count in rows:
+                days.setdefault(_as_date(day), dict.fromkeys(METRICS, 0))[metric] = count
+
+        collect('new_users', per_day(user))
+        collect('questions', per_day(question))
+        collect('answers', per_day(answer))
+        collect('accepted_answers', per_day(answer, answer.c.is_accepted == True))
+        # Votes cast before Vote.created_at existed are dated by their post
+        vote_day = func.coalesce(vote.c.created_at, question.c.created_at, answer.c.created_at)
+        collect('votes', per_day(
+            vote.outerjoin(question, vote.c.question_id == question.c.id)
+                .outerjoin(answer, vote.c.answer_id == answer.c.id),
+            day_column=vote_day
+        ))
+
+        tag_days = {}
+        def collect_tags(metric, rows):
+            for day, tag_id, count in rows:
+                tag_days.setdefault((_as_date(day), tag_id), dict.fromkeys(TAG_METRICS, 0))[metric] = count
+
+        tags = self.question_tags
+        collect_tags('questions', per_day(
+            question.join(tags, tags.c.question_id == question.c.id),
+            day_column=question.c.created_at, group=(tags.c.tag_id,)
+        ))
+        collect_tags('answers', per_day(
+            answer.join(tags, tags.c.question_id == answer.c.question_id),
+            day_column=answer.c.created_at, group=(tags.c.tag_id,)
+        ))
+
+        session.execute(self.DailyActivity.__table__.delete())
+        session.execute(self.DailyTagActivity.__table__.delete())
+        if days:
+            session.execute(self.DailyActivity.__table__.insert(), [
+                {'day': day, **counts} for day, counts in days.items()
+            ])
+        if tag_days:
+            session.execute(self.DailyTagActivity.__table__.insert(), [
+                {'day': day, 'tag_id': tag_id, **counts} for (day, tag_id), counts in tag_days.items()
+            ])
+        session.commit()
+        return len(days)
+
+    def _on_user_registered(self, user, **extra):
+        self.add(user.created_at, 'new_users')
+
+    def _on_question_asked(self, question, **extra):
+        self.add(question.created_at, 'questions', tag_ids=[tag.id for tag in question.tags])
+
+    def _on_answer_posted(self, answer, **extra):
+        question = answer.question
+        tag_ids = [tag.id for tag in question.tags] if question else []
+        self.add(answer.created_at, 'answers', tag_ids=tag_ids)
+
+    def _on_answer_accepted(self, answer, previous=None, **extra):
+        # Accepted answers are counted on the day the answer was posted
+        if previous is not None:
+            self.add(previous.created_at, 'accepted_answers', -1)
+        self.add(answer.created_at, 'accepted_answers')
+
+    def _on_vote_cast(self, vote, previous_value=None, **extra):
+        if previous_value is None:
+            self.add(vote.created_at, 'votes')
@@ -0,0 +1,290 @@
+"""
+Event-driven badge engine
+
+Badges are indexed by ``requirement_type``. When an event changes one of a
+user's counters, only the badges of that type are checked, against the
+counter kept on the User row rather than a fresh count of their activity.
+Given a job queue, the check runs as a background job once the change has
+committed, instead of inside the request that made it. Each award is
+announced with ``events.badge_earned`` once it has committed itself, which
+realtime.py turns into a socket push.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, event as sa_event, exists, func, inspect, literal, select
+
+from services import events
+
+# requirement_type -> User column holding the matching counter
+COUNTER_COLUMNS = {
+    'questions': 'questions_count',
+    'answers': 'answers_count',
+    'accepted_answers': 'accepted_answers_count',
+    'votes': 'votes_count',
+    'reputation': 'reputation',
+}
+
+# 'early_adopter' badges ("Joined in the first month") go to users who joined
+# within this long of the first user. Earlier versions awarded it to any
+# account up to 30 days old, so every new user earned it; that was changed on
+# purpose to match the badge's description.
+EARLY_ADOPTER_WINDOW = timedelta(days=30)
+
+_EARNED_KEY = 'earned_badges'
+
+
+class BadgeEngine:
+    """Maintain per-user activity counters and award badges as they change"""
+
+    def __init__(self, db, user_model, badge_model, user_badge_model, notification_model,
+                 question_model, answer_model, vote_model, job_queue=None):
+        self.db = db
+        self.User = user_model
+        self.Badge = badge_model
+        self.UserBadge = user_badge_model
+        self.Notification = notification_model
+        self.Question = question_model
+        self.Answer = answer_model
+        self.Vote = vote_model
+        self.job_queue = job_queue
+
+        self._rules = None
+        self._rules_lock = threading.Lock()
+        self._launch_date = None
+
+    def connect(self):
+        """Subscribe to the domain events that move badge counters"""
+        events.user_registered.connect(self._on_user_registered, weak=False)
+        events.question_asked.connect(self._on_question_asked, weak=False)
+        events.answer_posted.connect(self._on_answer_posted, weak=False)
+        events.answer_accepted.connect(self._on_answer_accepted, weak=False)
+        events.vote_cast.connect(self._on_vote_cast, weak=False)
+        events.reputation_changed.connect(self._on_reputation_changed, weak=False)
+        sa_event.listen(self.db.session, 'after_commit', self._after_commit)
+        sa_event.listen(self.db.session, 'after_soft_rollback', self._after_rollback)
+        if self.job_queue is not None:
+            # One at a time, so two checks for a user never race to award the same badge
+            self.job_queue.register('badges.evaluate', self.run_evaluation, concurrency=1)
+
+    def reload_rules(self):
+        """Forget the cached badge rules; they are reloaded on next use"""
+        with self._rules_lock:
+            self._rules = None
+
+    def rules_for(self, requirement_type):
+        """(badge id, name, requirement value) for every badge of a type, lowest first"""
+        rules = self._rules
+        if rules is None:
+            with self._rules_lock:
+                if self._rules is None:
+                    loaded = {}
+                    for badge in self.Badge.query.order_by(self.Badge.requirement_value).all():
+                        loaded.setdefault(badge.requirement_type, []).append(
+                            (badge.id, badge.name, badge.requirement_value)
+                        )
+                    self._rules = loaded
+                rules = self._rules
+        return rules.get(requirement_type, [])
+
+    def increment(self, user_id, requirement_type, delta=1):
+        """Move one of a user's counters and check the badges that depend on it"""
+        column = COUNTER_COLUMNS[requirement_type]
+        session = self.db.session
+        session.query(self.User).filter(self.User.id == user_id).update({
+            column: func.coalesce(getattr(self.User, column), 0) + delta
+        }, synchronize_session=False)
+
+        user = session.identity_map.get(session.identity_key(self.User, user_id))
+        if user is not None:
+            session.expire(user, [column])
+
+        if delta > 0:
+            return self.check(user_id, requirement_type)
+        return []
+
+    def check(self, user_id, requirement_type):
+        """Evaluate one badge type for a user now, or in a background job if there is a job queue"""
+        if self.job_queue is None:
+            return self.evaluate(user_id, requirement_type)
+        self.job_queue.enqueue('badges.evaluate', user_id=user_id, requirement_type=requirement_type)
+        return []
+
+    def run_evaluation(self, user_id, requirement_type=None):
+        """Job handler: evaluate one badge type (every type if None) and commit what was earned"""
+        if requirement_type is None:
+            earned = self.evaluate_all(user_id)
+        else:
+            earned = self.evaluate(user_id, requirement_type)
+        self.db.session.commit()
+        return earned
+
+    def evaluate(self, user_id, requirement_type, value=None):
+        """Award any badges of one type the user now qualifies for.
+
+        Returns the names of newly earned badges. They are added to the
+        current session, along with a notification for each, and are
+        committed by the caller: the ``badges.evaluate`` job, or the request
+        itself when there is no job queue. ``events.badge_earned`` is sent
+        for each once that commit succeeds.
+        """
+        rules = self.rules_for(requirement_type)
+        if not rules:
+            return []
+
+        if value is None:
+            column = getattr(self.User, COUNTER_COLUMNS[requirement_type])
+            value = self.db.session.query(column).filter(self.User.id == user_id).scalar() or 0
+
+        eligible = [(badge_id, name) for badge_id, name, threshold in rules if value >= threshold]
+        if not eligible:
+            return []
+        return self._award(user_id, eligible)
+
+    def evaluate_all(self, user_id):
+        """Check every badge type for one user"""
+        earned = []
+        for requirement_type in COUNTER_COLUMNS:
+            earned.extend(self.evaluate(user_id, requirement_type))
+        earned.extend(self._evaluate_early_adopter(user_id))
+        return earned
+
+    def refresh_counters(self):
+        """Recount every user's activity counters in one UPDATE"""
+        user = self.User.__table__
+        question = self.Question.__table__
+        answer = self.Answer.__table__
+        vote = self.Vote.__table__
+
+        def count(table, *criteria):
+            return select(func.count()).select_from(table).where(
+                table.c.user_id == user.c.id, *criteria
+            ).scalar_subquery()
+
+        self.db.session.execute(user.update().values(
+            questions_count=count(question),
+            answers_count=count(answer),
+            accepted_answers_count=count(answer, answer.c.is_accepted == True),
+            votes_count=count(vote)
+        ))
+
+    def backfill(self):
+        """Recount counters and award every earned badge to every user in bulk.
+
+        Issues one INSERT ... SELECT per requirement type and returns the
+        number of badges awarded. No notifications are sent for backfilled badges.
+        """
+        user = self.User.__table__
+        badge = self.Badge.__table__
+        user_badge = self.UserBadge.__table__
+        session = self.db.session
+        now = datetime.utcnow()
+
+        self.refresh_counters()
+        before = session.query(func.count(self.UserBadge.id)).scalar()
+
+        not_awarded = ~exists().where(and_(
+            user_badge.c.user_id == user.c.id,
+            user_badge.c.badge_id == badge.c.id
+        ))
+
+        for requirement_type, column in COUNTER_COLUMNS.items():
+            source = select(user.c.id, badge.c.id, literal(now)).select_from(
+                user.join(badge, and_(
+                    badge.c.requirement_type == requirement_type,
+                    func.coalesce(user.c[column], 0) >= badge.c.requirement_value
+                ))
+            ).where(not_awarded)
+            session.execute(user_badge.insert().from_select(['user_id', 'badge_id', 'earned_at'], source))
+
+        launch_date = self._get_launch_date()
+        if launch_date is not None:
+            source = select(user.c.id, badge.c.id, literal(now)).select_from(
+                user.join(badge, badge.c.requirement_type == 'early_adopter')
+            ).where(user.c.created_at <= launch_date + EARLY_ADOPTER_WINDOW, not_awarded)
+            session.execute(user_badge.insert().from_select(['user_id', 'badge_id', 'earned_at'], source))
+
+        session.commit()
+        self.reload_rules()
+        return session.query(func.count(self.UserBadge.id)).scalar() - before
+
+    def _award(self, user_id, eligible):
+        session = self.db.session
+        badge_ids = [badge_id for badge_id, _ in eligible]
+        owned = {
+            badge_id for (badge_id,) in session.query(self.UserBadge.badge_id).filter(
+                self.UserBadge.user_id == user_id,
+                self.UserBadge.badge_id.in_(badge_ids)
+            )
+        }
+
+        earned = []
+        for badge_id, name in eligible:
+            if badge_id in owned:
+                continue
+            session.add(self.UserBadge(user_id=user_id, badge_id=badge_id))
+            content = f'Congratulations! You earned the "{name}" badge!'
+            created_at = datetime.utcnow()
+            notification = self.Notification(
+                user_id=user_id, content=content, notification_type='achievement', created_at=created_at
+            )
+            session.add(notification)
+            session.info.setdefault(_EARNED_KEY, []).append((user_id, name, notification, content, created_at))
+            earned.append(name)
+        return earned
+
+    def _after_commit(self, session):
+        awards = session.info.pop(_EARNED_KEY, None)
+        if not awards:
+            return
+        for user_id, name, notification, content, created_at in awards:
+            events.badge_earned.send(user_id, badge=name, notification={
+                # The id from the identity key; reading notification.id would refresh the expired row
+                'id': inspect(notification).identity[0],
+                'content': content,
+                'type': 'achievement',
+                'created_at': created_at.isoformat(),
+            })
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(_EARNED_KEY, None)
+
+    def _get_launch_date(self):
+        if self._launch_date is None:
+            self._launch_date = self.db.session.query(func.min(self.User.created_at)).scalar()
+        return self._launch_date
+
+    def _evaluate_early_adopter(self, user_id, joined_at=None):
+        rules = self.rules_for('early_adopter')
+        if not rules:
+            return []
+        if joined_at is None:
+            joined_at = self.db.session.query(self.User.created_at).filter(self.User.id == user_id).scalar()
+        launch_date = self._get_launch_date()
+        if joined_at is None or launch_date is None or joined_at > launch_date + EARLY_ADOPTER_WINDOW:
+            return []
+        return self._award(user_id, [(badge_id, name) for badge_id, name, _ in rules])
+
+    def _on_user_registered(self, user, **extra):
+        self._evaluate_early_adopter(user.id, user.created_at)
+
+    def _on_question_asked(self, question, **extra):
+        self.increment(question.user_id, 'questions')
+
+    def _on_answer_posted(self, answer, **extra):
+        self.increment(answer.user_id, 'answers')
+
+    def _on_answer_accepted(self, answer, previous=None, **extra):
+        if previous is not None:
+            self.increment(previous.user_id, 'accepted_answers', -1)
+        self.increment(answer.user_id, 'accepted_answers')
+
+    def _on_vote_cast(self, vote, previous_value=None, **extra):
+        # Changing an existing vote doesn't cast a new one
+        if previous_value is None:
+            self.increment(vote.user_id, 'votes')
+
+    def _on_reputation_changed(self, user_id, delta=0, **extra):
+        if delta > 0:
+            self.check(user_id, 'reputation')
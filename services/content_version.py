@@ -0,0 +1,126 @@
+"""
+Scoped content versions
+
+Cached pages are keyed by the versions of the content they show: the
+question list (``LIST_SCOPE``), one question and its answers
+(``question_scope(id)``), and ``GLOBAL_SCOPE``, which every page includes
+and which is bumped by writes that can change any page (deleted accounts,
+re-rendered content). Each write bumps only the scopes it changes, so a
+vote on an answer invalidates that question's page and nothing else.
+
+Bumps are collected during the transaction and applied through the write
+queue once it commits, so the user's transaction never locks a version
+row and concurrent writes don't queue up behind one another.
+
+Reads are cached per process for a short TTL. The worker that made the
+write sees the new versions immediately; other workers pick them up once
+their copy expires.
+"""
+
+import time
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.exc import IntegrityError
+
+from services import events
+from utils.response_cache import MemoryStore
+
+GLOBAL_SCOPE = 'all'
+LIST_SCOPE = 'list'
+
+_BUMPED_KEY = 'content_versions_bumped'
+
+
+def question_scope(question_id):
+    return f'question:{question_id}'
+
+
+class ContentVersionCounter:
+    """Read and bump the ``content_versions`` counters"""
+
+    def __init__(self, db, version_model, write_queue, ttl=1, max_entries=10000):
+        self.db = db
+        self.ContentVersion = version_model
+        self.write_queue = write_queue
+        self.ttl = ttl
+        self._versions = MemoryStore(max_entries)
+
+    def connect(self):
+        events.question_asked.connect(self._on_question_asked, weak=False)
+        events.answer_posted.connect(self._on_answer_changed, weak=False)
+        events.answer_accepted.connect(self._on_answer_changed, weak=False)
+        events.vote_cast.connect(self._on_vote_cast, weak=False)
+        sa_event.listen(self.db.session, 'after_commit', self._after_commit)
+        sa_event.listen(self.db.session, 'after_soft_rollback', self._after_rollback)
+
+    def current(self, *scopes):
+        """The latest committed version of ``scopes`` and the global scope (at most ``ttl`` seconds old)"""
+        scopes = (GLOBAL_SCOPE,) + scopes
+        now = time.monotonic()
+        versions = {}
+        for scope in scopes:
+            entry = self._versions.get(scope)
+            if entry is not None and now - entry[1] < self.ttl:
+                versions[scope] = entry[0]
+
+        missing = [scope for scope in scopes if scope not in versions]
+        if missing:
+            loaded = dict(self.db.session.query(self.ContentVersion.scope, self.ContentVersion.version)
+                          .filter(self.ContentVersion.scope.in_(missing)))
+            for scope in missing:
+                versions[scope] = loaded.get(scope, 0)
+                self._versions.set(scope, (versions[scope], now))
+        return '.'.join(str(versions[scope]) for scope in scopes)
+
+    def bump(self, *scopes):
+        """Increment ``scopes`` (default: the global one) once the current transaction commits"""
+        scopes = set(scopes or (GLOBAL_SCOPE,))
+        session = self.db.session()
+        # Outside a transaction there is nothing to wait for
+        if session.in_transaction():
+            session.info.setdefault(_BUMPED_KEY, set()).update(scopes)
+        else:
+            self._apply(scopes)
+
+    def _apply(self, scopes):
+        table = self.ContentVersion.__table__
+
+        def increment(connection):
+            for scope in sorted(scopes):
+                update = table.update().where(table.c.scope == scope).values(version=table.c.version + 1)
+                if connection.execute(update).rowcount:
+                    continue
+                try:
+                    with connection.begin_nested():
+                        connection.execute(table.insert().values(scope=scope, version=1))
+                except IntegrityError:
+                    # Another process created the row first
+                    connection.execute(update)
+
+        try:
+            self.write_queue.execute(increment)
+        except Exception as e:
+            print(f"Content version bump failed: {e}")
+        for scope in scopes:
+            self._versions.delete(scope)
+
+    def _on_question_asked(self, question, **extra):
+        self.bump(LIST_SCOPE, question_scope(question.id))
+
+    def _on_answer_changed(self, answer, **extra):
+        # Question cards show answer counts and whether one is accepted
+        self.bump(LIST_SCOPE, question_scope(answer.question_id))
+
+    def _on_vote_cast(self, vote, **extra):
+        if vote.question_id is not None:
+            self.bump(LIST_SCOPE, question_scope(vote.question_id))
+        elif vote.answer is not None:
+            self.bump(question_scope(vote.answer.question_id))
+
+    def _after_commit(self, session):
+        scopes = session.info.pop(_BUMPED_KEY, None)
+        if scopes:
+            self._apply(scopes)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(_BUMPED_KEY, None)
@@ -0,0 +1,34 @@
+"""
+Domain events emitted by the write paths
+
+Handlers run synchronously inside the caller's transaction, so anything they
+write is committed (or rolled back) together with the change that caused it.
+Write paths flush before sending so the sender always has its primary key.
+"""
+
+from blinker import Namespace
+
+_events = Namespace()
+
+# sender: the new User
+user_registered = _events.signal('user-registered')
+
+# sender: the new Question
+question_asked = _events.signal('question-asked')
+
+# sender: the new Answer
+answer_posted = _events.signal('answer-posted')
+
+# sender: the accepted Answer; previous: the Answer it replaced, or None
+answer_accepted = _events.signal('answer-accepted')
+
+# sender: the Vote; previous_value: the value it had before, or None for a new vote
+vote_cast = _events.signal('vote-cast')
+
+# sender: the user id; delta: the signed change that was just applied
+reputation_changed = _events.signal('reputation-changed')
+
+# sender: the user id; badge: the badge name; notification: its stored
+# Notification as {'id', 'content', 'type', 'created_at'}. Unlike the events
+# above, sent after the award has committed, for pushing it to the user.
+badge_earned = _events.signal('badge-earned')
@@ -0,0 +1,153 @@
+"""
+Cached identity of the logged-in user
+
+Flask-Login loads the user on every authenticated request, including the
+notification and stats polls. ``IdentityCache.load`` answers from a
+per-process snapshot of the user's summary columns, kept for ``ttl``
+seconds, and returns a ``UserIdentity`` wrapping it. Only a route that needs
+more than the snapshot (another column, a relationship, a method, a write)
+makes the identity load the User row.
+
+Snapshots are dropped when a transaction that changed the user commits:
+settings, password and account changes, and the reputation and activity
+counters updated by the write events. Other workers keep their copy until
+it expires. If the user was deleted meanwhile, the first access that needs
+the row raises ``UserDeleted``, which drops the snapshot; the app answers
+it by logging the user out, and the loader finds no user from then on.
+"""
+
+import threading
+import time
+
+from flask_login import UserMixin
+from sqlalchemy import event as sa_event
+
+from services import events
+from utils.response_cache import MemoryStore
+
+_CHANGED_KEY = 'identity_changed_user_ids'
+
+
+class UserDeleted(Exception):
+    """The logged-in user's row is gone, though their snapshot was still cached"""
+
+
+class UserIdentity(UserMixin):
+    """The logged-in user as far as most requests need to know.
+
+    Reads of snapshot columns are answered from the snapshot until anything
+    else is touched. From then on every attribute, including the snapshot
+    columns and writes, goes to the User row.
+    """
+
+    def __init__(self, snapshot, load_user, on_deleted):
+        object.__setattr__(self, '_snapshot', snapshot)
+        object.__setattr__(self, '_load_user', load_user)
+        object.__setattr__(self, '_on_deleted', on_deleted)
+        object.__setattr__(self, '_user', None)
+
+    @property
+    def user(self):
+        """The full User row, loaded on first use. Raises UserDeleted if it no longer exists."""
+        if self._user is None:
+            user = self._load_user(self._snapshot['id'])
+            if user is None:
+                self._on_deleted(self._snapshot['id'])
+                raise UserDeleted(self._snapshot['id'])
+            object.__setattr__(self, '_user', user)
+        return self._user
+
+    def __getattr__(self, name):
+        if self._user is None and name in self._snapshot:
+            return self._snapshot[name]
+        return getattr(self.user, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.user, name, value)
+
+    def __repr__(self):
+        return f"<UserIdentity {self._snapshot['id']} {self._snapshot.get('username')!r}>"
+
+
+class IdentityCache:
+    """Snapshots of users' ``columns`` for the Flask-Login user loader"""
+
+    def __init__(self, db, user_model, columns, ttl=30, max_entries=10000, enabled=True):
+        self.db = db
+        self.User = user_model
+        self.columns = [getattr(user_model, name) for name in columns]
+        self.ttl = ttl
+        self.enabled = enabled
+        self._snapshots = MemoryStore(max_entries)
+        # Bumped by every invalidation, so a snapshot read while one happened is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def connect(self):
+        events.question_asked.connect(self._on_authored, weak=False)
+        events.answer_posted.connect(self._on_authored, weak=False)
+        events.answer_accepted.connect(self._on_answer_accepted, weak=False)
+        events.vote_cast.connect(self._on_authored, weak=False)
+        events.reputation_changed.connect(self._on_reputation_changed, weak=False)
+        sa_event.listen(self.db.session, 'after_flush', self._after_flush)
+        sa_event.listen(self.db.session, 'after_commit', self._after_commit)
+        sa_event.listen(self.db.session, 'after_soft_rollback', self._after_rollback)
+
+    def load(self, user_id):
+        """A UserIdentity for ``user_id``, or the User itself with the cache disabled; None if there is no such user"""
+        if not self.enabled:
+            return self._load_user(user_id)
+
+        cached = self._snapshots.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return UserIdentity(cached[1], self._load_user, self.invalidate)
+
+        generation = self._generation
+        row = self.db.session.query(*self.columns).filter(self.User.id == user_id).first()
+        if row is None:
+            return None
+        snapshot = dict(row._mapping)
+        with self._lock:
+            if generation == self._generation:
+                self._snapshots.set(user_id, (time.monotonic(), snapshot))
+        return UserIdentity(snapshot, self._load_user, self.invalidate)
+
+    def invalidate(self, *user_ids):
+        """Drop the snapshots of ``user_ids`` now"""
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._snapshots.delete(user_id)
+
+    def _load_user(self, user_id):
+        return self.db.session.get(self.User, user_id)
+
+    def _changed(self, *user_ids):
+        self.db.session().info.setdefault(_CHANGED_KEY, set()).update(
+            user_id for user_id in user_ids if user_id is not None
+        )
+
+    def _on_authored(self, sender, **extra):
+        self._changed(sender.user_id)
+
+    def _on_answer_accepted(self, answer, previous=None, **extra):
+        self._changed(answer.user_id, previous.user_id if previous is not None else None)
+
+    def _on_reputation_changed(self, user_id, **extra):
+        self._changed(user_id)
+
+    def _after_flush(self, session, flush_context):
+        user_ids = [
+            instance.id for instance in list(session.dirty) + list(session.deleted)
+            if isinstance(instance, self.User)
+        ]
+        if user_ids:
+            session.info.setdefault(_CHANGED_KEY, set()).update(user_ids)
+
+    def _after_commit(self, session):
+        user_ids = session.info.pop(_CHANGED_KEY, None)
+        if user_ids:
+            self.invalidate(*user_ids)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,381 @@
+"""
+Background jobs for post-commit side effects
+
+``JobQueue.enqueue(job_type, **payload)`` adds a row to the ``job`` table
+in the current transaction. When the transaction commits, the job is handed
+to a thread pool. If it rolls back, the job is never run. Because the row
+is written with the change that caused it, a job survives a crash or
+restart: the poller finds queued jobs left in the table (and jobs whose
+worker died mid-run, once their lease expires) and runs them. ``submit()``
+instead writes the job in a transaction of its own, for work that doesn't
+depend on what the caller has yet to commit.
+
+Each job type has a handler, registered with ``register()``, that is called
+with the payload's keyword arguments inside an app context and commits its
+own work. The job's row is marked done in the transaction the handler
+commits, so a worker dying before the row is deleted can't run the job
+again; a handler that commits more than once should leave its last commit
+for the work that finishes it. A handler that raises is retried after ``retry_delay`` seconds,
+doubling with every attempt, up to ``max_attempts`` runs; after that the
+row is kept with status ``failed`` and the last error. Finished jobs are
+deleted.
+
+A job type may set ``concurrency`` to cap how many of its jobs run at once;
+the rest wait their turn in memory. At most ``max_pending`` jobs wait in
+memory at any time. Beyond that they stay in the table until the poller
+gets to them, so a burst of writes never blocks a request or grows the
+worker's memory. Handlers registered with ``process=True`` run in a process
+pool when ``processes`` is set; they must be module-level functions and
+set up their own app context.
+
+With ``enabled=False`` jobs run in the committing thread, straight after
+the commit, and a failed job stays queued in the table.
+"""
+
+import atexit
+import json
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import event as sa_event, func, inspect, or_, select
+
+QUEUED = 'queued'
+RUNNING = 'running'
+FAILED = 'failed'
+DONE = 'done'
+
+_ENQUEUED_KEY = 'enqueued_jobs'
+_RUNNING_KEY = 'running_job'
+
+
+class _JobType:
+    __slots__ = ('handler', 'concurrency', 'max_attempts', 'process')
+
+    def __init__(self, handler, concurrency, max_attempts, process):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.process = process
+
+
+class JobQueue:
+    """Run registered job types on a worker pool once the transaction that enqueued them commits"""
+
+    def __init__(self, app, db, job_model, write_queue, workers=4, processes=0, max_attempts=5,
+                 retry_delay=5.0, poll_interval=5.0, lease=300, max_pending=1000, enabled=True):
+        self.app = app
+        self.db = db
+        self.Job = job_model
+        self.table = job_model.__table__
+        self.write_queue = write_queue
+        self.workers = workers
+        self.processes = processes
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_pending = max_pending
+        self.enabled = enabled
+
+        self._types = {}
+        self._waiting = defaultdict(deque)
+        self._running = Counter()
+        self._scheduled = set()
+        self._counts = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = None
+        self._process_pool = None
+        self._thread_lock = threading.Lock()
+
+    def connect(self):
+        """Dispatch jobs when the transaction that enqueued them commits"""
+        sa_event.listen(self.db.session, 'before_commit', self._before_commit)
+        sa_event.listen(self.db.session, 'after_commit', self._after_commit)
+        sa_event.listen(self.db.session, 'after_soft_rollback', self._after_rollback)
+
+    def register(self, job_type, handler, concurrency=None, max_attempts=None, process=False):
+        """Run ``handler(**payload)`` for jobs of ``job_type``, at most ``concurrency`` at a time"""
+        self._types[job_type] = _JobType(handler, concurrency, max_attempts or self.max_attempts, process)
+
+    def enqueue(self, job_type, **payload):
+        """Add a job to the current transaction; it runs after the transaction commits"""
+        if job_type not in self._types:
+            raise ValueError(f'Unknown job type: {job_type}')
+        job = self.Job(job_type=job_type, payload=json.dumps(payload), status=QUEUED)
+        session = self.db.session()
+        session.add(job)
+        session.info.setdefault(_ENQUEUED_KEY, []).append((job, job_type))
+        return job
+
+    def submit(self, job_type, **payload):
+        """Write a job in a transaction of its own and run it; the caller's session is left alone.
+
+        For jobs that don't depend on the caller's uncommitted changes. On
+        SQLite, call it before the caller's session writes anything: the
+        job's transaction would otherwise wait on the caller's lock. Returns
+        the job id.
+        """
+        if job_type not in self._types:
+            raise ValueError(f'Unknown job type: {job_type}')
+        job_id = self.write_queue.execute(lambda connection: connection.execute(
+            self.table.insert().values(job_type=job_type, payload=json.dumps(payload), status=QUEUED)
+        ).inserted_primary_key[0])
+        self._dispatch(job_id, job_type)
+        return job_id
+
+    def metrics(self):
+        """Queue depth and outcomes per job type: in this worker's memory and in the job table"""
+        with self._lock:
+            report = {
+                job_type: {
+                    'waiting': len(self._waiting[job_type]),
+                    'running': self._running[job_type],
+                    'concurrency': spec.concurrency,
+                    **self._counts[job_type],
+                }
+                for job_type, spec in self._types.items()
+            }
+        rows = self.db.session.query(self.table.c.job_type, self.table.c.status, func.count()).group_by(
+            self.table.c.job_type, self.table.c.status
+        ).all()
+        for job_type, status, count in rows:
+            report.setdefault(job_type, {}).setdefault('table', {})[status] = count
+        return report
+
+    def join(self, timeout=None):
+        """Wait until no job is waiting or running in this worker. Returns whether it got there."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._idle:
+            while self._scheduled:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def shutdown(self):
+        """Stop polling and wait for the jobs already running; queued ones stay in the table"""
+        self._stopped.set()
+        self._wakeup.set()
+        threads = self._threads
+        if threads is not None:
+            threads.shutdown(wait=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+
+    def poll(self):
+        """Dispatch jobs from the table that are due, including ones a dead worker left running"""
+        now = datetime.utcnow()
+        with self._lock:
+            room = self.max_pending - len(self._scheduled)
+            scheduled = set(self._scheduled)
+        if room <= 0:
+            return 0
+        query = select(self.table.c.id, self.table.c.job_type).where(
+            or_(
+                (self.table.c.status == QUEUED) & (self.table.c.run_after <= now),
+                (self.table.c.status == RUNNING) & (self.table.c.claimed_at <= now - timedelta(seconds=self.lease)),
+            ),
+            self.table.c.job_type.in_(list(self._types)),
+        ).order_by(self.table.c.id).limit(room + len(scheduled))
+        with self.app.app_context():
+            with self.db.engine.connect() as connection:
+                due = connection.execute(query).all()
+        dispatched = 0
+        for job_id, job_type in due:
+            if job_id not in scheduled:
+                dispatched += self._dispatch(job_id, job_type)
+        return dispatched
+
+    # Dispatching
+
+    def _before_commit(self, session):
+        # A handler's first successful commit marks its job done
+        running = session.info.get(_RUNNING_KEY)
+        if running is not None and not running['finished']:
+            session.execute(self.table.update().where(self.table.c.id == running['id']).values(status=DONE))
+            running['finishing'] = True
+
+    def _after_commit(self, session):
+        running = session.info.get(_RUNNING_KEY)
+        if running is not None and running['finishing']:
+            running['finishing'], running['finished'] = False, True
+        jobs = session.info.pop(_ENQUEUED_KEY, None)
+        if not jobs:
+            return
+        for job, job_type in jobs:
+            # The id from the identity key; reading job.id would refresh the expired row
+            self._dispatch(inspect(job).identity[0], job_type)
+
+    def _after_rollback(self, session, previous_transaction):
+        running = session.info.get(_RUNNING_KEY)
+        if running is not None:
+            running['finishing'] = False
+        session.info.pop(_ENQUEUED_KEY, None)
+
+    def _dispatch(self, job_id, job_type):
+        """Start a job, or queue it behind its type's running jobs. Returns 1 if taken, 0 if left to the poller."""
+        if not self.enabled:
+            self._run(job_id)
+            return 1
+        if self._stopped.is_set():
+            return 0
+        self.start()
+        spec = self._types[job_type]
+        with self._lock:
+            if job_id in self._scheduled or len(self._scheduled) >= self.max_pending:
+                return 0
+            self._scheduled.add(job_id)
+            if spec.concurrency is not None and self._running[job_type] >= spec.concurrency:
+                self._waiting[job_type].append(job_id)
+                return 1
+            self._running[job_type] += 1
+        self._threads.submit(self._work, job_id, job_type)
+        return 1
+
+    def _work(self, job_id, job_type):
+        try:
+            self._run(job_id)
+        finally:
+            with self._lock:
+                self._scheduled.discard(job_id)
+                waiting = self._waiting[job_type]
+                next_id = waiting.popleft() if waiting else None
+                if next_id is None:
+                    self._running[job_type] -= 1
+                if not self._scheduled:
+                    self._idle.notify_all()
+            if next_id is not None:
+                try:
+                    self._threads.submit(self._work, next_id, job_type)
+                except RuntimeError:
+                    # Shutting down; the job stays queued in the table
+                    with self._lock:
+                        self._scheduled.discard(next_id)
+                        self._running[job_type] -= 1
+                        self._idle.notify_all()
+
+    def start(self):
+        """Start the worker pool and the poller, which also picks up jobs left by a previous run"""
+        if self._threads is not None:
+            return
+        with self._thread_lock:
+            if self._threads is not None:
+                return
+            if self.processes:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.processes)
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job-worker')
+            # Jobs a worker finished but died before deleting
+            self.write_queue.execute(lambda connection: connection.execute(
+                self.table.delete().where(self.table.c.status == DONE)
+            ))
+            threading.Thread(target=self._poll_forever, name='job-poller', daemon=True).start()
+            atexit.register(self.shutdown)
+
+    def _poll_forever(self):
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Job poll failed: {e}")
+            self._wakeup.wait(self.poll_interval)
+
+    # Running
+
+    def _run(self, job_id):
+        job = self._claim(job_id)
+        if job is None:
+            return
+        job_type, payload, attempts = job
+        spec = self._types[job_type]
+        running = {'id': job_id, 'finishing': False, 'finished': False}
+        try:
+            if spec.process and self._process_pool is not None:
+                self._process_pool.submit(spec.handler, **payload).result()
+            else:
+                with self.app.app_context():
+                    session = self.db.session()
+                    session.info[_RUNNING_KEY] = running
+                    try:
+                        spec.handler(**payload)
+                    except Exception:
+                        self.db.session.rollback()
+                        raise
+                    finally:
+                        session.info.pop(_RUNNING_KEY, None)
+        except Exception as e:
+            if running['finished']:
+                # The handler's commit marked the job done; its work stands
+                print(f"Job {job_id} failed after committing: {e}")
+                self._count(job_type, 'failed')
+                return
+            retry = attempts < spec.max_attempts
+            self._fail(job_id, e, retry, attempts)
+            self._count(job_type, 'retried' if retry else 'failed')
+        else:
+            done = self.table.c.status == DONE if running['finished'] else self.table.c.status == RUNNING
+            self.write_queue.execute(lambda connection: connection.execute(
+                self.table.delete().where(self.table.c.id == job_id, done)
+            ))
+            self._count(job_type, 'completed')
+
+    def _claim(self, job_id):
+        """Mark a due job running; (job_type, payload, attempts), or None if it isn't ours to run"""
+        table = self.table
+        now = datetime.utcnow()
+
+        def claim(connection):
+            claimed = connection.execute(table.update().where(
+                table.c.id == job_id,
+                or_(
+                    (table.c.status == QUEUED) & (table.c.run_after <= now),
+                    (table.c.status == RUNNING) & (table.c.claimed_at <= now - timedelta(seconds=self.lease)),
+                )
+            ).values(status=RUNNING, claimed_at=now, attempts=table.c.attempts + 1))
+            if claimed.rowcount != 1:
+                return None
+            return connection.execute(
+                select(table.c.job_type, table.c.payload, table.c.attempts).where(table.c.id == job_id)
+            ).first()
+
+        row = self.write_queue.execute(claim)
+        if row is None:
+            return None
+        return row.job_type, json.loads(row.payload), row.attempts
+
+    def _fail(self, job_id, error, retry, attempts):
+        values = {'last_error': ''.join(traceback.format_exception_only(type(error), error)).strip()}
+        if retry:
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            values.update(status=QUEUED, run_after=datetime.utcnow() + timedelta(seconds=delay))
+        else:
+            values.update(status=FAILED)
+        self.write_queue.execute(lambda connection: connection.execute(
+            self.table.update().where(self.table.c.id == job_id).values(**values)
+        ))
+        print(f"Job {job_id} failed (attempt {attempts}): {values['last_error']}")
+        if retry and self.enabled:
+            timer = threading.Timer(delay, self._retry, (job_id,))
+            timer.daemon = True
+            timer.start()
+
+    def _retry(self, job_id):
+        job_type = None
+        with self.app.app_context():
+            with self.db.engine.connect() as connection:
+                job_type = connection.execute(
+                    select(self.table.c.job_type).where(self.table.c.id == job_id, self.table.c.status == QUEUED)
+                ).scalar()
+        if job_type is not None:
+            self._dispatch(job_id, job_type)
+
+    def _count(self, job_type, outcome):
+        with self._lock:
+            self._counts[job_type][outcome] += 1
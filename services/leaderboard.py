@@ -0,0 +1,153 @@
+"""
+Materialized reputation leaderboards
+
+Each period ('all', 'week', 'month') is kept in memory as a list of
+``(-score, user_id)`` tuples in sorted order, so the top N is a slice and a
+user's rank is one binary search. Boards are rebuilt from the database when
+they are older than the refresh interval and are patched in between with
+every committed reputation change, so new activity shows up immediately
+while old events age out of the weekly and monthly windows on rebuild.
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from sqlalchemy import event as sa_event, func
+
+from services import events
+from services.reputation import BASE_REPUTATION
+
+PERIODS = {
+    'all': None,
+    'week': timedelta(days=7),
+    'month': timedelta(days=30),
+}
+
+
+class Leaderboard:
+    """Scores for one period, kept sorted for O(log n) rank lookups.
+
+    ``base`` is the score a user who isn't on the board yet starts from when
+    a change is applied to them: their base reputation on the all-time
+    board, nothing on the windowed ones.
+    """
+
+    def __init__(self, scores, base=0):
+        self.base = base
+        self._scores = dict(scores)
+        self._entries = sorted((-score, user_id) for user_id, score in self._scores.items())
+        self._lock = threading.Lock()
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def top(self, limit):
+        """[(rank, user_id, score)] for the highest scores"""
+        with self._lock:
+            entries = self._entries[:limit]
+        return self._ranked(entries)
+
+    def rank(self, user_id):
+        """(rank, score) for a user, or None if they aren't on the board.
+
+        Tied users share the best rank, e.g. 1, 2, 2, 4.
+        """
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return None
+            return bisect_left(self._entries, (-score,)) + 1, score
+
+    def add(self, user_id, delta):
+        """Apply a score change without rebuilding the board"""
+        with self._lock:
+            old = self._scores.get(user_id)
+            if old is not None:
+                del self._entries[bisect_left(self._entries, (-old, user_id))]
+            new = (self.base if old is None else old) + delta
+            self._scores[user_id] = new
+            insort(self._entries, (-new, user_id))
+
+    def _ranked(self, entries):
+        ranked = []
+        previous_score = None
+        rank = 0
+        for position, (negative_score, user_id) in enumerate(entries, start=1):
+            score = -negative_score
+            if score != previous_score:
+                rank = position
+                previous_score = score
+            ranked.append((rank, user_id, score))
+        return ranked
+
+
+class LeaderboardService:
+    """Build, cache and incrementally update the leaderboard for each period"""
+
+    def __init__(self, db, user_model, event_model, refresh_interval=300):
+        self.db = db
+        self.User = user_model
+        self.ReputationEvent = event_model
+        self.refresh_interval = refresh_interval
+
+        self._boards = {}
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Follow reputation changes, applying them once their transaction commits"""
+        events.reputation_changed.connect(self._on_reputation_changed, weak=False)
+        sa_event.listen(self.db.session, 'after_commit', self._after_commit)
+        sa_event.listen(self.db.session, 'after_soft_rollback', self._after_rollback)
+
+    def board(self, period='all'):
+        """The Leaderboard for a period, rebuilt first if it has gone stale"""
+        if period not in PERIODS:
+            raise ValueError(f'Unknown leaderboard period: {period}')
+
+        board = self._boards.get(period)
+        if board is None or time.monotonic() - board.built_at > self.refresh_interval:
+            with self._lock:
+                board = self._boards.get(period)
+                if board is None or time.monotonic() - board.built_at > self.refresh_interval:
+                    base = BASE_REPUTATION if PERIODS[period] is None else 0
+                    board = Leaderboard(self._load_scores(period), base=base)
+                    self._boards[period] = board
+        return board
+
+    def invalidate(self):
+        """Drop every board so the next read rebuilds it"""
+        with self._lock:
+            self._boards.clear()
+
+    def _load_scores(self, period):
+        window = PERIODS[period]
+        if window is None:
+            return self.db.session.query(
+                self.User.id,
+                func.coalesce(self.User.reputation, BASE_REPUTATION)
+            ).all()
+
+        cutoff = datetime.utcnow() - window
+        return self.db.session.query(
+            self.ReputationEvent.user_id,
+            func.sum(self.ReputationEvent.delta)
+        ).filter(
+            self.ReputationEvent.created_at >= cutoff
+        ).group_by(self.ReputationEvent.user_id).all()
+
+    def _on_reputation_changed(self, user_id, delta=0, **extra):
+        self.db.session().info.setdefault('leaderboard_deltas', []).append((user_id, delta))
+
+    def _after_commit(self, session):
+        deltas = session.info.pop('leaderboard_deltas', None)
+        if not deltas:
+            return
+        for board in list(self._boards.values()):
+            for user_id, delta in deltas:
+                board.add(user_id, delta)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('leaderboard_deltas', None)
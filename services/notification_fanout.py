@@ -0,0 +1,111 @@
+"""
+Background fan-out of new-question notifications
+"""
+
+from datetime import datetime
+
+from services import events
+
+
+class NotificationFanout:
+    """Notify everyone interested in a question's tags, off the request thread.
+
+    Every question asked queues a ``notifications.fan_out`` job
+    (services/jobs.py) in its transaction, and ``submit()`` queues one
+    directly, with what the notification needs: tag ids, author and text.
+    The job takes the recipients from the tags' subscribers
+    (services/subscriptions.py) and queues one ``notifications.fan_out_chunk``
+    job per ``chunk_size`` of them. Each chunk job inserts its notifications
+    with one statement and queues a ``notifications.emit`` job, which sends
+    them to the chunk's rooms with a single ``emit`` that encodes the packet
+    once for the whole chunk.
+
+    Every step commits its rows together with the job for the next step,
+    and the job queue marks a job done in the transaction its handler
+    commits, so a step that fails, or whose worker dies, is retried from
+    where it stopped: a chunk's notifications are never stored twice. Only
+    an emit, which commits nothing, can be repeated if its worker dies
+    before the job is deleted.
+
+    Fan-outs run one at a time. Any beyond the job queue's in-memory limit
+    wait in the job table, so a burst of questions neither blocks the
+    posters nor piles up in memory, and no notification is dropped.
+    """
+
+    JOB_TYPE = 'notifications.fan_out'
+    CHUNK_JOB_TYPE = 'notifications.fan_out_chunk'
+    EMIT_JOB_TYPE = 'notifications.emit'
+
+    def __init__(self, db, notification_model, tag_subscriptions, job_queue, emit, chunk_size=500):
+        self.db = db
+        self.notification_table = notification_model.__table__
+        self.tag_subscriptions = tag_subscriptions
+        self.job_queue = job_queue
+        self.emit = emit
+        self.chunk_size = chunk_size
+
+    def connect(self):
+        """Register the fan-out jobs and notify about every question asked"""
+        self.job_queue.register(self.JOB_TYPE, self.deliver, concurrency=1)
+        self.job_queue.register(self.CHUNK_JOB_TYPE, self.store_chunk)
+        self.job_queue.register(self.EMIT_JOB_TYPE, self.send_chunk)
+        events.question_asked.connect(self._on_question_asked, weak=False)
+
+    def submit(self, tag_ids, author_id, content, notification_type='info'):
+        """Queue a notification for everyone subscribed to ``tag_ids``, except ``author_id``"""
+        tag_ids = list(tag_ids)
+        if not tag_ids:
+            return
+        self.job_queue.submit(
+            self.JOB_TYPE,
+            tag_ids=tag_ids, author_id=author_id, content=content, notification_type=notification_type
+        )
+
+    def _on_question_asked(self, question, **extra):
+        tag_ids = [tag.id for tag in question.tags]
+        if tag_ids:
+            self.job_queue.enqueue(
+                self.JOB_TYPE,
+                tag_ids=tag_ids, author_id=question.user_id,
+                content=f'New question: "{question.title}" in tags you follow', notification_type='info'
+            )
+
+    def recipients(self, tag_ids, author_id):
+        """Ids of the users subscribed to any of ``tag_ids``"""
+        return sorted(self.tag_subscriptions.subscribers(tag_ids, exclude=author_id))
+
+    def deliver(self, tag_ids, author_id, content, notification_type='info'):
+        """Job handler: queue one chunk job per ``chunk_size`` recipients. Returns the number of recipients."""
+        user_ids = self.recipients(tag_ids, author_id)
+        created_at = datetime.utcnow().isoformat()
+        for start in range(0, len(user_ids), self.chunk_size):
+            self.job_queue.enqueue(
+                self.CHUNK_JOB_TYPE,
+                user_ids=user_ids[start:start + self.chunk_size], content=content,
+                notification_type=notification_type, created_at=created_at
+            )
+        self.db.session.commit()
+        return len(user_ids)
+
+    def store_chunk(self, user_ids, content, notification_type, created_at):
+        """Job handler: insert one chunk's notifications and queue sending them"""
+        self.db.session.execute(self.notification_table.insert(), [{
+            'user_id': user_id,
+            'content': content,
+            'notification_type': notification_type,
+            'is_read': False,
+            'created_at': datetime.fromisoformat(created_at),
+        } for user_id in user_ids])
+        self.job_queue.enqueue(
+            self.EMIT_JOB_TYPE,
+            user_ids=user_ids, content=content, notification_type=notification_type, created_at=created_at
+        )
+        self.db.session.commit()
+
+    def send_chunk(self, user_ids, content, notification_type, created_at):
+        """Job handler: push one chunk's notifications to its recipients' rooms"""
+        self.emit('notification', {
+            'content': content,
+            'type': notification_type,
+            'created_at': created_at
+        }, to=[f'user_{user_id}' for user_id in user_ids])
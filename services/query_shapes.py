@@ -0,0 +1,133 @@
+"""
+Eager-loading query shapes
+
+Each shape bundles the loader options and aggregate subqueries one kind of
+view needs, so rendering a page of rows costs a fixed number of statements
+instead of one lazy load per row and relationship:
+
+* question cards: author joined, tags in one ``SELECT ... IN``, vote
+  score, answer count and accepted flag as correlated subqueries; the
+  body is left unloaded, cards show the stored excerpt
+* question detail: a question card with its body, plus its answers, their
+  authors and their vote scores
+* question ranking (search, recommendations, trending): tags plus answer
+  and vote counts, for scoring many questions in Python
+* answer cards: parent question joined, vote score
+* user summaries: the denormalized activity counters, no relationships
+* tag usage: how many questions carry each tag
+
+The aggregates land in the ``query_expression`` attributes declared on the
+models (``Question.vote_score`` etc.), which stay None on rows that were not
+loaded through a shape, so views reading them must load their rows here.
+"""
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import defer, joinedload, load_only, selectinload, undefer, with_expression
+
+# User columns needed wherever a user is listed rather than shown in full
+USER_SUMMARY_COLUMNS = (
+    'id', 'username', 'email', 'reputation', 'badge_level', 'profile_views', 'created_at',
+    'questions_count', 'answers_count', 'accepted_answers_count', 'votes_count',
+)
+
+
+class QueryShapes:
+    """Apply the loader options for each kind of list or detail view"""
+
+    def __init__(self, db, user_model, question_model, answer_model, vote_model,
+                 tag_model, question_tags_table):
+        self.db = db
+        self.User = user_model
+        self.Question = question_model
+        self.Answer = answer_model
+        self.Vote = vote_model
+        self.Tag = tag_model
+        self.question_tags = question_tags_table
+
+    def question_cards(self, query):
+        """Questions as shown in lists: author, tags and aggregates, no collections"""
+        Question, Answer = self.Question, self.Answer
+        has_accepted_answer = exists().where(
+            Answer.question_id == Question.id, Answer.is_accepted == True
+        )
+
+        # populate_existing so rows already in the session get the aggregates too
+        return query.options(
+            *[defer(column) for column in self._bodies()],
+            joinedload(Question.author),
+            selectinload(Question.tags),
+            with_expression(Question.vote_score, self._vote_score(self.Vote.question_id, Question.id)),
+            with_expression(Question.answer_count, self._answer_count()),
+            with_expression(Question.has_accepted_answer, has_accepted_answer),
+        ).populate_existing()
+
+    def question_cards_by_id(self, question_ids):
+        """Question cards for ``question_ids``, in the order given"""
+        if not question_ids:
+            return []
+        questions = self.question_cards(self.Question.query).filter(
+            self.Question.id.in_(question_ids)
+        ).all()
+        by_id = {question.id: question for question in questions}
+        return [by_id[question_id] for question_id in question_ids if question_id in by_id]
+
+    def question_ranking(self, query):
+        """Questions with their tags, answer count and number of votes"""
+        Question = self.Question
+        vote_count = select(func.count(self.Vote.id)).where(
+            self.Vote.question_id == Question.id
+        ).scalar_subquery()
+        return query.options(
+            selectinload(Question.tags),
+            with_expression(Question.answer_count, self._answer_count()),
+            with_expression(Question.vote_count, vote_count),
+        ).populate_existing()
+
+    def question_detail(self, query):
+        """A question card plus every answer with its author and vote score"""
+        return self.with_answers(self.question_cards(query).options(
+            *[undefer(column) for column in self._bodies()],
+        ))
+
+    def with_answers(self, query):
+        """Add every answer, its author and vote score to a query for questions"""
+        Answer = self.Answer
+        answers = selectinload(self.Question.answers)
+        return query.options(
+            answers.joinedload(Answer.author),
+            answers.with_expression(Answer.vote_score, self._vote_score(self.Vote.answer_id, Answer.id)),
+        )
+
+    def answer_cards(self, query):
+        """Answers as shown in lists: parent question and vote score"""
+        Answer = self.Answer
+        return query.options(
+            joinedload(Answer.question),
+            with_expression(Answer.vote_score, self._vote_score(self.Vote.answer_id, Answer.id)),
+        ).populate_existing()
+
+    def user_summaries(self, query):
+        """Users as shown in lists, counted from their denormalized counters"""
+        return query.options(load_only(*[getattr(self.User, name) for name in USER_SUMMARY_COLUMNS]))
+
+    def tag_usage(self, query):
+        """Tags with the number of questions using each"""
+        question_tags = self.question_tags
+        question_count = select(func.count()).select_from(question_tags).where(
+            question_tags.c.tag_id == self.Tag.id
+        ).scalar_subquery()
+        return query.options(with_expression(self.Tag.question_count, question_count)).populate_existing()
+
+    def _bodies(self):
+        Question = self.Question
+        return Question.content, Question.content_html, Question.content_text
+
+    def _answer_count(self):
+        return select(func.count(self.Answer.id)).where(
+            self.Answer.question_id == self.Question.id
+        ).scalar_subquery()
+
+    def _vote_score(self, vote_column, post_id):
+        return select(func.coalesce(func.sum(self.Vote.value), 0)).where(
+            vote_column == post_id
+        ).scalar_subquery()
@@ -1,7 +1,10 @@
 from models.question import Question, Tag, Vote
 from models.answer import Answer
 from models import db
+from services import events
 from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, with_expression
 
 class QuestionService:
     """Service layer for question and answer operations"""
@@ -16,14 +19,13 @@ class QuestionService:
         )
         
         # Process tags
-        for tag_name in tag_names:
-            tag = Tag.query.filter_by(name=tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.session.add(tag)
-            question.tags.append(tag)
-        
+        from app import tag_repository
+        tags = tag_repository.resolve(tag_names)
         db.session.add(question)
+        question.tags.extend(tags)
+        
+        db.session.flush()
+        events.question_asked.send(question)
         db.session.commit()
         
         return question
@@ -38,6 +40,8 @@ class QuestionService:
         )
         
         db.session.add(answer)
+        db.session.flush()
+        events.answer_posted.send(answer)
         db.session.commit()
         
         return answer
@@ -51,19 +55,25 @@ class QuestionService:
         if question.user_id != user_id:
             raise PermissionError('Only question author can accept answers')
         
-        # Unaccept all other answers
-        for ans in question.answers:
-            ans.is_accepted = False
-        
-        # Accept this answer
-        answer.is_accepted = True
-        db.session.commit()
+        if not answer.is_accepted:
+            # Unaccept all other answers
+            previous = None
+            for ans in question.answers:
+                if ans.is_accepted:
+                    previous = ans
+                ans.is_accepted = False
+            
+            # Accept this answer
+            answer.is_accepted = True
+            events.answer_accepted.send(answer, previous=previous)
+            db.session.commit()
         
         return answer
     
     @staticmethod
     def vote(item_type, item_id, user_id, value):
         """Vote on question or answer"""
+        vote = previous_value = None
         if item_type == 'question':
             existing_vote = Vote.query.filter_by(
                 user_id=user_id,
@@ -72,7 +82,9 @@ class QuestionService:
             ).first()
             
             if existing_vote:
+                previous_value = existing_vote.value
                 existing_vote.value = value
+                vote = existing_vote
             else:
                 vote = Vote(
                     value=value,
@@ -89,7 +101,9 @@ class QuestionService:
             ).first()
             
             if existing_vote:
+                previous_value = existing_vote.value
                 existing_vote.value = value
+                vote = existing_vote
             else:
                 vote = Vote(
                     value=value,
@@ -98,17 +112,16 @@ class QuestionService:
                 )
                 db.session.add(vote)
         
+        if vote is not None:
+            db.session.flush()
+            events.vote_cast.send(vote, previous_value=previous_value)
         db.session.commit()
     
     @staticmethod
     def get_vote_count(item_type, item_id):
         """Get vote count for question or answer"""
-        if item_type == 'question':
-            question = Question.query.get(item_id)
-            return sum(vote.value for vote in question.votes) if question else 0
-        else:
-            answer = Answer.query.get(item_id)
-            return sum(vote.value for vote in answer.votes) if answer else 0
+        column = Vote.question_id if item_type == 'question' else Vote.answer_id
+        return db.session.query(func.coalesce(func.sum(Vote.value), 0)).filter(column == item_id).scalar()
     
     @staticmethod
     def get_question_with_votes(question_id):
@@ -118,16 +131,30 @@ class QuestionService:
         return question, vote_count
     
     @staticmethod
-    def get_answers_with_votes(question_id):
-        """Get answers for question with vote counts, sorted by accepted then votes"""
-        answers = Answer.query.filter_by(question_id=question_id).all()
+    def get_answers_with_votes(question_id, page=1, per_page=None):
+        """Get answers for question with vote counts, sorted by accepted then votes.
+        
+        One query: answers joined to their summed votes and authors, ordered
+        in the database. Pass ``per_page`` to fetch one page of a long thread.
+        """
+        answer_ids = db.session.query(Answer.id).filter(Answer.question_id == question_id)
+        scores = db.session.query(
+            Vote.answer_id, func.sum(Vote.value).label('score')
+        ).filter(Vote.answer_id.in_(answer_ids)).group_by(Vote.answer_id).subquery()
+        vote_count = func.coalesce(scores.c.score, 0)
+        
+        # The score also lands in Answer.vote_score, as with the query shapes
+        query = db.session.query(Answer).outerjoin(
+            scores, scores.c.answer_id == Answer.id
+        ).options(
+            joinedload(Answer.author), with_expression(Answer.vote_score, vote_count)
+        ).filter(
+            Answer.question_id == question_id
+        ).order_by(Answer.is_accepted.desc(), vote_count.desc(), Answer.id).populate_existing()
         
-        answers_with_votes = []
-        for answer in answers:
-            vote_count = QuestionService.get_vote_count('answer', answer.id)
-            answers_with_votes.append((answer, vote_count))
+        if per_page:
+            query = query.offset((max(page, 1) - 1) * per_page).limit(per_page)
         
-        # Sort: accepted first, then by vote count (descending)
-        answers_with_votes.sort(key=lambda x: (not x[0].is_accepted, -x[1]))
+        answers_with_votes = [(answer, answer.vote_score) for answer in query]
         
         return answers_with_votes
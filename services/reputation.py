@@ -0,0 +1,184 @@
+"""
+Event-sourced reputation ledger
+
+Every action that earns or loses reputation appends a signed row to
+``reputation_events`` and bumps ``User.reputation`` in the same transaction,
+so reading a profile never has to recompute anything.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import case, func, literal, select
+
+from services import events
+
+BASE_REPUTATION = 1
+QUESTION_POINTS = 5
+ANSWER_POINTS = 10
+ACCEPTED_ANSWER_POINTS = 15
+UPVOTE_POINTS = 2
+
+# (minimum reputation, badge level), highest first
+BADGE_LEVELS = [
+    (1000, 'Expert'),
+    (500, 'Advanced'),
+    (100, 'Intermediate'),
+    (50, 'Apprentice'),
+]
+DEFAULT_BADGE_LEVEL = 'Beginner'
+
+
+def badge_level_for(reputation):
+    """Badge level name for a reputation score"""
+    for threshold, level in BADGE_LEVELS:
+        if reputation >= threshold:
+            return level
+    return DEFAULT_BADGE_LEVEL
+
+
+def badge_level_expression(reputation):
+    """SQL CASE equivalent of badge_level_for"""
+    return case(
+        *[(reputation >= threshold, level) for threshold, level in BADGE_LEVELS],
+        else_=DEFAULT_BADGE_LEVEL
+    )
+
+
+class ReputationLedger:
+    """Append reputation events and keep User.reputation in step with them"""
+
+    def __init__(self, db, user_model, event_model, question_model, answer_model, vote_model):
+        self.db = db
+        self.User = user_model
+        self.ReputationEvent = event_model
+        self.Question = question_model
+        self.Answer = answer_model
+        self.Vote = vote_model
+
+    def connect(self):
+        """Subscribe to the domain events that affect reputation"""
+        events.question_asked.connect(self._on_question_asked, weak=False)
+        events.answer_posted.connect(self._on_answer_posted, weak=False)
+        events.answer_accepted.connect(self._on_answer_accepted, weak=False)
+        events.vote_cast.connect(self._on_vote_cast, weak=False)
+
+    def record(self, user_id, event_type, delta, question_id=None, answer_id=None):
+        """Append one event and apply its delta to the user's reputation"""
+        if not user_id or not delta:
+            return
+
+        session = self.db.session
+        session.add(self.ReputationEvent(
+            user_id=user_id,
+            event_type=event_type,
+            delta=delta,
+            question_id=question_id,
+            answer_id=answer_id
+        ))
+
+        new_reputation = func.coalesce(self.User.reputation, BASE_REPUTATION) + delta
+        session.query(self.User).filter(self.User.id == user_id).update({
+            'reputation': new_reputation,
+            'badge_level': badge_level_expression(new_reputation)
+        }, synchronize_session=False)
+
+        # Don't let an already loaded User keep showing the old score
+        user = session.identity_map.get(session.identity_key(self.User, user_id))
+        if user is not None:
+            session.expire(user, ['reputation', 'badge_level'])
+
+        events.reputation_changed.send(user_id, delta=delta)
+
+    def withdraw_votes(self, voter_id):
+        """Take back the reputation ``voter_id``'s upvotes gave others, before the votes are deleted"""
+        votes = self.db.session.query(self.Vote).filter(self.Vote.user_id == voter_id, self.Vote.value > 0)
+        for vote in votes.all():
+            self._record_vote(vote, -UPVOTE_POINTS * vote.value)
+
+    def replay(self):
+        """Recompute every user's reputation by summing the ledger"""
+        event = self.ReputationEvent.__table__
+        user = self.User.__table__
+
+        total = select(func.coalesce(func.sum(event.c.delta), 0)).where(
+            event.c.user_id == user.c.id
+        ).scalar_subquery()
+        reputation = literal(BASE_REPUTATION) + total
+
+        self.db.session.execute(user.update().values(
+            reputation=reputation,
+            badge_level=badge_level_expression(reputation)
+        ))
+        self.db.session.commit()
+
+    def rebuild(self):
+        """Regenerate the ledger from questions, answers and votes, then replay it"""
+        event = self.ReputationEvent.__table__
+        question = self.Question.__table__
+        answer = self.Answer.__table__
+        vote = self.Vote.__table__
+        columns = ['user_id', 'event_type', 'delta', 'question_id', 'answer_id', 'created_at']
+        now = datetime.utcnow()
+
+        sources = [
+            select(
+                question.c.user_id, literal('question'), literal(QUESTION_POINTS),
+                question.c.id, literal(None), func.coalesce(question.c.created_at, now)
+            ),
+            select(
+                answer.c.user_id, literal('answer'), literal(ANSWER_POINTS),
+                answer.c.question_id, answer.c.id, func.coalesce(answer.c.created_at, now)
+            ),
+            select(
+                answer.c.user_id, literal('accept'), literal(ACCEPTED_ANSWER_POINTS),
+                answer.c.question_id, answer.c.id, func.coalesce(answer.c.created_at, now)
+            ).where(answer.c.is_accepted == True),
+            # Votes cast before Vote.created_at existed are dated by the post they were cast on
+            select(
+                question.c.user_id, literal('vote'), vote.c.value * UPVOTE_POINTS,
+                question.c.id, literal(None), func.coalesce(vote.c.created_at, question.c.created_at, now)
+            ).select_from(vote.join(question, vote.c.question_id == question.c.id)).where(vote.c.value > 0),
+            select(
+                answer.c.user_id, literal('vote'), vote.c.value * UPVOTE_POINTS,
+                answer.c.question_id, answer.c.id, func.coalesce(vote.c.created_at, answer.c.created_at, now)
+            ).select_from(vote.join(answer, vote.c.answer_id == answer.c.id)).where(vote.c.value > 0),
+        ]
+
+        session = self.db.session
+        session.execute(event.delete())
+        for source in sources:
+            session.execute(event.insert().from_select(columns, source))
+        self.replay()
+
+    def _on_question_asked(self, question, **extra):
+        self.record(question.user_id, 'question', QUESTION_POINTS, question_id=question.id)
+
+    def _on_answer_posted(self, answer, **extra):
+        self.record(answer.user_id, 'answer', ANSWER_POINTS,
+                    question_id=answer.question_id, answer_id=answer.id)
+
+    def _on_answer_accepted(self, answer, previous=None, **extra):
+        if previous is not None:
+            self.record(previous.user_id, 'unaccept', -ACCEPTED_ANSWER_POINTS,
+                        question_id=previous.question_id, answer_id=previous.id)
+        self.record(answer.user_id, 'accept', ACCEPTED_ANSWER_POINTS,
+                    question_id=answer.question_id, answer_id=answer.id)
+
+    def _on_vote_cast(self, vote, previous_value=None, **extra):
+        # Only upvotes earn reputation, so a change only matters if it crosses zero
+        delta = UPVOTE_POINTS * (max(vote.value or 0, 0) - max(previous_value or 0, 0))
+        if delta:
+            self._record_vote(vote, delta)
+
+    def _record_vote(self, vote, delta):
+        if vote.question_id:
+            target = self.db.session.get(self.Question, vote.question_id)
+            question_id, answer_id = vote.question_id, None
+        else:
+            target = self.db.session.get(self.Answer, vote.answer_id)
+            question_id = target.question_id if target else None
+            answer_id = vote.answer_id
+        if target is None:
+            return
+
+        self.record(target.user_id, 'vote', delta, question_id=question_id, answer_id=answer_id)
@@ -0,0 +1,118 @@
+"""
+Platform statistics snapshots
+
+All the headline counters come from a single SELECT that cross-joins one
+conditional-sum aggregate per table; the most used tags are a second
+query. The result is cached for a short TTL with single-flight refresh,
+so dashboards polling every few seconds cost at most one recomputation
+per TTL per process.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, distinct, func, select, true
+
+from utils.cache import CachedValue
+
+
+class PlatformStats:
+    """Compute and cache the /api/v1/stats snapshot"""
+
+    def __init__(self, db, user_model, question_model, answer_model, tag_model,
+                 badge_model, user_badge_model, question_tags_table, ttl=30):
+        self.db = db
+        self.User = user_model
+        self.Question = question_model
+        self.Answer = answer_model
+        self.Tag = tag_model
+        self.Badge = badge_model
+        self.UserBadge = user_badge_model
+        self.question_tags = question_tags_table
+        self._cache = CachedValue(self.compute, ttl)
+
+    def snapshot(self):
+        """The cached stats snapshot, recomputed once it is older than the TTL"""
+        return self._cache.get()
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    def compute(self):
+        """Build a fresh snapshot (two queries)"""
+        now = datetime.utcnow()
+        windows = {
+            'new_today': now.replace(hour=0, minute=0, second=0, microsecond=0),
+            'new_this_week': now - timedelta(days=7),
+            'new_this_month': now - timedelta(days=30),
+        }
+
+        def activity(table, prefix, *extra):
+            columns = [func.count().label(f'{prefix}_total')]
+            for name, cutoff in windows.items():
+                columns.append(func.coalesce(func.sum(
+                    case((table.c.created_at >= cutoff, 1), else_=0)
+                ), 0).label(f'{prefix}_{name}'))
+            return select(*columns, *extra).select_from(table).subquery()
+
+        user = self.User.__table__
+        question = self.Question.__table__
+        answer = self.Answer.__table__
+
+        users = activity(user, 'users')
+        questions = activity(question, 'questions')
+        answers = activity(answer, 'answers',
+                           func.coalesce(func.sum(case((answer.c.is_accepted == True, 1), else_=0)), 0)
+                           .label('answers_accepted'),
+                           func.count(distinct(answer.c.question_id)).label('answered_questions'))
+        tags = select(func.count().label('tags_total')).select_from(self.Tag.__table__).subquery()
+        badges = select(func.count().label('badges_total')).select_from(self.Badge.__table__).subquery()
+        awarded = select(func.count().label('badges_awarded')).select_from(self.UserBadge.__table__).subquery()
+
+        # Every subquery is a single row, so joining them on TRUE yields one row
+        aggregates = users
+        for subquery in (questions, answers, tags, badges, awarded):
+            aggregates = aggregates.join(subquery, true())
+        row = self.db.session.execute(
+            select(users, questions, answers, tags, badges, awarded).select_from(aggregates)
+        ).mappings().one()
+
+        def period_counts(prefix):
+            counts = {'total': row[f'{prefix}_total']}
+            for name in windows:
+                counts[name] = row[f'{prefix}_{name}']
+            return counts
+
+        question_counts = period_counts('questions')
+        question_counts['unanswered'] = row['questions_total'] - row['answered_questions']
+        answer_counts = period_counts('answers')
+        answer_counts['accepted'] = row['answers_accepted']
+
+        return {
+            'users': period_counts('users'),
+            'questions': question_counts,
+            'answers': answer_counts,
+            'tags': {
+                'total': row['tags_total'],
+                'most_used': self.most_used_tags(10)
+            },
+            'badges': {
+                'total': row['badges_total'],
+                'total_awarded': row['badges_awarded']
+            },
+            'generated_at': now.isoformat()
+        }
+
+    def most_used_tags(self, limit=10):
+        """Tags ordered by how many questions use them"""
+        question_count = func.count(self.question_tags.c.question_id)
+        tag_counts = self.db.session.query(
+            self.Tag.name,
+            question_count.label('question_count')
+        ).join(self.question_tags, self.question_tags.c.tag_id == self.Tag.id).group_by(
+            self.Tag.id, self.Tag.name
+        ).order_by(question_count.desc()).limit(limit).all()
+
+        return [{
+            'name': tag.name,
+            'question_count': tag.question_count
+        } for tag in tag_counts]
@@ -0,0 +1,224 @@
+"""
+Tag subscriptions
+
+Who is interested in a tag is kept in the ``tag_subscription`` table: tags a
+user follows, tags they have asked or answered in (followed implicitly), and
+tags they unfollowed, which stay unfollowed whatever they post there later.
+
+Each worker also keeps a tag id -> subscriber ids index in memory, loaded
+from the table on first use and updated as follow, unfollow and posting
+transactions commit. Finding everyone to notify about a new question is then
+a union of a few sets, with no query at all. Changes committed by other
+workers reach this one's index when it is reloaded, every
+``reload_interval`` seconds.
+
+Given a job queue, the implicit subscriptions from a new question or answer
+are recorded by a background job after it commits.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import and_, event as sa_event, exists, literal, select, union
+
+from services import events
+from utils.sql import insert_ignoring_conflicts, upsert
+
+FOLLOW = 'follow'
+ACTIVITY = 'activity'
+UNFOLLOW = 'unfollow'
+
+_CHANGES_KEY = 'tag_subscription_changes'
+
+
+def derive_from_activity(connection, subscription_table, question_table, answer_table, question_tags):
+    """Add an implicit subscription for every tag each user has asked or answered in.
+
+    Pairs that already have a row (followed, unfollowed or implicit) are left
+    alone. Returns the number of rows added.
+    """
+    pairs = union(
+        select(question_table.c.user_id, question_tags.c.tag_id).join(
+            question_tags, question_tags.c.question_id == question_table.c.id
+        ),
+        select(answer_table.c.user_id, question_tags.c.tag_id).join(
+            question_tags, question_tags.c.question_id == answer_table.c.question_id
+        ),
+    ).subquery()
+    missing = select(pairs.c.user_id, pairs.c.tag_id, literal(ACTIVITY)).where(~exists().where(and_(
+        subscription_table.c.user_id == pairs.c.user_id,
+        subscription_table.c.tag_id == pairs.c.tag_id
+    )))
+    result = connection.execute(subscription_table.insert().from_select(
+        ['user_id', 'tag_id', 'source'], missing
+    ))
+    return result.rowcount
+
+
+class TagSubscriptions:
+    """Maintain the tag_subscription table and its in-memory index"""
+
+    def __init__(self, db, subscription_model, question_model, answer_model, question_tags, job_queue=None,
+                 reload_interval=300):
+        self.db = db
+        self.TagSubscription = subscription_model
+        self.table = subscription_model.__table__
+        self.Question = question_model
+        self.Answer = answer_model
+        self.question_tags = question_tags
+        self.job_queue = job_queue
+        self.reload_interval = reload_interval
+
+        self._subscribers = None
+        self._unfollowed = None
+        self._loaded_at = 0
+        # Changes committed while a reload is reading the table, replayed onto its result
+        self._replay = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def connect(self):
+        """Record implied subscriptions as questions and answers are posted"""
+        events.question_asked.connect(self._on_question_asked, weak=False)
+        events.answer_posted.connect(self._on_answer_posted, weak=False)
+        sa_event.listen(self.db.session, 'after_commit', self._after_commit)
+        sa_event.listen(self.db.session, 'after_soft_rollback', self._after_rollback)
+        if self.job_queue is not None:
+            self.job_queue.register('tag_subscriptions.activity', self.run_activity)
+
+    def subscribers(self, tag_ids, exclude=None):
+        """Ids of the users subscribed to any of ``tag_ids``, without ``exclude``"""
+        self._ensure_loaded()
+        user_ids = set()
+        with self._lock:
+            for tag_id in tag_ids:
+                user_ids |= self._subscribers.get(tag_id, frozenset())
+        user_ids.discard(exclude)
+        return user_ids
+
+    def follow(self, user_id, tag_id):
+        """Subscribe ``user_id`` to ``tag_id``, applied when the session commits"""
+        self._set(user_id, [tag_id], FOLLOW)
+
+    def unfollow(self, user_id, tag_id):
+        """Unsubscribe ``user_id`` from ``tag_id``, including an implied subscription"""
+        self._set(user_id, [tag_id], UNFOLLOW)
+
+    def for_user(self, user_id):
+        """[(tag_id, source)] of a user's rows, unfollowed tags included"""
+        return self.db.session.query(self.table.c.tag_id, self.table.c.source).filter(
+            self.table.c.user_id == user_id
+        ).all()
+
+    def remove_user(self, user_id):
+        """Delete all of a user's subscriptions, e.g. with their account"""
+        tag_ids = [tag_id for tag_id, source in self.for_user(user_id)]
+        self.db.session.execute(self.table.delete().where(self.table.c.user_id == user_id))
+        self._pending().extend((user_id, tag_id, None) for tag_id in tag_ids)
+
+    def load(self):
+        """(Re)build the in-memory index from the table"""
+        with self._load_lock:
+            self._load()
+
+    def _load(self):
+        with self._lock:
+            self._replay = []
+        subscribers = defaultdict(set)
+        unfollowed = set()
+        rows = self.db.session.execute(select(self.table.c.user_id, self.table.c.tag_id, self.table.c.source))
+        for user_id, tag_id, source in rows:
+            if source == UNFOLLOW:
+                unfollowed.add((user_id, tag_id))
+            else:
+                subscribers[tag_id].add(user_id)
+        with self._lock:
+            replay, self._replay = self._replay, None
+            self._subscribers, self._unfollowed = subscribers, unfollowed
+            self._apply(replay)
+            self._loaded_at = time.monotonic()
+
+    def backfill(self):
+        """Derive implicit subscriptions from the existing questions and answers. Returns the rows added."""
+        added = derive_from_activity(
+            self.db.session.connection(), self.table,
+            self.Question.__table__, self.Answer.__table__, self.question_tags
+        )
+        self.db.session.commit()
+        self.load()
+        return added
+
+    def _stale(self):
+        return self._subscribers is None or time.monotonic() - self._loaded_at > self.reload_interval
+
+    def _ensure_loaded(self):
+        if self._stale():
+            with self._load_lock:
+                if self._stale():
+                    self._load()
+
+    def _set(self, user_id, tag_ids, source):
+        rows = [{'user_id': user_id, 'tag_id': tag_id, 'source': source} for tag_id in tag_ids]
+        if source == ACTIVITY:
+            insert_ignoring_conflicts(self.db.session, self.table, rows, ['user_id', 'tag_id'])
+        else:
+            upsert(self.db.session, self.table, rows, ['user_id', 'tag_id'])
+        self._pending().extend((user_id, tag_id, source) for tag_id in tag_ids)
+
+    def _pending(self):
+        return self.db.session().info.setdefault(_CHANGES_KEY, [])
+
+    def _apply(self, changes):
+        """Update the index with committed changes; the caller holds the lock"""
+        if self._subscribers is None:
+            return
+        for user_id, tag_id, source in changes:
+            pair = (user_id, tag_id)
+            if source == ACTIVITY and pair in self._unfollowed:
+                continue
+            if source in (FOLLOW, ACTIVITY):
+                self._subscribers[tag_id].add(user_id)
+                self._unfollowed.discard(pair)
+            else:
+                self._subscribers.get(tag_id, set()).discard(user_id)
+                if source == UNFOLLOW:
+                    self._unfollowed.add(pair)
+                else:
+                    self._unfollowed.discard(pair)
+
+    def record_activity(self, user_id, question_id):
+        """Subscribe ``user_id`` implicitly to the tags of a question they asked or answered"""
+        tag_ids = self.db.session.execute(
+            select(self.question_tags.c.tag_id).where(self.question_tags.c.question_id == question_id)
+        ).scalars().all()
+        self._set(user_id, tag_ids, ACTIVITY)
+
+    def run_activity(self, user_id, question_id):
+        """Job handler: record_activity and commit"""
+        self.record_activity(user_id, question_id)
+        self.db.session.commit()
+
+    def _on_activity(self, user_id, question_id):
+        if self.job_queue is None:
+            self.record_activity(user_id, question_id)
+        else:
+            self.job_queue.enqueue('tag_subscriptions.activity', user_id=user_id, question_id=question_id)
+
+    def _on_question_asked(self, question, **extra):
+        self._on_activity(question.user_id, question.id)
+
+    def _on_answer_posted(self, answer, **extra):
+        self._on_activity(answer.user_id, answer.question_id)
+
+    def _after_commit(self, session):
+        changes = session.info.pop(_CHANGES_KEY, None)
+        if not changes:
+            return
+        with self._lock:
+            self._apply(changes)
+            if self._replay is not None:
+                self._replay.extend(changes)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(_CHANGES_KEY, None)
@@ -0,0 +1,98 @@
+"""
+Tag resolution
+
+Turns the tag names typed into a question form into Tag rows with a fixed
+number of statements however many tags there are: names already seen are
+answered from an in-process name -> id cache, the rest with one ``IN``
+query, and any that still don't exist are created with one conflict-
+tolerant bulk INSERT, so two requests adding the same new tag at once both
+succeed instead of one tripping the unique constraint on ``Tag.name``.
+"""
+
+import re
+import threading
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import make_transient_to_detached
+
+from utils.sql import insert_ignoring_conflicts
+
+MAX_TAG_LENGTH = 50
+
+
+def normalize_tag_name(name):
+    """Canonical form of a tag name: trimmed, lower case, spaces as hyphens"""
+    return re.sub(r'\s+', '-', str(name or '').strip().lower())[:MAX_TAG_LENGTH]
+
+
+def normalize_tag_names(names):
+    """Canonical, de-duplicated tag names in their original order"""
+    seen = []
+    for name in names:
+        name = normalize_tag_name(name)
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+class TagRepository:
+    """Get-or-create Tag rows by name, in bulk"""
+
+    def __init__(self, db, tag_model):
+        self.db = db
+        self.Tag = tag_model
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Only cache ids of tags created in a transaction once it commits"""
+        sa_event.listen(self.db.session, 'after_commit', self._after_commit)
+        sa_event.listen(self.db.session, 'after_soft_rollback', self._after_rollback)
+
+    def resolve(self, names):
+        """Tag instances for ``names`` (normalized), creating missing ones"""
+        names = normalize_tag_names(names)
+        if not names:
+            return []
+
+        session = self.db.session()
+        created = session.info.setdefault('created_tag_ids', {})
+        ids = {name: self._ids.get(name, created.get(name)) for name in names}
+
+        missing = [name for name, tag_id in ids.items() if tag_id is None]
+        if missing:
+            ids.update(self._lookup(missing))
+            missing = [name for name in missing if ids.get(name) is None]
+        if missing:
+            insert_ignoring_conflicts(session, self.Tag.__table__, [{'name': name} for name in missing], ['name'])
+            new_ids = self._lookup(missing, cache=False)
+            created.update(new_ids)
+            ids.update(new_ids)
+
+        # Attach by primary key; the session doesn't need to load the rows
+        return [self._attach(session, ids[name], name) for name in names]
+
+    def clear_cache(self):
+        with self._lock:
+            self._ids.clear()
+
+    def _lookup(self, names, cache=True):
+        rows = dict(self.db.session.query(self.Tag.name, self.Tag.id).filter(self.Tag.name.in_(names)))
+        if cache:
+            with self._lock:
+                self._ids.update(rows)
+        return rows
+
+    def _attach(self, session, tag_id, name):
+        tag = self.Tag(id=tag_id, name=name)
+        make_transient_to_detached(tag)
+        return session.merge(tag, load=False)
+
+    def _after_commit(self, session):
+        created = session.info.pop('created_tag_ids', None)
+        if created:
+            with self._lock:
+                self._ids.update(created)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('created_tag_ids', None)
@@ -0,0 +1,172 @@
+"""
+Write-behind view counters for question pages
+"""
+
+import atexit
+import threading
+from collections import Counter
+
+from sqlalchemy import bindparam, func
+
+
+class _Shard:
+    """One lock-protected slice of the pending view counts"""
+
+    __slots__ = ('lock', 'questions', 'authors')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.questions = Counter()
+        self.authors = Counter()
+
+
+class ViewCounter:
+    """Accumulate page views in memory and flush them to the database in batches.
+
+    Views are added to one of several sharded counters so concurrent requests
+    rarely contend on the same lock. A background thread drains the shards
+    every ``flush_interval`` seconds (or sooner, once ``flush_threshold``
+    views are pending) and applies them with one batched UPDATE per table.
+    Pending views are flushed one last time when the process exits.
+
+    Flushes are handed to ``write_queue`` so they are committed by the
+    single writer thread alongside any other queued background writes.
+    """
+
+    def __init__(self, app, db, question_model, user_model, write_queue,
+                 shards=8, flush_interval=5.0, flush_threshold=500):
+        self.app = app
+        self.db = db
+        self.write_queue = write_queue
+        self.question_table = question_model.__table__
+        self.user_table = user_model.__table__
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._shards = [_Shard() for _ in range(shards)]
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def record(self, question_id, author_id=None):
+        """Count one view of a question (and of its author's profile)"""
+        shard = self._shards[question_id % len(self._shards)]
+        with shard.lock:
+            shard.questions[question_id] += 1
+            if author_id is not None:
+                shard.authors[author_id] += 1
+
+        with self._pending_lock:
+            self._pending += 1
+            pending = self._pending
+
+        self._ensure_started()
+        if pending >= self.flush_threshold:
+            self._wakeup.set()
+
+    def pending_question_views(self, question_id):
+        """Views recorded for a question that have not been flushed yet"""
+        shard = self._shards[question_id % len(self._shards)]
+        with shard.lock:
+            return shard.questions.get(question_id, 0)
+
+    def pending_author_views(self, author_id):
+        """Profile views recorded for a user that have not been flushed yet"""
+        total = 0
+        for shard in self._shards:
+            with shard.lock:
+                total += shard.authors.get(author_id, 0)
+        return total
+
+    def flush(self):
+        """Write all pending views to the database. Returns the number of views written."""
+        with self._flush_lock:
+            questions, authors = self._drain()
+            if not questions and not authors:
+                return 0
+
+            def apply(conn):
+                if questions:
+                    conn.execute(self._increment_statement(self.question_table, 'views'), [
+                        {'b_id': question_id, 'b_delta': count}
+                        for question_id, count in questions.items()
+                    ])
+                if authors:
+                    conn.execute(self._increment_statement(self.user_table, 'profile_views'), [
+                        {'b_id': user_id, 'b_delta': count}
+                        for user_id, count in authors.items()
+                    ])
+
+            try:
+                self.write_queue.execute(apply)
+            except Exception as e:
+                # Put the counts back so they are retried on the next flush
+                self._restore(questions, authors)
+                print(f"View counter flush failed: {e}")
+                return 0
+
+            return sum(questions.values())
+
+    def shutdown(self):
+        """Stop the background thread and flush whatever is still pending"""
+        self._stopped.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def _increment_statement(self, table, column):
+        return table.update().where(
+            table.c.id == bindparam('b_id')
+        ).values({
+            column: func.coalesce(table.c[column], 0) + bindparam('b_delta')
+        })
+
+    def _drain(self):
+        questions = Counter()
+        authors = Counter()
+        for shard in self._shards:
+            with shard.lock:
+                shard_questions, shard.questions = shard.questions, Counter()
+                shard_authors, shard.authors = shard.authors, Counter()
+            questions.update(shard_questions)
+            authors.update(shard_authors)
+
+        with self._pending_lock:
+            self._pending = 0
+        return questions, authors
+
+    def _restore(self, questions, authors):
+        for question_id, count in questions.items():
+            shard = self._shards[question_id % len(self._shards)]
+            with shard.lock:
+                shard.questions[question_id] += count
+        shard = self._shards[0]
+        with shard.lock:
+            shard.authors.update(authors)
+
+        with self._pending_lock:
+            self._pending += sum(questions.values())
+
+    def _ensure_started(self):
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._thread_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            self.flush()
@@ -0,0 +1,150 @@
+"""
+Single-writer queue with group commit
+"""
+
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class WriteQueue:
+    """Run write transactions on one dedicated thread, several per commit.
+
+    ``submit(work)`` queues ``work(connection)`` and returns a Future for its
+    result. The writer thread takes whatever is queued (up to ``max_batch``
+    jobs, waiting at most ``max_wait`` seconds for more to arrive) and runs
+    the batch in one transaction, each job inside its own savepoint so a
+    failing job is rolled back on its own without taking the rest of the
+    batch with it. Only one thread ever holds SQLite's write lock, so writers
+    queue up in memory rather than retrying against ``database is locked``,
+    and one commit (one fsync) covers the whole batch.
+
+    On SQLite the transaction is opened with ``BEGIN IMMEDIATE`` so the
+    write lock is taken up front instead of being upgraded halfway through.
+    With ``enabled=False`` jobs run straight away in the caller's thread,
+    each in its own transaction, which keeps callers the same whether or
+    not the performance profile is on. Jobs submitted after ``shutdown()``
+    (such as a final flush from another ``atexit`` hook) also run inline.
+    """
+
+    def __init__(self, app, db, max_batch=100, max_wait=0.005, enabled=True):
+        self.app = app
+        self.db = db
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.enabled = enabled
+
+        self._jobs = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def submit(self, work):
+        """Queue ``work(connection)`` for the writer thread. Returns a Future."""
+        future = Future()
+        if not self.enabled or self._stopped.is_set():
+            self._run_inline(work, future)
+            return future
+
+        self._jobs.put((work, future))
+        self._ensure_started()
+        return future
+
+    def execute(self, work, timeout=None):
+        """Run ``work(connection)`` on the writer thread and wait for its result"""
+        return self.submit(work).result(timeout)
+
+    def shutdown(self):
+        """Stop the writer thread once the jobs already queued are committed"""
+        self._stopped.set()
+        self._jobs.put(None)
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=30)
+
+    def _run_inline(self, work, future):
+        try:
+            with self.app.app_context():
+                with self.db.engine.begin() as connection:
+                    result = work(connection)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        with self.app.app_context():
+            engine = self.db.engine
+            while True:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._commit_batch(engine, batch)
+                if stop:
+                    break
+
+    def _next_batch(self):
+        job = self._jobs.get()
+        if job is None:
+            return self._drain(), True
+
+        batch = [job]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._jobs.get(timeout=remaining) if remaining > 0 else self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return batch + self._drain(), True
+            batch.append(job)
+        return batch, False
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return batch
+            if job is not None:
+                batch.append(job)
+
+    def _commit_batch(self, engine, batch):
+        results = []
+        try:
+            with engine.connect() as connection:
+                with connection.begin():
+                    if connection.dialect.name == 'sqlite':
+                        connection.exec_driver_sql('BEGIN IMMEDIATE')
+                    for work, future in batch:
+                        savepoint = connection.begin_nested()
+                        try:
+                            result = work(connection)
+                        except Exception as e:
+                            savepoint.rollback()
+                            future.set_exception(e)
+                        else:
+                            savepoint.commit()
+                            results.append((future, result))
+        except Exception as e:
+            # The commit itself failed, so none of the batch was written
+            for work, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in results:
+            future.set_result(result)
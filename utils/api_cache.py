@@ -0,0 +1,168 @@
+"""
+Stale-while-revalidate cache for JSON API endpoints
+
+``@api_cache.cached(ttl=...)`` keeps each endpoint's 200 responses per URL
+(path plus sorted query arguments). Entries are shared by every caller
+unless the endpoint is cached with ``vary_auth``, which adds the user id
+to the key. For ``ttl`` seconds an entry is served as is. For the
+following ``stale_ttl`` seconds it is still served, but the first request
+to see it stale starts a background refresh. After that it is rebuilt
+before responding. Concurrent misses for the same key are coalesced, so
+only one of them runs the view and the rest wait for its result.
+
+Entries carry a strong ETag over the body, and a matching
+``If-None-Match`` gets a 304 straight from the cache without running the
+view or touching the database.
+"""
+
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from functools import wraps
+
+from flask import current_app, request
+from flask_login import current_user
+
+from utils.response_cache import MemoryStore
+
+
+class _Entry:
+    __slots__ = ('body', 'status', 'mimetype', 'etag', 'stored_at')
+
+    def __init__(self, body, status, mimetype, etag, stored_at):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.etag = etag
+        self.stored_at = stored_at
+
+
+class ApiCache:
+    """Per-endpoint response caching for the v1 blueprints"""
+
+    def __init__(self, app, max_entries=1000, enabled=True):
+        self.app = app
+        self.enabled = enabled
+        self._store = MemoryStore(max_entries)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def cached(self, ttl, stale_ttl=None, vary_auth=False, when=None):
+        """Decorate a view to cache its responses.
+
+        ``stale_ttl`` defaults to ``ttl``. With ``vary_auth`` each user gets
+        their own entry and responses are marked private. ``when`` is a
+        callable deciding per request whether to use the cache at all.
+        """
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**view_args):
+                if (not self.enabled or request.method not in ('GET', 'HEAD')
+                        or (when is not None and not when())):
+                    return view(**view_args)
+
+                key = self._key(vary_auth)
+                entry = self._store.get(key)
+                age = time.time() - entry.stored_at if entry is not None else None
+                if entry is None or age >= ttl + stale_ttl:
+                    entry, response = self._fill(key, view, view_args)
+                    if entry is None:
+                        return response
+                elif age >= ttl:
+                    self._refresh_in_background(key, view, view_args)
+                return self._serve(entry, ttl, stale_ttl, vary_auth)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        self._store.clear()
+
+    def _key(self, vary_auth):
+        user_id = current_user.get_id() if vary_auth and current_user.is_authenticated else None
+        return (request.path, tuple(sorted(request.args.items(multi=True))), user_id)
+
+    def _claim(self, key):
+        """(future, True) if this caller should build ``key``, else the in-flight build's future"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _release(self, key, future, entry):
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(entry)
+
+    def _fill(self, key, view, view_args):
+        """Build ``key`` now, or wait for whoever is already building it"""
+        future, leader = self._claim(key)
+        if not leader:
+            entry = future.result()
+            if entry is not None:
+                return entry, None
+            # The build failed or wasn't cacheable; answer this request directly
+            return None, view(**view_args)
+
+        entry = None
+        try:
+            response = current_app.make_response(view(**view_args))
+            entry = self._entry_for(response)
+            if entry is not None:
+                self._store.set(key, entry)
+            return entry, response
+        finally:
+            self._release(key, future, entry)
+
+    def _refresh_in_background(self, key, view, view_args):
+        future, leader = self._claim(key)
+        if not leader:
+            return
+        environ = dict(request.environ)
+        threading.Thread(
+            target=self._refresh, args=(key, future, view, view_args, environ),
+            name='api-cache-refresh', daemon=True
+        ).start()
+
+    def _refresh(self, key, future, view, view_args, environ):
+        entry = None
+        try:
+            with self.app.request_context(environ):
+                self.app.preprocess_request()
+                entry = self._entry_for(self.app.make_response(view(**view_args)))
+            if entry is not None:
+                self._store.set(key, entry)
+        except Exception as e:
+            # Keep serving the stale entry; the next stale hit tries again
+            print(f"API cache refresh failed for {key[0]}: {e}")
+        finally:
+            self._release(key, future, entry)
+
+    def _entry_for(self, response):
+        if response.status_code != 200 or response.is_streamed:
+            return None
+        body = response.get_data()
+        return _Entry(
+            body=body,
+            status=response.status_code,
+            mimetype=response.mimetype,
+            etag=hashlib.sha1(body).hexdigest(),
+            stored_at=time.time(),
+        )
+
+    def _serve(self, entry, ttl, stale_ttl, vary_auth):
+        age = int(time.time() - entry.stored_at)
+        response = current_app.response_class(entry.body, status=entry.status, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        response.headers['Age'] = str(age)
+        response.headers['Cache-Control'] = (
+            f"{'private' if vary_auth else 'public'}, max-age={max(ttl - age, 0)}, "
+            f"stale-while-revalidate={stale_ttl}"
+        )
+        if vary_auth:
+            response.vary.add('Cookie')
+        return response.make_conditional(request)
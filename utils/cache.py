@@ -0,0 +1,47 @@
+"""
+Small in-process caching helpers
+"""
+
+import threading
+import time
+
+
+class CachedValue:
+    """A value computed by ``loader`` and reused for ``ttl`` seconds.
+
+    Refreshes are single-flight: when the value expires, the first caller
+    recomputes it while concurrent callers keep getting the stale value
+    instead of piling onto the database. Callers only wait when there is
+    no value at all yet.
+    """
+
+    def __init__(self, loader, ttl):
+        self.loader = loader
+        self.ttl = ttl
+
+        self._value = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return self._value
+
+        if self._loaded_at is not None:
+            # Someone else is already refreshing; serve what we have
+            if not self._lock.acquire(blocking=False):
+                return self._value
+        else:
+            self._lock.acquire()
+
+        try:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._value = self.loader()
+                self._loaded_at = time.monotonic()
+            return self._value
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        """Force the next get() to recompute"""
+        self._loaded_at = None
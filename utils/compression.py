@@ -0,0 +1,115 @@
+"""
+Negotiated response compression
+
+``Compression.init_app(app)`` compresses HTML, JSON, CSS, JS and other text
+responses with brotli (when the ``brotli`` package is installed) or gzip,
+whichever the client's ``Accept-Encoding`` prefers. Bodies under
+``min_size`` bytes go out as they are, since the headers would eat the
+savings. Streamed responses are compressed chunk by chunk, each chunk
+flushed as it is produced, so a slow stream still reaches the client
+piece by piece.
+
+File responses (``send_file``) are left alone; fingerprinted static assets
+are compressed ahead of time instead (see utils/static_assets.py).
+
+A compressed response's ETag is made weak, because the bytes differ from
+the identity encoding while the content doesn't. If-None-Match uses weak
+comparison, so revalidation works unchanged.
+"""
+
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/xml',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+})
+
+
+def available_encodings():
+    """Content codings this process can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encodings, encodings=None):
+    """The best of ``encodings`` (default: all available) for an Accept-Encoding header, or None"""
+    return accept_encodings.best_match(encodings or available_encodings())
+
+
+class Compression:
+    """Compress responses in an ``after_request`` hook"""
+
+    def __init__(self, min_size=500, level=6, brotli_quality=4, streams=True, enabled=True):
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.streams = streams
+        self.enabled = enabled
+
+    def init_app(self, app):
+        app.after_request(self._compress)
+
+    def _compress(self, response):
+        if (not self.enabled or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or response.direct_passthrough or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 304):
+            return response
+        encoding = negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            if not self.streams:
+                return response
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            response.set_data(self._compress_body(body, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _compress_body(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.level)
+
+    def _compress_stream(self, chunks, encoding):
+        try:
+            if encoding == 'br':
+                compressor = brotli.Compressor(quality=self.brotli_quality)
+                for chunk in chunks:
+                    data = compressor.process(_as_bytes(chunk)) + compressor.flush()
+                    if data:
+                        yield data
+                yield compressor.finish()
+            else:
+                # wbits 16 + MAX_WBITS writes a gzip header and trailer
+                compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+                for chunk in chunks:
+                    data = compressor.compress(_as_bytes(chunk)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                    if data:
+                        yield data
+                yield compressor.flush()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+def _as_bytes(chunk):
+    return chunk.encode() if isinstance(chunk, str) else chunk
@@ -0,0 +1,100 @@
+"""
+Question and answer content, rendered once at write time
+
+Bodies arrive as the rich text editor's HTML. ``render_content`` turns one
+into the three forms the site reads, which the models store next to the
+raw ``content`` whenever it is assigned:
+
+* ``content_text``: the plain text, tags stripped and entities decoded,
+  for search, similarity and keyword extraction
+* ``content_html``: that text escaped, with line breaks as ``<br>``, safe
+  to output as is on the question page
+* ``excerpt``: the first 200 characters of the text, cut at a word
+  boundary, for cards and API listings
+
+``backfill`` renders rows written before the columns existed.
+"""
+
+import html
+import re
+
+from markupsafe import escape
+from sqlalchemy import bindparam, or_, select
+
+EXCERPT_LENGTH = 200
+EXCERPT_LEEWAY = 5
+
+_SUBSTITUTIONS = [
+    # Remove unnecessary span styles and clean up
+    (re.compile(r'<span[^>]*style="[^"]*"[^>]*>(.*?)<\/span>'), r'\1'),
+    (re.compile(r'<p[^>]*style="[^"]*"[^>]*>'), '<p>'),
+    (re.compile(r'style="[^"]*"'), ''),
+    # Convert paragraphs to plain text with line breaks
+    (re.compile(r'<p[^>]*>(.*?)<\/p>'), r'\1\n\n'),
+    (re.compile(r'<br[^>]*>'), '\n'),
+    # Remove any remaining HTML tags
+    (re.compile(r'<[^>]+>'), ''),
+    # Clean up extra whitespace
+    (re.compile(r'\n\s*\n'), '\n\n'),
+]
+_NEWLINE = re.compile(r'\r?\n')
+
+
+def strip_html(content):
+    """The editor's HTML as text with paragraph breaks; entities are left encoded"""
+    if content is None:
+        return ''
+    for pattern, replacement in _SUBSTITUTIONS:
+        content = pattern.sub(replacement, content)
+    return content.strip()
+
+
+def text_to_html(text):
+    """Escape ``text`` and turn its line breaks into ``<br>``"""
+    return _NEWLINE.sub('<br>', str(escape(text)))
+
+
+def truncate(text, length=EXCERPT_LENGTH, end='...', leeway=EXCERPT_LEEWAY):
+    """Cut ``text`` at the last word boundary before ``length``, like Jinja's ``truncate``"""
+    if len(text) <= length + leeway:
+        return text
+    return text[:length - len(end)].rsplit(' ', 1)[0] + end
+
+
+def render_content(content):
+    """(content_html, content_text, excerpt) for a raw question or answer body"""
+    text = html.unescape(strip_html(content))
+    return text_to_html(text), text, truncate(text)
+
+
+def backfill(connection, table, only_missing=True, batch_size=500):
+    """Render ``table``'s rows in batches of ``batch_size``. Returns the number of rows written.
+
+    With ``only_missing`` rows that already have ``content_html`` are
+    skipped; otherwise every row is re-rendered (after changing the
+    pipeline, say).
+    """
+    query = select(table.c.id, table.c.content).order_by(table.c.id).limit(batch_size)
+    if only_missing:
+        query = query.where(or_(table.c.content_html.is_(None), table.c.content_text.is_(None)))
+
+    update = table.update().where(table.c.id == bindparam('row_id')).values(
+        content_html=bindparam('rendered_html'),
+        content_text=bindparam('rendered_text'),
+        excerpt=bindparam('rendered_excerpt'),
+    )
+
+    written = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(query.where(table.c.id > last_id)).all()
+        if not rows:
+            return written
+        params = []
+        for row_id, content in rows:
+            content_html, content_text, excerpt = render_content(content)
+            params.append({'row_id': row_id, 'rendered_html': content_html,
+                           'rendered_text': content_text, 'rendered_excerpt': excerpt})
+        connection.execute(update, params)
+        written += len(rows)
+        last_id = rows[-1][0]
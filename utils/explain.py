@@ -0,0 +1,44 @@
+"""
+EXPLAIN-based full table scan detection
+
+Asks the database how it would run a SELECT and reports the tables it
+would read in full rather than through an index. Supports SQLite
+(``EXPLAIN QUERY PLAN``) and PostgreSQL (``EXPLAIN (FORMAT JSON)``); on
+other databases nothing is reported.
+"""
+
+import re
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+_ALIAS_SUFFIX = re.compile(r'_\d+$')
+
+
+def full_scans(connection, statement, parameters, tables):
+    """Names of the ``tables`` that ``statement`` would scan without an index"""
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return []
+
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        scanned = [match.group(1) for match in (_SQLITE_SCAN.match(row[-1]) for row in plan) if match]
+    elif dialect == 'postgresql':
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        scanned = list(_postgresql_seq_scans(plan[0]['Plan']))
+    else:
+        return []
+
+    found = []
+    for name in scanned:
+        # SQLAlchemy aliases a table as <table>_<n>
+        table = name if name in tables else _ALIAS_SUFFIX.sub('', name)
+        if table in tables and table not in found:
+            found.append(table)
+    return found
+
+
+def _postgresql_seq_scans(node):
+    if node.get('Node Type') == 'Seq Scan':
+        yield node['Relation Name']
+    for child in node.get('Plans', []):
+        yield from _postgresql_seq_scans(child)
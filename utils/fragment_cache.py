@@ -0,0 +1,202 @@
+"""
+Jinja fragment caching
+
+Adds a ``{% cache %}`` tag whose arguments are the parts of the cache key
+followed by a TTL in seconds::
+
+    {% cache 'question-card', question.id, question.created_at, 600 %}
+        ... markup ...
+    {% endcache %}
+
+The rendered markup is stored under the key and reused until it expires.
+Every value the fragment shows that can change must be in the key, and so
+must something that tells apart rows given a deleted row's id. Keep
+values that change all the time (vote, answer and view counts) outside the
+block instead: keying on them stores a new copy on every change.
+
+Stores only need ``get(key)`` and ``set(key, value, ttl)``.
+``MemoryFragmentStore`` (the default) is a per-process LRU.
+``FileFragmentStore`` keeps fragments in a directory, where every worker
+on the host shares them. The directory is swept of expired fragments and
+capped in size.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class MemoryFragmentStore:
+    """At most ``max_entries`` fragments, least recently used evicted first"""
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._fragments.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._fragments[key]
+                return None
+            self._fragments.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._fragments[key] = (time.time() + ttl, value)
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+
+class FileFragmentStore:
+    """One file per fragment in ``directory``: an expiry timestamp line, then the markup.
+
+    At most every ``sweep_interval`` seconds a write sweeps the directory:
+    expired fragments are deleted, then the oldest ones until at most
+    ``max_entries`` are left.
+    """
+
+    def __init__(self, directory, max_entries=5000, sweep_interval=300):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._swept_at = time.monotonic()
+        self._sweep_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                expires_at = float(f.readline())
+                if expires_at <= time.time():
+                    return None
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, value, ttl):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(f'{time.time() + ttl}\n')
+                f.write(value)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._maybe_sweep()
+
+    def sweep(self):
+        """Delete expired fragments, then the oldest beyond ``max_entries``. Returns how many were deleted."""
+        now = time.time()
+        fragments = []
+        deleted = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith('.fragment'):
+                    with open(entry.path, encoding='utf-8') as f:
+                        expired = float(f.readline()) <= now
+                else:
+                    # A temp file left by a failed write
+                    expired = entry.stat().st_mtime < now - self.sweep_interval
+                if expired:
+                    os.remove(entry.path)
+                    deleted += 1
+                elif entry.name.endswith('.fragment'):
+                    fragments.append((entry.stat().st_mtime, entry.path))
+            except (OSError, ValueError):
+                continue
+        fragments.sort(reverse=True)
+        for modified, path in fragments[self.max_entries:]:
+            try:
+                os.remove(path)
+                deleted += 1
+            except OSError:
+                pass
+        return deleted
+
+    def _maybe_sweep(self):
+        if (time.monotonic() - self._swept_at < self.sweep_interval
+                or not self._sweep_lock.acquire(blocking=False)):
+            return
+        try:
+            self._swept_at = time.monotonic()
+            self.sweep()
+        finally:
+            self._sweep_lock.release()
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.fragment'):
+                os.remove(os.path.join(self.directory, name))
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.fragment')
+
+
+class FragmentCacheExtension(Extension):
+    """The ``{% cache key_part, ..., ttl %}...{% endcache %}`` tag"""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        if len(args) < 2:
+            parser.fail('cache needs at least one key part and a TTL', lineno)
+
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render', [nodes.List(args[:-1]), args[-1]])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, key_parts, ttl, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        return cache.render(key_parts, ttl, caller)
+
+
+class FragmentCache:
+    """Wire a fragment store into an app's Jinja environment"""
+
+    def __init__(self, store=None, enabled=True):
+        self.store = store if store is not None else MemoryFragmentStore()
+        self.enabled = enabled
+
+    def init_app(self, app):
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self
+
+    def render(self, key_parts, ttl, caller):
+        if not self.enabled:
+            return caller()
+        key = 'fragment:' + ':'.join(str(part) for part in key_parts)
+        value = self.store.get(key)
+        if value is None:
+            value = str(caller())
+            self.store.set(key, value, ttl)
+        # Stored fragments are template output, already escaped
+        return Markup(value)
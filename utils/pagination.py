@@ -0,0 +1,121 @@
+"""
+Keyset (cursor) pagination helpers
+
+Pages are addressed by the sort key of the last row already shown instead
+of an OFFSET, so fetching page 10,000 costs the same index range scan as
+page 1. Cursors are signed with the app's SECRET_KEY so clients can't
+forge positions.
+"""
+
+from datetime import datetime
+
+from flask import current_app, request, url_for
+from itsdangerous import BadData, URLSafeSerializer
+from sqlalchemy import and_, or_
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token can't be decoded"""
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='pagination-cursor')
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque, signed token for the position just after (created_at, row_id)"""
+    return _serializer().dumps([created_at.isoformat(), row_id])
+
+
+def decode_cursor(token):
+    """(created_at, row_id) from a token made by encode_cursor"""
+    try:
+        created_at, row_id = _serializer().loads(token)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (BadData, ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def keyset_page(query, model, cursor=None, per_page=20):
+    """One page of ``query`` newest first, ordered by (created_at, id).
+
+    Returns ``(items, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    # Fetch one extra row to learn whether another page exists
+    items = query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+    if len(items) <= per_page:
+        return items, None
+
+    items = items[:per_page]
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
+
+
+def paginate_request(query, model, endpoint, estimate=None, default_per_page=20, max_per_page=100, **url_values):
+    """Paginate a REST collection according to the request's query args.
+
+    ``?cursor=`` (empty for the first page) switches to keyset paging;
+    otherwise the classic ``?page=`` offset paging is used. ``?count=``
+    picks how the total is reported: ``exact`` runs a COUNT(*), ``estimate``
+    calls ``estimate()`` (a cached counter, or None if there isn't one)
+    and ``none`` skips it. Cursor mode defaults to ``none``, page mode to
+    ``exact``.
+
+    Returns ``(items, pagination)`` where ``pagination`` is the dict to
+    embed in the response. Raises InvalidCursor or ValueError on bad args.
+    """
+    per_page = max(1, min(request.args.get('per_page', default_per_page, type=int), max_per_page))
+    cursor_mode = 'cursor' in request.args
+    count_mode = request.args.get('count', 'none' if cursor_mode else 'exact')
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f"Invalid count mode, expected one of: {', '.join(COUNT_MODES)}")
+
+    def link(**values):
+        return url_for(endpoint, per_page=per_page, **url_values, **values)
+
+    def total():
+        if count_mode == 'exact':
+            return query.order_by(None).count()
+        if count_mode == 'estimate':
+            return estimate() if estimate else None
+        return None
+
+    if cursor_mode:
+        items, next_cursor = keyset_page(query, model, request.args.get('cursor'), per_page)
+        return items, {
+            'per_page': per_page,
+            'cursor': request.args.get('cursor') or None,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
+            'next_url': link(cursor=next_cursor, count=count_mode) if next_cursor else None,
+            'total': total(),
+            'total_is_estimate': count_mode == 'estimate'
+        }
+
+    page = max(1, request.args.get('page', 1, type=int))
+    ordered = query.order_by(model.created_at.desc(), model.id.desc())
+    items = ordered.offset((page - 1) * per_page).limit(per_page + 1).all()
+    has_next = len(items) > per_page
+    items = items[:per_page]
+    count = total()
+
+    return items, {
+        'page': page,
+        'per_page': per_page,
+        'total': count,
+        'pages': -(-count // per_page) if count is not None else None,
+        'total_is_estimate': count_mode == 'estimate',
+        'has_next': has_next,
+        'has_prev': page > 1,
+        'next_url': link(page=page + 1, count=count_mode) if has_next else None,
+        'prev_url': link(page=page - 1, count=count_mode) if page > 1 else None
+    }
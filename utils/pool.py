@@ -0,0 +1,162 @@
+"""
+Connection pool instrumentation
+
+``InstrumentedQueuePool`` is a QueuePool that also reports how long each
+checkout took and checkouts that timed out. It only wraps the public
+``Pool.connect()``; everything else comes from pool events. ``PoolMetrics``
+listens to an engine's pool events and keeps running totals (checkouts,
+wait time, timeouts, overflow connections, invalidations) alongside the
+pool's live gauges, so pool sizing can be based on what a worker actually
+sees.
+"""
+
+import bisect
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkout waits and timeouts to ``PoolMetrics``"""
+
+    metrics = None
+
+    def __init__(self, *args, max_overflow=10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.checkout_timed_out(time.perf_counter() - started)
+            raise
+        if self.metrics is not None:
+            self.metrics.checkout_waited(time.perf_counter() - started)
+        return connection
+
+
+class PoolMetrics:
+    """Running pool statistics for one engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._counters = dict.fromkeys([
+            'checkouts', 'checkins', 'checkout_timeouts', 'connections_opened',
+            'overflow_connections', 'invalidations', 'soft_invalidations', 'disconnects',
+        ], 0)
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._in_use = 0
+        self._in_use_peak = 0
+
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+        event.listen(engine, 'soft_invalidate', self._on_soft_invalidate)
+        event.listen(engine, 'handle_error', self._on_error)
+        # dispose() replaces the pool with a new one
+        event.listen(engine, 'engine_disposed', self._attach_pool)
+        self._attach_pool(engine)
+
+    def checkout_waited(self, waited):
+        with self._lock:
+            self._record_wait(waited)
+
+    def checkout_timed_out(self, waited):
+        with self._lock:
+            self._counters['checkout_timeouts'] += 1
+            self._record_wait(waited)
+
+    def snapshot(self):
+        """A JSON-ready dict of the running totals and the pool's current state"""
+        pool = self.engine.pool
+        with self._lock:
+            counters = dict(self._counters)
+            waits = sum(self._buckets)
+            data = {
+                **counters,
+                'in_use': self._in_use,
+                'in_use_peak': self._in_use_peak,
+                'checkout_wait_ms': {
+                    'average': round(self._wait_total * 1000 / waits, 3) if waits else 0,
+                    'max': round(self._wait_max * 1000, 3),
+                    'buckets': {
+                        **{f'le_{bound}': count for bound, count in zip(WAIT_BUCKETS_MS, self._buckets)},
+                        'over': self._buckets[-1],
+                    },
+                },
+            }
+
+        data['pool'] = {'class': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            data['pool'].update({
+                'size': pool.size(),
+                'max_overflow': getattr(pool, 'max_overflow', None),
+                'timeout': pool.timeout(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return data
+
+    def _attach_pool(self, engine):
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.metrics = self
+
+    def _record_wait(self, waited):
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        self._buckets[bisect.bisect_left(WAIT_BUCKETS_MS, waited * 1000)] += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        pool = self.engine.pool
+        # A QueuePool counts connections beyond pool_size as positive overflow
+        overflowing = isinstance(pool, QueuePool) and pool.overflow() > 0
+        with self._lock:
+            self._counters['connections_opened'] += 1
+            if overflowing:
+                self._counters['overflow_connections'] += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self._counters['checkouts'] += 1
+            self._in_use += 1
+            self._in_use_peak = max(self._in_use_peak, self._in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._counters['checkins'] += 1
+            self._in_use = max(self._in_use - 1, 0)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self._counters['invalidations'] += 1
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self._counters['soft_invalidations'] += 1
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            with self._lock:
+                self._counters['disconnects'] += 1
+
+
+def pool_report(metrics_by_bind):
+    """Metrics endpoint payload: this worker's pid and a snapshot per bind"""
+    return {
+        'pid': os.getpid(),
+        'binds': {name: metrics.snapshot() for name, metrics in metrics_by_bind.items()},
+    }
@@ -0,0 +1,74 @@
+"""
+Read-replica routing for db.session
+
+Requests that only read (GET, HEAD, OPTIONS) run their queries against one
+of the configured replica binds; everything else uses the primary. Anything
+that writes during a read-only request (a flush or an INSERT/UPDATE/DELETE)
+goes to the primary, and the rest of that request follows it there.
+
+Replicas lag behind the primary, so a client that just wrote something
+(asked, answered, voted, logged in ...) is pinned to the primary for a few
+seconds by a marker in its session cookie. That way the page it's
+redirected to shows its own write.
+"""
+
+import random
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+READ_ONLY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+# Session key holding the time until which the client reads from the primary
+PRIMARY_UNTIL_KEY = '_primary_until'
+
+
+class RoutingSession(Session):
+    """``db.session`` that reads from the request's replica, if it has one"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = g.get('db_replica') if bind is None and has_request_context() else None
+        if replica is not None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                # Stay on the primary from here on so the request sees its own write
+                g.db_replica = None
+                g.db_wrote = True
+            else:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Pick a replica for each read-only request and pin writers to the primary.
+
+    ``bind_keys`` are the ``SQLALCHEMY_BINDS`` keys of the replicas; with
+    none, every request uses the primary. The session must be created with
+    ``session_options={'class_': RoutingSession}``.
+    """
+
+    def __init__(self, bind_keys=(), sticky_seconds=5):
+        self.bind_keys = list(bind_keys)
+        self.sticky_seconds = sticky_seconds
+
+    def init_app(self, app):
+        app.before_request(self._choose_bind)
+        app.after_request(self._remember_write)
+
+    def _choose_bind(self):
+        g.db_replica = None
+        if not self.bind_keys or request.method not in READ_ONLY_METHODS:
+            return
+
+        primary_until = session.get(PRIMARY_UNTIL_KEY)
+        if primary_until is not None:
+            if primary_until > time.time():
+                return
+            session.pop(PRIMARY_UNTIL_KEY)
+
+        g.db_replica = random.choice(self.bind_keys)
+
+    def _remember_write(self, response):
+        if self.bind_keys and (request.method not in READ_ONLY_METHODS or g.get('db_wrote')):
+            session[PRIMARY_UNTIL_KEY] = time.time() + self.sticky_seconds
+        return response
@@ -0,0 +1,289 @@
+"""
+Full-page cache for anonymous visitors
+
+Anonymous GETs of a cached view are answered from a stored copy of the page
+as long as the versions of the content it shows are still the ones it was
+rendered at (and it is younger than ``ttl``), skipping the view and its
+queries entirely. Pages are kept in a bounded in-memory LRU and,
+optionally, in a directory shared by every worker, which is swept of
+expired pages and capped in size. A page is keyed on the path and only the
+query parameters its view reads, so made-up parameters can't fill the
+cache with copies of the same page. Responses carry an ETag and
+Last-Modified, so a browser revalidating a page it already has gets a
+bodiless 304.
+
+Logged-in users, requests with pending flash messages and anything but a
+200 text/html response always go through the view. The CSRF token that
+anonymous pages embed belongs to one visitor's session, so it is stored
+as a placeholder and filled in with the current visitor's token on the
+way out.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, request, session
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+
+CSRF_PLACEHOLDER = '__response_cache_csrf_token__'
+
+
+class CachedPage:
+    """A rendered page and what is needed to serve and validate it"""
+
+    __slots__ = ('version', 'body', 'etag', 'mimetype', 'stored_at', 'has_csrf', 'hit_args')
+
+    def __init__(self, version, body, etag, mimetype, stored_at, has_csrf=False, hit_args=None):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self.stored_at = stored_at
+        self.has_csrf = has_csrf
+        self.hit_args = hit_args or {}
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class MemoryStore:
+    """At most ``max_entries`` pages, least recently used evicted first"""
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def set(self, key, page):
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._pages.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+class DiskStore:
+    """One JSON file per URL in ``directory``, replaced atomically on write.
+
+    At most every ``ttl`` seconds a write sweeps the directory: pages older
+    than ``ttl`` are deleted, then the oldest ones until at most
+    ``max_entries`` are left.
+    """
+
+    def __init__(self, directory, ttl=300, max_entries=5000):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._swept_at = time.monotonic()
+        self._sweep_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return CachedPage.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def set(self, key, page):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(page.to_dict(), f)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._maybe_sweep()
+
+    def sweep(self):
+        """Delete expired pages, then the oldest beyond ``max_entries``. Returns how many were deleted."""
+        cutoff = time.time() - self.ttl
+        pages = []
+        for entry in os.scandir(self.directory):
+            try:
+                pages.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                continue
+        pages.sort(reverse=True)
+        deleted = 0
+        for position, (modified, path) in enumerate(pages):
+            # Files still being written are newer than the cutoff, so they are
+            # only ever removed once abandoned
+            if modified < cutoff or (position >= self.max_entries and path.endswith('.json')):
+                try:
+                    os.remove(path)
+                    deleted += 1
+                except OSError:
+                    pass
+        return deleted
+
+    def _maybe_sweep(self):
+        if time.monotonic() - self._swept_at < self.ttl or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._swept_at = time.monotonic()
+            self.sweep()
+        finally:
+            self._sweep_lock.release()
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.json')
+
+
+class ResponseCache:
+    """Cache whole responses of selected views for anonymous visitors.
+
+    ``version(*scopes)`` returns the current version of the content in
+    ``scopes``; a page rendered at any other version is a miss. Pages are looked up in memory first, then in
+    ``directory`` if one is given, which holds at most ``max_disk_entries``.
+    """
+
+    def __init__(self, version, max_entries=500, ttl=300, directory=None, max_disk_entries=5000,
+                 enabled=True):
+        self.version = version
+        self.ttl = ttl
+        self.enabled = enabled
+        self.stores = [MemoryStore(max_entries)]
+        if directory:
+            self.stores.append(DiskStore(directory, ttl=ttl, max_entries=max_disk_entries))
+
+    def cached(self, on_hit=None, args=(), scopes=None):
+        """Decorate a view to serve anonymous GETs from the cache.
+
+        ``args`` names the query parameters the view reads; the page is
+        cached per path and values of those, whatever else the URL carries.
+        ``scopes(**view_args)`` lists the content scopes the page shows,
+        whose versions it is validated against.
+        ``on_hit(**view_args, **hit_args)`` runs whenever the view is skipped,
+        for side effects the page still needs (counting a view, say), with
+        ``hit_args`` as passed to ``remember_for_hits()`` when it was rendered.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**view_args):
+                if not self._cacheable_request():
+                    return view(**view_args)
+
+                key = self._key(args)
+                version = self.version(*(scopes(**view_args) if scopes else ()))
+                page = self._get(key, version)
+                if page is not None:
+                    if on_hit is not None:
+                        on_hit(**view_args, **page.hit_args)
+                    return self._serve(page, 'hit')
+
+                response = current_app.make_response(view(**view_args))
+                page = self._page_for(response, version)
+                if page is None:
+                    return response
+                for store in self.stores:
+                    store.set(key, page)
+                return self._serve(page, 'miss')
+            return wrapper
+        return decorator
+
+    def remember_for_hits(self, **hit_args):
+        """Keyword arguments for ``on_hit`` when the page being rendered is served later"""
+        g.response_cache_hit_args = hit_args
+
+    def clear(self):
+        for store in self.stores:
+            store.clear()
+
+    def _key(self, args):
+        values = [(name, request.args.getlist(name)) for name in args if name in request.args]
+        return json.dumps([request.path, values]) if values else request.path
+
+    def _cacheable_request(self):
+        return (
+            self.enabled
+            and request.method in ('GET', 'HEAD')
+            and not current_user.is_authenticated
+            and '_flashes' not in session
+        )
+
+    def _get(self, key, version):
+        now = time.time()
+        for index, store in enumerate(self.stores):
+            page = store.get(key)
+            if page is not None and page.version == version and now - page.stored_at < self.ttl:
+                # Promote disk hits into memory
+                for faster in self.stores[:index]:
+                    faster.set(key, page)
+                return page
+        return None
+
+    def _page_for(self, response, version):
+        if (response.status_code != 200 or response.mimetype != 'text/html'
+                or response.is_streamed or 'Set-Cookie' in response.headers):
+            return None
+
+        body = response.get_data(as_text=True)
+        token = g.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'))
+        has_csrf = bool(token) and token in body
+        if has_csrf:
+            body = body.replace(token, CSRF_PLACEHOLDER)
+
+        digest = hashlib.sha1(body.encode()).hexdigest()[:20]
+        return CachedPage(
+            version=version,
+            body=body,
+            etag=f'{version}-{digest}',
+            mimetype=response.mimetype,
+            stored_at=time.time(),
+            has_csrf=has_csrf,
+            hit_args=g.pop('response_cache_hit_args', None),
+        )
+
+    def _serve(self, page, outcome):
+        body, etag, modified = page.body, page.etag, page.stored_at
+        if page.has_csrf:
+            body = body.replace(CSRF_PLACEHOLDER, generate_csrf())
+            # A revalidated copy keeps the token it was served with, so make it
+            # re-download before that token expires
+            lifetime = current_app.config.get('WTF_CSRF_TIME_LIMIT') or 0
+            if lifetime:
+                window = int(time.time() // (lifetime / 2))
+                etag = f'{etag}-{window}'
+                modified = max(modified, window * lifetime / 2)
+
+        response = current_app.response_class(body, mimetype=page.mimetype)
+        response.set_etag(etag)
+        response.last_modified = datetime.fromtimestamp(int(modified), tz=timezone.utc)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Response-Cache'] = outcome
+        response.vary.add('Cookie')
+        return response.make_conditional(request)
@@ -0,0 +1,197 @@
+"""
+Schema-driven JSON serialization for the API
+
+A ``Schema`` lists the keys a resource can have and where each value comes
+from: an attribute path (``'author.username'``) or a callable taking the
+object. ``Nested`` keys expand a related object or collection with another
+schema, and are only emitted when the client asks for them with
+``?include=``. ``?fields=`` narrows a response to the keys listed.
+
+Each combination of fields and includes is compiled once, into a plain
+function that builds the dict with direct attribute access, and reused for
+every object and request after that. Requested names are validated,
+de-duplicated and put in the schema's own order first, so ``title,id`` and
+``id,id,title`` share one compiled function, and at most
+``MAX_COMPILED`` functions are kept per schema.
+
+``JSONProvider`` encodes responses with orjson when it is installed and
+falls back to the standard library otherwise. Datetimes are left to the
+encoder, which writes them in ISO 8601 either way.
+"""
+
+import dataclasses
+import decimal
+import re
+import uuid
+from datetime import date
+from operator import attrgetter
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+from utils.response_cache import MemoryStore
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_ATTRIBUTE_PATH = re.compile(r'^[A-Za-z_]\w*(\.[A-Za-z_]\w*)*$')
+
+# Compiled serializers kept per schema, least recently used dropped first
+MAX_COMPILED = 256
+
+
+class InvalidFields(ValueError):
+    """Raised when ``?fields=`` or ``?include=`` names something a schema doesn't have"""
+
+
+class Nested:
+    """Serialize ``attribute`` with ``schema``; a list of them if ``many``"""
+
+    def __init__(self, attribute, schema, many=False, fields=None):
+        self.attribute = attribute
+        self.schema = schema
+        self.many = many
+        self.fields = fields
+
+    def getter(self):
+        serialize = self.schema.serializer(self.fields)
+        get_value = attrgetter(self.attribute)
+        if self.many:
+            return lambda obj: [serialize(item) for item in get_value(obj)]
+
+        def get(obj):
+            value = get_value(obj)
+            return None if value is None else serialize(value)
+        return get
+
+
+class Schema:
+    """The keys of one kind of resource.
+
+    ``fields`` maps each key to an attribute path, a callable or a
+    ``Nested`` that is always expanded, in output order; ``default`` is the
+    keys emitted when the client doesn't choose (all of ``fields`` if not
+    given). ``includes`` maps names to ``Nested`` expansions; an expansion
+    with the same name as a field replaces it.
+    """
+
+    def __init__(self, fields, default=None, includes=None):
+        for key, source in fields.items():
+            if isinstance(source, str) and not _ATTRIBUTE_PATH.match(source):
+                raise ValueError(f'Invalid attribute path for {key!r}: {source!r}')
+        self.fields = fields
+        self.default = tuple(default) if default is not None else tuple(fields)
+        self.includes = includes or {}
+        self._compiled = MemoryStore(MAX_COMPILED)
+
+    def serializer(self, fields=None, include=()):
+        """A function turning one object into a dict with ``fields`` (default: ``default``) plus ``include``"""
+        key = self._normalize(fields, include)
+        serialize = self._compiled.get(key)
+        if serialize is None:
+            serialize = self._compile(*key)
+            self._compiled.set(key, serialize)
+        return serialize
+
+    def for_request(self, default_include=()):
+        """The serializer asked for by the current request's ``?fields=`` and ``?include=``"""
+        fields = _names(request.args.get('fields'))
+        include = set(default_include) | set(_names(request.args.get('include')))
+        return self.serializer(fields, include)
+
+    def requested(self, name):
+        """Whether the current request's ``?fields=`` or ``?include=`` selects ``name``"""
+        fields = _names(request.args.get('fields'))
+        return name in _names(request.args.get('include')) or (name in fields if fields else name in self.default)
+
+    def _normalize(self, fields, include):
+        """(fields, include) validated, de-duplicated and in declaration order"""
+        fields = set(fields or ())
+        include = set(include)
+        unknown = sorted(name for name in fields if name not in self.fields and name not in self.includes)
+        if unknown:
+            raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+        unknown = sorted(name for name in include if name not in self.includes)
+        if unknown:
+            raise InvalidFields(f"Unknown includes: {', '.join(unknown)}")
+
+        # An expansion named in ?fields= is included
+        include |= {name for name in fields if name not in self.fields}
+        return (
+            tuple(name for name in self.fields if name in fields) if fields else None,
+            tuple(name for name in self.includes if name in include),
+        )
+
+    def _compile(self, fields, include):
+        keys = [key for key in (self.default if fields is None else fields) if key in self.fields]
+        keys += [name for name in include if name not in keys]
+
+        namespace = {}
+        entries = []
+        for number, key in enumerate(keys):
+            if key in include:
+                source = self.includes[key].getter()
+            else:
+                source = self.fields[key]
+            if isinstance(source, Nested):
+                source = source.getter()
+            if isinstance(source, str):
+                entries.append(f'{key!r}: obj.{source}')
+            else:
+                namespace[f'_get{number}'] = source
+                entries.append(f'{key!r}: _get{number}(obj)')
+
+        source = 'def serialize(obj):\n    return {' + ', '.join(entries) + '}\n'
+        exec(source, namespace)
+        return namespace['serialize']
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+
+def _default(obj):
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, encoding with orjson when it is available"""
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        body = self._orjson_dumps(obj, kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent'))
+        return body.decode() if body is not None else super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._orjson_dumps(obj, self.sort_keys, indent)
+        if body is None:
+            return super().response(obj)
+        # Bytes straight into the response, without a round trip through str
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+    def _orjson_dumps(self, obj, sort_keys, indent):
+        if orjson is None:
+            return None
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=_default, option=option)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and the like; the stdlib copes
+            return None
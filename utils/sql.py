@@ -0,0 +1,124 @@
+"""
+Dialect-aware SQL helpers
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import and_, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+_ON_CONFLICT_INSERTS = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert,
+}
+
+
+def dialect_name(session):
+    return session.get_bind().dialect.name
+
+
+def upsert_increment(session, table, keys, increments):
+    """Add ``increments`` to the row identified by ``keys``, creating it if needed.
+
+    Uses INSERT ... ON CONFLICT DO UPDATE where the database supports it,
+    otherwise an UPDATE followed by an INSERT when no row matched.
+    """
+    upsert_increments(session, table, [keys], increments)
+
+
+def upsert_increments(session, table, key_rows, increments):
+    """upsert_increment for several rows, as one executemany where supported"""
+    if not key_rows:
+        return
+    insert = _ON_CONFLICT_INSERTS.get(dialect_name(session))
+    if insert is not None:
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(key_rows[0]),
+            set_={column: table.c[column] + statement.excluded[column] for column in increments}
+        )
+        session.execute(statement, [{**keys, **increments} for keys in key_rows])
+        return
+
+    for keys in key_rows:
+        result = session.execute(
+            table.update().where(and_(*[table.c[key] == value for key, value in keys.items()])).values({
+                column: table.c[column] + value for column, value in increments.items()
+            })
+        )
+        if result.rowcount == 0:
+            session.execute(table.insert().values(**keys, **increments))
+
+
+def upsert(session, table, rows, index_elements):
+    """Insert ``rows``, overwriting the other columns of any that collide on ``index_elements``.
+
+    One INSERT ... ON CONFLICT DO UPDATE where the database supports it,
+    otherwise an UPDATE per row followed by an INSERT when no row matched.
+    """
+    if not rows:
+        return
+    insert = _ON_CONFLICT_INSERTS.get(dialect_name(session))
+    if insert is not None:
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: statement.excluded[column] for column in rows[0] if column not in index_elements}
+        )
+        session.execute(statement, rows)
+        return
+
+    for row in rows:
+        result = session.execute(
+            table.update().where(and_(*[table.c[key] == row[key] for key in index_elements])).values({
+                column: value for column, value in row.items() if column not in index_elements
+            })
+        )
+        if result.rowcount == 0:
+            session.execute(table.insert().values(**row))
+
+
+def insert_ignoring_conflicts(session, table, rows, index_elements):
+    """Insert ``rows``, skipping any that collide on ``index_elements``.
+
+    One INSERT ... ON CONFLICT DO NOTHING where the database supports it,
+    otherwise one INSERT per row, each in a savepoint so a duplicate only
+    discards that row.
+    """
+    if not rows:
+        return
+    insert = _ON_CONFLICT_INSERTS.get(dialect_name(session))
+    if insert is not None:
+        session.execute(insert(table).on_conflict_do_nothing(index_elements=index_elements), rows)
+        return
+
+    for row in rows:
+        try:
+            with session.begin_nested():
+                session.execute(table.insert().values(**row))
+        except IntegrityError:
+            pass
+
+
+@contextmanager
+def count_statements(engine):
+    """Collect the SQL statements ``engine`` executes inside the block.
+
+    Yields the list ``(statement, parameters)`` pairs are appended to, e.g.::
+
+        with count_statements(db.engine) as statements:
+            client.get('/')
+        assert len(statements) <= 5
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
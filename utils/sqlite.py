@@ -0,0 +1,67 @@
+"""
+SQLite production profile
+
+Connection settings for serving from a single SQLite file:
+
+* ``journal_mode=WAL`` lets readers keep reading while a write is in
+  progress instead of waiting on the database lock
+* ``synchronous=NORMAL`` only fsyncs at checkpoints, which is safe under
+  WAL (a power loss can drop the last commits but never corrupts the file)
+* ``mmap_size`` and ``cache_size`` keep hot pages in memory
+* ``busy_timeout`` makes a connection wait for the write lock rather than
+  failing straight away with "database is locked"
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+def is_sqlite(database_uri):
+    return make_url(database_uri).get_backend_name() == 'sqlite'
+
+
+def is_memory(database_uri):
+    return make_url(database_uri).database in (None, '', ':memory:')
+
+
+def engine_options(options):
+    """``options`` plus the pool settings the performance profile needs.
+
+    SQLAlchemy 1.4 opens a new connection per checkout for SQLite files, so
+    every request would start with a cold page cache and re-run the pragmas.
+    A pool keeps connections (and their caches) around, which needs the
+    driver's same-thread check turned off.
+    """
+    options = dict(options)
+    options.setdefault('poolclass', QueuePool)
+    connect_args = dict(options.get('connect_args', {}))
+    connect_args.setdefault('check_same_thread', False)
+    options['connect_args'] = connect_args
+    return options
+
+
+def apply_pragmas(engine, mmap_size=256 * 1024 * 1024, cache_size=-64000, busy_timeout=5000):
+    """Set the production pragmas on every new connection ``engine`` opens.
+
+    ``cache_size`` follows SQLite's convention: negative values are KiB,
+    positive values are pages. ``busy_timeout`` is in milliseconds.
+    """
+    pragmas = [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('mmap_size', int(mmap_size)),
+        ('cache_size', int(cache_size)),
+        ('busy_timeout', int(busy_timeout)),
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    return set_pragmas
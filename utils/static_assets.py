@@ -0,0 +1,123 @@
+"""
+Fingerprinted, precompressed static assets
+
+``build()`` copies every file under ``static/`` to ``static/build/`` with a
+content hash in its name (``css/premium.css`` becomes
+``build/css/premium.1a2b3c4d5e.css``), writes gzip and, when the ``brotli``
+package is installed, brotli copies of the text files next to them, and
+records the mapping in ``static/build/manifest.json``. Run it as part of a
+deploy with ``python build_static.py``.
+
+``StaticAssets.init_app(app)`` reads the manifest. ``url_for('static', ...)``
+then returns the fingerprinted URL, and those URLs are served with the
+best precompressed copy the client accepts and a one-year ``immutable``
+Cache-Control. A new build changes the hash of every file that changed, so
+browsers never need to revalidate. Without a manifest, static files are
+served the usual way.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory
+
+from utils.compression import COMPRESSIBLE_MIMETYPES, brotli, negotiate
+
+BUILD_DIRECTORY = 'build'
+MANIFEST_NAME = 'manifest.json'
+
+
+def _mimetype(path):
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def build(static_folder, gzip_level=9, brotli_quality=11):
+    """Fingerprint and precompress ``static_folder``. Returns the manifest written."""
+    output = os.path.join(static_folder, BUILD_DIRECTORY)
+    shutil.rmtree(output, ignore_errors=True)
+
+    assets = {}
+    for directory, subdirectories, files in os.walk(static_folder):
+        if os.path.abspath(directory) == os.path.abspath(output):
+            subdirectories.clear()
+            continue
+        for name in sorted(files):
+            source = os.path.join(directory, name)
+            filename = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+
+            stem, extension = os.path.splitext(filename)
+            digest = hashlib.sha256(content).hexdigest()[:10]
+            built = f'{BUILD_DIRECTORY}/{stem}.{digest}{extension}'
+            target = os.path.join(static_folder, built)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(content)
+
+            encodings = []
+            if _mimetype(filename) in COMPRESSIBLE_MIMETYPES:
+                if brotli is not None:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(brotli.compress(content, quality=brotli_quality))
+                    encodings.append('br')
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(content, compresslevel=gzip_level, mtime=0))
+                encodings.append('gzip')
+
+            assets[filename] = {'path': built, 'encodings': encodings}
+
+    manifest = {'assets': assets}
+    with open(os.path.join(output, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    """Serve the fingerprinted files listed in the build manifest"""
+
+    def __init__(self, manifest_path=None, max_age=365 * 24 * 3600, enabled=True):
+        self.manifest_path = manifest_path
+        self.max_age = max_age
+        self.enabled = enabled
+        self.assets = {}
+        self._built = {}
+
+    def init_app(self, app):
+        path = self.manifest_path or os.path.join(app.static_folder, BUILD_DIRECTORY, MANIFEST_NAME)
+        if not self.enabled or not os.path.exists(path):
+            return
+        with open(path) as f:
+            self.assets = json.load(f)['assets']
+        self._built = {asset['path']: asset for asset in self.assets.values()}
+        self.static_folder = app.static_folder
+
+        app.url_defaults(self._fingerprint)
+        serve_static = app.view_functions['static']
+        app.view_functions['static'] = lambda filename: self._send(filename) or serve_static(filename=filename)
+
+    def _fingerprint(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.assets:
+            values['filename'] = self.assets[values['filename']]['path']
+
+    def _send(self, filename):
+        """The response for a fingerprinted ``filename``, or None for any other file"""
+        asset = self._built.get(filename)
+        if asset is None:
+            return None
+
+        encoding = negotiate(request.accept_encodings, asset['encodings']) if asset['encodings'] else None
+        suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+        response = send_from_directory(
+            self.static_folder, filename + suffix, mimetype=_mimetype(filename), max_age=self.max_age
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset['encodings']:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        return response